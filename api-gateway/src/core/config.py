@@ -0,0 +1,97 @@
+from pydantic_settings import BaseSettings
+from typing import Dict, List, Optional
+
+# Claves de ejemplo/por defecto del repositorio: cualquiera podría firmar tokens con ellas
+INSECURE_SECRET_KEYS = frozenset({
+    "fallback-secret-key",
+    "your-secret-key-change-in-production",
+    "your-secret-key-here-change-in-production",
+})
+
+class Settings(BaseSettings):
+    # URLs de los microservicios
+    auth_service_url: str = "http://auth-service:8000"
+    product_service_url: str = "http://product-service:8001"
+    business_rules_service_url: str = "http://business-rules-service:8003"
+    
+    # Verificación local de tokens JWT (mismo SECRET_KEY/ALGORITHM que el auth-service)
+    # HS256 solo se acepta con un SECRET_KEY propio (nunca con los valores por defecto públicos)
+    secret_key: Optional[str] = None
+    # Sin valor explícito: RS256 vía JWKS, más HS256 si hay un SECRET_KEY propio
+    jwt_algorithms: Optional[List[str]] = None
+    jwks_url: str = "http://auth-service:8000/api/v1/.well-known/jwks.json"
+    jwks_refresh_interval: float = 300.0
+    token_cache_size: int = 10000
+    
+    # Pool de conexiones hacia los microservicios (uno por servicio)
+    upstream_max_connections: int = 100
+    upstream_max_keepalive_connections: int = 20
+    upstream_keepalive_expiry: float = 30.0
+    upstream_timeout: float = 30.0
+    upstream_connect_timeout: float = 5.0
+    upstream_http2: bool = False
+    
+    # Resiliencia de llamadas a microservicios
+    upstream_route_timeouts: Dict[str, float] = {
+        "/calculations/recalculate-all": 120.0,
+        "/calculations/simulation": 60.0,
+    }
+    upstream_max_retries: int = 2
+    upstream_retry_backoff_base: float = 0.05
+    upstream_retry_backoff_max: float = 1.0
+    upstream_retry_budget_ratio: float = 0.2
+    upstream_max_in_flight: int = 500
+    circuit_breaker_failure_threshold: int = 5
+    circuit_breaker_reset_timeout: float = 10.0
+    
+    # Health checks en segundo plano
+    health_check_interval: float = 5.0
+    health_check_timeout: float = 2.0
+    health_cache_ttl: float = 10.0
+    
+    # Rate limiting (GCRA); sin URL de Redis el estado vive en cada worker
+    rate_limit_requests: int = 100
+    rate_limit_period: float = 60.0
+    rate_limit_user_requests: Optional[int] = None
+    rate_limit_max_clients: int = 10000
+    rate_limit_redis_url: Optional[str] = None
+    
+    # Caché de respuestas para rutas GET de catálogo
+    response_cache_ttl: float = 30.0
+    response_cache_max_bytes: int = 64 * 1024 * 1024
+    response_cache_max_entry_bytes: int = 4 * 1024 * 1024
+    
+    # Tracing distribuido: "none", "memory" o "file" (JSON lines en tracing_file)
+    tracing_sink: str = "none"
+    tracing_file: str = "/tmp/gateway-spans.jsonl"
+    tracing_service_name: str = "api-gateway"
+    
+    # Endpoint /batch
+    batch_max_requests: int = 50
+    batch_concurrency: int = 10
+    
+    @property
+    def shared_secret_key(self) -> Optional[str]:
+        """SECRET_KEY para verificar HS256, o None si no se configuró uno propio"""
+        if self.secret_key and self.secret_key not in INSECURE_SECRET_KEYS:
+            return self.secret_key
+        return None
+    
+    @property
+    def verification_algorithms(self) -> List[str]:
+        """Algoritmos JWT aceptados; los HS* se descartan sin un SECRET_KEY propio"""
+        if self.jwt_algorithms is not None:
+            algorithms = list(self.jwt_algorithms)
+        else:
+            algorithms = (["RS256"] if self.jwks_url else []) + ["HS256"]
+        if self.shared_secret_key is None:
+            algorithms = [algorithm for algorithm in algorithms if not algorithm.startswith("HS")]
+        return algorithms
+    
+    class Config:
+        env_file = ".env"
+        case_sensitive = False
+        # Ignorar variables extra del entorno
+        extra = "ignore"
+
+settings = Settings()
@@ -0,0 +1,46 @@
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from .config import settings
+
+@dataclass(frozen=True)
+class UpstreamRoute:
+    """Prefijo público del gateway y el microservicio que lo atiende"""
+    prefix: str
+    service_url: str
+    upstream_prefix: str
+    # Prefijos de la caché de respuestas que una escritura en esta ruta invalida
+    invalidates: Tuple[str, ...] = ()
+    # Métodos cuyo body JSON el gateway envía como query params (igual que la ruta explícita)
+    body_as_params: Tuple[str, ...] = ()
+
+# Tabla de ruteo del gateway (la misma que usan las rutas explícitas de main.py)
+ROUTE_TABLE = (
+    UpstreamRoute("/auth", settings.auth_service_url, "/auth"),
+    UpstreamRoute("/insumos", settings.product_service_url, "/insumos", ("/insumos",)),
+    UpstreamRoute("/moldes", settings.product_service_url, "/moldes", ("/moldes",)),
+    UpstreamRoute("/colores", settings.product_service_url, "/colores", ("/colores",)),
+    UpstreamRoute("/resumen-completo", settings.product_service_url, "/resumen-completo"),
+    UpstreamRoute(
+        "/configurations",
+        settings.business_rules_service_url,
+        "/configurations",
+        ("/configurations", "/calculations/params"),
+        body_as_params=("PUT",)
+    ),
+    UpstreamRoute("/calculations", settings.business_rules_service_url, "/calculations"),
+    UpstreamRoute("/jobs", settings.business_rules_service_url, "/jobs"),
+    UpstreamRoute("/precios", settings.business_rules_service_url, "/precios"),
+)
+
+# Rutas cuyo path en el microservicio no es igual al del gateway
+PATH_REWRITES = {
+    "/insumos": "/insumos/",
+}
+
+def resolve_upstream(path: str) -> Optional[Tuple[UpstreamRoute, str]]:
+    """Devuelve la ruta de la tabla y el path en el microservicio, o None si no existe"""
+    for route in ROUTE_TABLE:
+        if path == route.prefix or path.startswith(route.prefix + "/"):
+            upstream_path = PATH_REWRITES.get(path, route.upstream_prefix + path[len(route.prefix):])
+            return route, upstream_path
+    return None
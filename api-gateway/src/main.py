@@ -1,11 +1,73 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 import httpx
 import asyncio
 from typing import Optional, Dict, Any
+from src.core.config import settings
+from src.services.http_pool import http_pool, get_http_client
+from src.services.streaming_proxy import stream_request
+from src.services.response_cache import response_cache, cached_request, coalesced_request
+from src.services.single_flight import SingleFlight
+from src.services.token_verifier import TokenVerifier, TokenVerificationError
+from src.services.health import HealthMonitor
+from src.services.resilience import resilience
+from src.middleware.rate_limit import RateLimitMiddleware, RateLimiter, RateLimit, RedisRateLimitBackend
+from src.services.metrics import registry, MetricsMiddleware
+from src.services.tracing import tracer, TracingMiddleware
+from src.routes.batch_routes import router as batch_router
 
-app = FastAPI(title="Vel Arte API Gateway", version="2.0.0")
+# URLs de los microservicios
+AUTH_SERVICE_URL = settings.auth_service_url
+PRODUCT_SERVICE_URL = settings.product_service_url
+BUSINESS_RULES_SERVICE_URL = settings.business_rules_service_url
+
+health_monitor = HealthMonitor({
+    "auth-service": AUTH_SERVICE_URL,
+    "product-service": PRODUCT_SERVICE_URL,
+    "business-rules-service": BUSINESS_RULES_SERVICE_URL
+})
+
+token_verifier = TokenVerifier(
+    secret_key=settings.shared_secret_key,
+    algorithms=settings.verification_algorithms,
+    jwks_url=settings.jwks_url,
+    cache_size=settings.token_cache_size,
+    jwks_refresh_interval=settings.jwks_refresh_interval
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Un pool keep-alive por microservicio, reutilizado por todas las rutas
+    await http_pool.start([AUTH_SERVICE_URL, PRODUCT_SERVICE_URL, BUSINESS_RULES_SERVICE_URL])
+    health_monitor.start()
+    yield
+    await health_monitor.stop()
+    await token_verifier.close()
+    await http_pool.close()
 
+app = FastAPI(title="Vel Arte API Gateway", version="2.0.0", lifespan=lifespan)
+
+rate_limiter = RateLimiter(
+    requests_per_minute=settings.rate_limit_requests,
+    period=settings.rate_limit_period,
+    user_requests_per_minute=settings.rate_limit_user_requests,
+    max_clients=settings.rate_limit_max_clients,
+    route_limits={
+        "/auth/login": RateLimit(10, 60),
+        "/auth/register": RateLimit(5, 60),
+        "/calculations/recalculate-all": RateLimit(2, 60),
+    },
+    backend=(
+        RedisRateLimitBackend(settings.rate_limit_redis_url)
+        if settings.rate_limit_redis_url else None
+    )
+)
+# /batch cobra cada sub-petición contra los mismos buckets de ruta y usuario
+app.state.rate_limiter = rate_limiter
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+
+# CORS envuelve al rate limit: los 429 llevan headers CORS y los preflight no consumen tokens
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -14,10 +76,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# URLs de los microservicios
-AUTH_SERVICE_URL = "http://auth-service:8000"
-PRODUCT_SERVICE_URL = "http://product-service:8001"
-BUSINESS_RULES_SERVICE_URL = "http://business-rules-service:8003"
+# Debe ir después del rate limit para que también mida las respuestas 429
+app.add_middleware(MetricsMiddleware)
+# Último en agregarse = más externo: también traza las peticiones rechazadas por rate limit
+app.add_middleware(TracingMiddleware, tracer=tracer)
+
+# Batch/multiplexación de sub-peticiones (POST /batch)
+app.include_router(batch_router)
+
+# GETs idénticos en curso comparten una sola llamada al microservicio
+forward_single_flight = SingleFlight()
 
 async def forward_request(
     service_url: str, 
@@ -27,40 +95,50 @@ async def forward_request(
     **kwargs
 ):
     """Reenvía peticiones a los microservicios"""
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            response = await client.request(
-                method, 
-                f"{service_url}{path}", 
-                headers=headers,
-                **kwargs
-            )
-            
-            if response.status_code >= 400:
-                return {"error": response.text, "status_code": response.status_code}
-            
-            return response.json()
-        except Exception as e:
-            raise HTTPException(status_code=503, detail=f"Service unavailable: {str(e)}")
+    if method == "GET":
+        key = (
+            service_url,
+            path,
+            str(httpx.QueryParams(kwargs.get("params"))),
+            (headers or {}).get("authorization")
+        )
+        return await forward_single_flight.do(
+            key, lambda: _send_request(service_url, path, method, headers, **kwargs)
+        )
+    return await _send_request(service_url, path, method, headers, **kwargs)
+
+async def _send_request(
+    service_url: str, 
+    path: str, 
+    method: str, 
+    headers: Optional[Dict],
+    **kwargs
+):
+    client = get_http_client(service_url)
+    try:
+        upstream_request = client.build_request(
+            method, 
+            f"{service_url}{path}", 
+            headers=headers,
+            timeout=resilience.timeout_for(path),
+            **kwargs
+        )
+        response = await resilience.send(client, service_url, upstream_request)
+        
+        if response.status_code >= 400:
+            return {"error": response.text, "status_code": response.status_code}
+        
+        return response.json()
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Service unavailable: {str(e)}")
 
 # Health check mejorado
 @app.get("/health")
 async def health_check():
-    services_status = {}
-    
-    services = [
-        ("auth-service", AUTH_SERVICE_URL),
-        ("product-service", PRODUCT_SERVICE_URL),
-        ("business-rules-service", BUSINESS_RULES_SERVICE_URL)
-    ]
-    
-    for service_name, service_url in services:
-        try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(f"{service_url}/health")
-                services_status[service_name] = "healthy" if response.status_code == 200 else "unhealthy"
-        except:
-            services_status[service_name] = "unhealthy"
+    # Estado cacheado por el monitor en segundo plano (sondeos concurrentes)
+    services_status = await health_monitor.get_status()
     
     overall_status = "healthy" if all(status == "healthy" for status in services_status.values()) else "degraded"
     
@@ -68,9 +146,23 @@ async def health_check():
         "status": overall_status,
         "services": services_status,
         "gateway": "operational",
+        "checked_at": health_monitor.checked_at,
+        "circuit_breakers": {
+            name: resilience.breaker(url).snapshot()
+            for name, url in health_monitor.services.items()
+        },
+        "resilience": {
+            "in_flight": resilience.in_flight,
+            "shed_requests": resilience.shed_count
+        },
         "version": "2.0.0"
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Métricas del gateway en formato de texto de Prometheus"""
+    return Response(registry.render(), media_type="text/plain; version=0.0.4")
+
 # === AUTH ROUTES ===
 @app.post("/auth/register")
 async def register(request: Request):
@@ -84,19 +176,27 @@ async def login(request: Request):
 
 @app.get("/auth/me")
 async def get_current_user(request: Request):
-    headers = dict(request.headers)
-    return await forward_request(AUTH_SERVICE_URL, "/auth/me", "GET", headers=headers)
+    # Se responde con los claims verificados localmente, sin ir al auth-service
+    authorization = request.headers.get("authorization", "")
+    if not authorization.lower().startswith("bearer "):
+        raise HTTPException(status_code=401, detail="Token requerido")
+    try:
+        return await token_verifier.verify(authorization[7:])
+    except TokenVerificationError:
+        raise HTTPException(status_code=401, detail="Token inválido o expirado")
 
 # === PRODUCT ROUTES ===
 @app.get("/insumos")
-async def get_insumos():
-    return await forward_request(PRODUCT_SERVICE_URL, "/insumos/", "GET")
+async def get_insumos(request: Request):
+    return await cached_request(PRODUCT_SERVICE_URL, "/insumos/", request)
 
 @app.post("/insumos")
 async def create_insumo(request: Request):
     headers = dict(request.headers)
     body = await request.json()
-    return await forward_request(PRODUCT_SERVICE_URL, "/insumos/", "POST", headers=headers, json=body)
+    result = await forward_request(PRODUCT_SERVICE_URL, "/insumos/", "POST", headers=headers, json=body)
+    response_cache.invalidate("/insumos")
+    return result
 
 @app.get("/insumos/{insumo_id}")
 async def get_insumo(insumo_id: str):
@@ -106,40 +206,48 @@ async def get_insumo(insumo_id: str):
 async def update_insumo(insumo_id: str, request: Request):
     headers = dict(request.headers)
     body = await request.json()
-    return await forward_request(PRODUCT_SERVICE_URL, f"/insumos/{insumo_id}", "PUT", headers=headers, json=body)
+    result = await forward_request(PRODUCT_SERVICE_URL, f"/insumos/{insumo_id}", "PUT", headers=headers, json=body)
+    response_cache.invalidate("/insumos")
+    return result
 
 @app.delete("/insumos/{insumo_id}")
 async def delete_insumo(insumo_id: str, request: Request):
     headers = dict(request.headers)
-    return await forward_request(PRODUCT_SERVICE_URL, f"/insumos/{insumo_id}", "DELETE", headers=headers)
+    result = await forward_request(PRODUCT_SERVICE_URL, f"/insumos/{insumo_id}", "DELETE", headers=headers)
+    response_cache.invalidate("/insumos")
+    return result
 
 # === BUSINESS RULES ROUTES ===
 
 # Configuraciones
 @app.get("/configurations")
-async def get_configurations(category: Optional[str] = None):
-    path = "/configurations"
-    if category:
-        path += f"?category={category}"
-    return await forward_request(BUSINESS_RULES_SERVICE_URL, path, "GET")
+async def get_configurations(request: Request, category: Optional[str] = None):
+    # `category` llega al microservicio como query param
+    return await cached_request(BUSINESS_RULES_SERVICE_URL, "/configurations", request)
 
 @app.put("/configurations/{key}")
 async def update_configuration(key: str, request: Request):
     body = await request.json()
-    return await forward_request(
+    result = await forward_request(
         BUSINESS_RULES_SERVICE_URL, 
         f"/configurations/{key}", 
         "PUT", 
         params=body
     )
+    response_cache.invalidate("/configurations", "/calculations/params")
+    return result
 
 @app.get("/configurations/{key}/history")
-async def get_configuration_history(key: str):
-    return await forward_request(BUSINESS_RULES_SERVICE_URL, f"/configurations/{key}/history", "GET")
+async def get_configuration_history(key: str, request: Request):
+    return await forward_request(
+        BUSINESS_RULES_SERVICE_URL, f"/configurations/{key}/history", "GET", params=request.query_params
+    )
 
 @app.post("/configurations/initialize")
 async def initialize_configurations():
-    return await forward_request(BUSINESS_RULES_SERVICE_URL, "/configurations/initialize", "POST")
+    result = await forward_request(BUSINESS_RULES_SERVICE_URL, "/configurations/initialize", "POST")
+    response_cache.invalidate("/configurations", "/calculations/params")
+    return result
 
 # Cálculos
 @app.post("/calculations/product/{producto_id}")
@@ -156,8 +264,38 @@ async def calculate_product_price(producto_id: str, request: Request):
 
 @app.post("/calculations/recalculate-all")
 async def recalculate_all_products(request: Request):
-    headers = dict(request.headers)
-    return await forward_request(BUSINESS_RULES_SERVICE_URL, "/calculations/recalculate-all", "POST", headers=headers)
+    # Responde 202 con el job id; se reenvía tal cual (status, Location y query ?resume_after)
+    return await stream_request(BUSINESS_RULES_SERVICE_URL, "/calculations/recalculate-all", request)
+
+@app.post("/calculations/reprice")
+async def reprice_affected_products(request: Request):
+    return await stream_request(BUSINESS_RULES_SERVICE_URL, "/calculations/reprice", request)
+
+@app.get("/jobs")
+async def list_jobs(request: Request):
+    return await forward_request(BUSINESS_RULES_SERVICE_URL, "/jobs", "GET", params=request.query_params)
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    return await forward_request(BUSINESS_RULES_SERVICE_URL, f"/jobs/{job_id}", "GET")
+
+@app.get("/precios")
+async def list_precios(request: Request):
+    # Sin caché de respuestas: las filas cambian con cada recálculo en segundo plano
+    return await forward_request(BUSINESS_RULES_SERVICE_URL, "/precios", "GET", params=request.query_params)
+
+@app.get("/precios/{producto_id}")
+async def get_precio(producto_id: str):
+    return await forward_request(BUSINESS_RULES_SERVICE_URL, f"/precios/{producto_id}", "GET")
+
+@app.get("/calculations/export")
+async def export_catalog_prices(request: Request):
+    # NDJSON generado por lotes: se reenvía chunk a chunk sin acumularlo en el gateway
+    return await stream_request(BUSINESS_RULES_SERVICE_URL, "/calculations/export", request)
+
+@app.post("/calculations/simulation")
+async def simulate_price_grid(request: Request):
+    return await stream_request(BUSINESS_RULES_SERVICE_URL, "/calculations/simulation", request)
 
 @app.get("/calculations/simulation/{producto_id}")
 async def simulate_price_changes(producto_id: str, request: Request):
@@ -170,21 +308,29 @@ async def simulate_price_changes(producto_id: str, request: Request):
     )
 
 @app.get("/calculations/params")
-async def get_calculation_params():
-    return await forward_request(BUSINESS_RULES_SERVICE_URL, "/calculations/params", "GET")
+async def get_calculation_params(request: Request):
+    return await cached_request(BUSINESS_RULES_SERVICE_URL, "/calculations/params", request)
 
 # Legacy routes para compatibilidad
 @app.get("/moldes")
-async def get_moldes():
-    return await forward_request(PRODUCT_SERVICE_URL, "/moldes", "GET")
+async def get_moldes(request: Request):
+    return await cached_request(PRODUCT_SERVICE_URL, "/moldes", request)
+
+@app.put("/moldes/{molde_id}")
+async def update_molde(molde_id: str, request: Request):
+    headers = dict(request.headers)
+    body = await request.json()
+    result = await forward_request(PRODUCT_SERVICE_URL, f"/moldes/{molde_id}", "PUT", headers=headers, json=body)
+    response_cache.invalidate("/moldes")
+    return result
 
 @app.get("/colores")
-async def get_colores():
-    return await forward_request(PRODUCT_SERVICE_URL, "/colores", "GET")
+async def get_colores(request: Request):
+    return await cached_request(PRODUCT_SERVICE_URL, "/colores", request)
 
 @app.get("/resumen-completo")
-async def get_resumen():
-    return await forward_request(PRODUCT_SERVICE_URL, "/resumen-completo", "GET")
+async def get_resumen(request: Request):
+    return await coalesced_request(PRODUCT_SERVICE_URL, "/resumen-completo", request)
 
 @app.get("/")
 async def root():
@@ -195,7 +341,8 @@ async def root():
         "services": {
             "auth": "/auth/*",
             "products": "/insumos, /moldes, /colores",
-            "business_rules": "/configurations, /calculations"
+            "business_rules": "/configurations, /calculations, /jobs, /precios",
+            "batch": "/batch"
         },
         "documentation": "/docs"
     }
@@ -1,37 +1,301 @@
-from fastapi import Request, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
-from collections import defaultdict
-from datetime import datetime, timedelta
-import os
-
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, requests_per_minute: int = 60):
-        super().__init__(app)
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Optional, Tuple
+import hashlib
+import math
+import time
+from ..services.metrics import RATE_LIMIT_REJECTIONS
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Límite de `requests` peticiones por ventana de `period` segundos"""
+    requests: int
+    period: float = 60.0
+    
+    @property
+    def emission_interval(self) -> float:
+        return self.period / self.requests
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    allowed: bool
+    remaining: int
+    retry_after: float
+
+def gcra(tat: Optional[float], now: float, limit: RateLimit) -> Tuple[float, RateLimitResult]:
+    """Generic Cell Rate Algorithm: un token bucket que solo guarda un float por cliente
+    
+    `tat` (theoretical arrival time) es el instante en que el bucket estaría lleno otra vez.
+    Devuelve el nuevo TAT y el resultado; el TAT no avanza si la petición se rechaza.
+    """
+    interval = limit.emission_interval
+    tat = now if tat is None or tat < now else tat
+    new_tat = tat + interval
+    allow_at = new_tat - limit.period
+    
+    if now < allow_at:
+        return tat, RateLimitResult(False, 0, allow_at - now)
+    
+    remaining = int((limit.period - (new_tat - now)) / interval)
+    return new_tat, RateLimitResult(True, remaining, 0.0)
+
+class RateLimitBackend:
+    """Almacenamiento del estado de los buckets (en proceso o compartido entre workers)"""
+    
+    async def hit(self, key: str, limit: RateLimit) -> RateLimitResult:
+        raise NotImplementedError
+    
+    async def refund(self, key: str, limit: RateLimit):
+        """Devuelve el token de un `hit` aceptado cuyo resultado no se usó"""
+        raise NotImplementedError
+    
+    async def close(self):
+        pass
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Backend en proceso con memoria acotada (LRU de `max_keys` clientes)
+    
+    También sirve como backend "compartido" falso en pruebas: varias instancias del
+    middleware pueden recibir el mismo objeto.
+    """
+    
+    def __init__(self, max_keys: int = 10000, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+    
+    def __len__(self) -> int:
+        return len(self._tats)
+    
+    async def hit(self, key: str, limit: RateLimit) -> RateLimitResult:
+        return self.hit_now(key, limit)
+    
+    def hit_now(self, key: str, limit: RateLimit) -> RateLimitResult:
+        now = self.clock()
+        tats = self._tats
+        tat = tats.get(key)
+        new_tat, result = gcra(tat, now, limit)
+        
+        if tat is None:
+            self._evict(now)
+        tats[key] = new_tat
+        tats.move_to_end(key)
+        return result
+    
+    async def refund(self, key: str, limit: RateLimit):
+        self.refund_now(key, limit)
+    
+    def refund_now(self, key: str, limit: RateLimit):
+        tat = self._tats.get(key)
+        if tat is not None:
+            self._tats[key] = tat - limit.emission_interval
+    
+    def _evict(self, now: float):
+        tats = self._tats
+        # Los clientes inactivos con el bucket ya lleno se pueden olvidar sin cambiar
+        # ninguna decisión futura; se revisan como máximo dos por inserción (O(1))
+        for _ in range(2):
+            if not tats:
+                return
+            key, tat = next(iter(tats.items()))
+            if tat > now:
+                break
+            del tats[key]
+        
+        while len(tats) >= self.max_keys:
+            tats.popitem(last=False)
+
+# GCRA atómico en Redis; usa el reloj del servidor para que todos los workers coincidan
+REDIS_GCRA_SCRIPT = """
+local period = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if tat == nil or tat < now then tat = now end
+local new_tat = tat + interval
+local allow_at = new_tat - period
+if now < allow_at then
+    return {0, 0, tostring(allow_at - now)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, math.floor((period - (new_tat - now)) / interval), '0'}
+"""
+
+# Retrocede el TAT un intervalo (y su expiración) para devolver un token ya consumido
+REDIS_GCRA_REFUND_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local tat = tonumber(redis.call('GET', KEYS[1]))
+local ttl = redis.call('PTTL', KEYS[1])
+if tat == nil or ttl <= 0 then return 0 end
+local new_ttl = ttl - math.floor(interval * 1000)
+if new_ttl <= 0 then
+    redis.call('DEL', KEYS[1])
+else
+    redis.call('SET', KEYS[1], tostring(tat - interval), 'PX', new_ttl)
+end
+return 1
+"""
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Backend compartido entre workers del gateway (requiere el paquete opcional `redis`)"""
+    
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("El backend de rate limit compartido requiere el paquete `redis`")
+        
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+        self._script = self.client.register_script(REDIS_GCRA_SCRIPT)
+        self._refund_script = self.client.register_script(REDIS_GCRA_REFUND_SCRIPT)
+    
+    async def hit(self, key: str, limit: RateLimit) -> RateLimitResult:
+        allowed, remaining, retry_after = await self._script(
+            keys=[self.prefix + key],
+            args=[limit.period, limit.emission_interval]
+        )
+        return RateLimitResult(bool(allowed), int(remaining), float(retry_after))
+    
+    async def refund(self, key: str, limit: RateLimit):
+        await self._refund_script(keys=[self.prefix + key], args=[limit.emission_interval])
+    
+    async def close(self):
+        await self.client.close()
+
+def bearer_token_identity(request: Request) -> Optional[str]:
+    """Identifica al usuario por un hash de su token Bearer (sin verificarlo)"""
+    authorization = request.headers.get("authorization")
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    return hashlib.sha256(authorization[7:].encode()).hexdigest()[:32]
+
+@dataclass(frozen=True)
+class RateLimitRejection:
+    """Bucket que rechazó la petición"""
+    key: str
+    limit: RateLimit
+    result: RateLimitResult
+    
+    @property
+    def detail(self) -> str:
+        return f"Rate limit exceeded. Max {self.limit.requests} requests per {self.limit.period:g} seconds."
+    
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {
+            "Retry-After": str(math.ceil(self.result.retry_after)),
+            "X-RateLimit-Limit": str(self.limit.requests),
+            "X-RateLimit-Remaining": "0"
+        }
+
+class RateLimiter:
+    """Buckets GCRA por IP, por ruta y por usuario sobre un backend compartido
+    
+    Lo usan el middleware (una vez por petición HTTP) y `/batch` (una vez por
+    sub-petición, sin el bucket de IP que ya pagó el batch).
+    """
+    
+    def __init__(
+        self,
+        requests_per_minute: int = 60,
+        period: float = 60.0,
+        user_requests_per_minute: Optional[int] = None,
+        route_limits: Optional[Dict[str, RateLimit]] = None,
+        backend: Optional[RateLimitBackend] = None,
+        max_clients: int = 10000,
+        identify_user: Callable[[Request], Optional[str]] = bearer_token_identity
+    ):
         self.requests_per_minute = requests_per_minute
-        self.requests = defaultdict(list)
-    
-    async def dispatch(self, request: Request, call_next):
-        # Get client IP
-        client_ip = request.client.host
-        now = datetime.now()
-        
-        # Clean old requests
-        minute_ago = now - timedelta(minutes=1)
-        self.requests[client_ip] = [
-            req_time for req_time in self.requests[client_ip]
-            if req_time > minute_ago
-        ]
-        
-        # Check rate limit
-        if len(self.requests[client_ip]) >= self.requests_per_minute:
-            raise HTTPException(
+        self.default_limit = RateLimit(requests_per_minute, period)
+        self.user_limit = (
+            RateLimit(user_requests_per_minute, period) if user_requests_per_minute else None
+        )
+        # Prefijos más largos primero para que gane la regla más específica
+        self.route_limits = sorted(
+            (route_limits or {}).items(), key=lambda item: len(item[0]), reverse=True
+        )
+        self.backend = backend or InMemoryRateLimitBackend(max_keys=max_clients)
+        self.identify_user = identify_user
+    
+    def _route_limit(self, path: str) -> Optional[Tuple[str, RateLimit]]:
+        for prefix, limit in self.route_limits:
+            if path.startswith(prefix):
+                return prefix, limit
+        return None
+    
+    async def check(
+        self,
+        request: Request,
+        path: Optional[str] = None,
+        per_ip: bool = True
+    ) -> Optional[RateLimitRejection]:
+        """Consume un token de cada bucket que aplica; devuelve el primero que rechaza
+        
+        Si algún bucket rechaza, los tokens ya consumidos en los anteriores se devuelven.
+        """
+        client_ip = request.client.host if request.client else "unknown"
+        
+        checks = [(f"ip:{client_ip}", self.default_limit)] if per_ip else []
+        route = self._route_limit(path if path is not None else request.url.path)
+        if route:
+            prefix, limit = route
+            checks.append((f"route:{prefix}:{client_ip}", limit))
+        if self.user_limit:
+            user = self.identify_user(request)
+            if user:
+                checks.append((f"user:{user}", self.user_limit))
+        
+        charged = []
+        for key, limit in checks:
+            result = await self.backend.hit(key, limit)
+            if not result.allowed:
+                # Un rechazo no debe gastar los tokens de los buckets que sí aceptaron
+                for charged_key, charged_limit in charged:
+                    await self.backend.refund(charged_key, charged_limit)
+                RATE_LIMIT_REJECTIONS.inc(key.split(":", 1)[0])
+                return RateLimitRejection(key, limit, result)
+            charged.append((key, limit))
+        return None
+
+class RateLimitMiddleware:
+    """Rate limiting GCRA por IP, por ruta y por usuario con costo O(1) por petición
+    
+    Es un middleware ASGI puro: responde 429 con `Retry-After` en vez de lanzar
+    HTTPException dentro de BaseHTTPMiddleware. Debe quedar dentro de CORSMiddleware
+    para que los 429 lleven los headers CORS; los preflight OPTIONS no se cuentan.
+    """
+    
+    def __init__(
+        self,
+        app,
+        limiter: RateLimiter,
+        exempt_paths: Iterable[str] = ("/health", "/metrics")
+    ):
+        self.app = app
+        self.limiter = limiter
+        self.exempt_paths = frozenset(exempt_paths)
+    
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["path"] in self.exempt_paths
+            or scope["method"] == "OPTIONS"
+        ):
+            await self.app(scope, receive, send)
+            return
+        
+        rejection = await self.limiter.check(Request(scope))
+        if rejection is not None:
+            response = JSONResponse(
                 status_code=429,
-                detail=f"Rate limit exceeded. Max {self.requests_per_minute} requests per minute."
+                content={"detail": rejection.detail},
+                headers=rejection.headers
             )
+            await response(scope, receive, send)
+            return
         
-        # Add current request
-        self.requests[client_ip].append(now)
-        
-        # Process request
-        response = await call_next(request)
-        return response
+        await self.app(scope, receive, send)
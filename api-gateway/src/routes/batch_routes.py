@@ -0,0 +1,157 @@
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+import asyncio
+import math
+import httpx
+from ..core.config import settings
+from ..core.routing import resolve_upstream
+from ..services.http_pool import get_http_client
+from ..services.resilience import resilience
+from ..services.response_cache import response_cache
+from ..services.tracing import tracer
+
+router = APIRouter()
+
+# Headers del batch que se propagan a cada sub-petición
+FORWARDED_HEADERS = ("authorization", "accept-language")
+# Únicos headers que una sub-petición puede fijar por su cuenta (no host, authorization, traceparent...)
+ITEM_HEADERS = frozenset({"accept", "accept-language", "content-type", "if-none-match"})
+
+class BatchItem(BaseModel):
+    """Sub-petición dentro de un batch"""
+    id: Optional[str] = None
+    method: str = "GET"
+    path: str
+    query: Optional[Dict[str, Any]] = None
+    body: Optional[Any] = None
+    headers: Optional[Dict[str, str]] = None
+
+class BatchRequest(BaseModel):
+    requests: List[BatchItem] = Field(..., min_length=1)
+
+class BatchItemResult(BaseModel):
+    id: Optional[str] = None
+    status: int
+    body: Any = None
+
+def _decode_body(response: httpx.Response) -> Any:
+    if not response.content:
+        return None
+    if response.headers.get("content-type", "").startswith("application/json"):
+        try:
+            return response.json()
+        except ValueError:
+            pass
+    return response.text
+
+def _invalid_path(path: str) -> Optional[str]:
+    """Motivo por el que el path no se acepta, o None si es canónico
+    
+    httpx colapsa los segmentos `.`/`..` al armar la URL, así que un path como
+    `/jobs/../calculations/recalculate-all` se limitaría como `/jobs` pero llegaría
+    a otra ruta. Solo se aceptan paths absolutos ya normalizados.
+    """
+    if not path.startswith("/"):
+        return "El path debe empezar con /"
+    if any(token in path for token in ("//", "?", "#", "\\", "%")):
+        return "El path no puede contener //, ?, #, \\ ni caracteres codificados"
+    if any(segment in (".", "..") for segment in path.split("/")):
+        return "El path no puede contener segmentos . o .."
+    return None
+
+async def _dispatch(item: BatchItem, request: Request, base_headers: Dict[str, str]) -> BatchItemResult:
+    method = item.method.upper()
+    invalid = _invalid_path(item.path)
+    if invalid is not None:
+        return BatchItemResult(id=item.id, status=400, body={"detail": invalid})
+    
+    resolved = resolve_upstream(item.path)
+    if resolved is None:
+        return BatchItemResult(id=item.id, status=404, body={"detail": f"Ruta {item.path} no encontrada"})
+    
+    # El batch ya pagó el bucket de IP; cada sub-petición paga los de su ruta y usuario
+    limiter = getattr(request.app.state, "rate_limiter", None)
+    if limiter is not None:
+        rejection = await limiter.check(request, path=item.path, per_ip=False)
+        if rejection is not None:
+            return BatchItemResult(
+                id=item.id,
+                status=429,
+                body={"detail": rejection.detail, "retry_after": math.ceil(rejection.result.retry_after)}
+            )
+    
+    route, upstream_path = resolved
+    headers = {
+        **base_headers,
+        **{
+            name.lower(): value for name, value in (item.headers or {}).items()
+            if name.lower() in ITEM_HEADERS
+        }
+    }
+    client = get_http_client(route.service_url)
+    
+    params, body = item.query, item.body
+    if method in route.body_as_params and isinstance(body, dict):
+        params, body = {**body, **(params or {})}, None
+    
+    try:
+        upstream_request = client.build_request(
+            method,
+            f"{route.service_url}{upstream_path}",
+            headers=headers,
+            params=params,
+            json=body,
+            timeout=resilience.timeout_for(upstream_path)
+        )
+        response = await resilience.send(client, route.service_url, upstream_request)
+    except HTTPException as e:
+        return BatchItemResult(id=item.id, status=e.status_code, body={"detail": e.detail})
+    except httpx.HTTPError as e:
+        return BatchItemResult(id=item.id, status=503, body={"detail": f"Service unavailable: {str(e)}"})
+    
+    if method != "GET" and response.status_code < 400:
+        if route.invalidates:
+            response_cache.invalidate(*route.invalidates)
+    
+    return BatchItemResult(id=item.id, status=response.status_code, body=_decode_body(response))
+
+@router.post("/batch")
+async def batch(batch_request: BatchRequest, request: Request):
+    """Ejecuta varias sub-peticiones en paralelo y devuelve todos los resultados juntos
+    
+    Cada resultado trae su propio status; una sub-petición fallida no afecta a las demás.
+    Los límites por ruta y por usuario se aplican a cada sub-petición (429 por ítem).
+    """
+    if len(batch_request.requests) > settings.batch_max_requests:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Máximo {settings.batch_max_requests} sub-peticiones por batch"
+        )
+    
+    base_headers = {
+        name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers
+    }
+    semaphore = asyncio.Semaphore(settings.batch_concurrency)
+    
+    async def run(item: BatchItem) -> BatchItemResult:
+        async with semaphore:
+            # Cada sub-petición cuelga de su propio span dentro de la traza del batch
+            span = tracer.start_span(
+                "batch.item",
+                attributes={"batch.item_id": item.id, "http.method": item.method.upper(), "http.target": item.path}
+            )
+            token = tracer.activate(span)
+            result = None
+            try:
+                result = await _dispatch(item, request, base_headers)
+                return result
+            finally:
+                if result is not None:
+                    span.attributes["http.status_code"] = result.status
+                    if result.status >= 500:
+                        span.status = "error"
+                tracer.finish(span, token)
+    
+    results = await asyncio.gather(*(run(item) for item in batch_request.requests))
+    return {"results": results}
@@ -2,6 +2,8 @@ from fastapi import APIRouter, Request, HTTPException
 import httpx
 from typing import Any
 import json
+from ..services.streaming_proxy import stream_request
+from ..services.response_cache import response_cache
 
 router = APIRouter()
 
@@ -20,28 +22,8 @@ async def proxy_request(service: str, path: str, request: Request):
     if service not in SERVICES:
         raise HTTPException(status_code=404, detail=f"Servicio {service} no encontrado")
     
-    service_url = SERVICES[service]
-    target_url = f"{service_url}/{path}"
-    
-    # Obtener headers
-    headers = dict(request.headers)
-    headers.pop("host", None)  # Remover host header
-    
-    # Obtener body si existe
-    body = None
-    if request.method in ["POST", "PUT", "PATCH"]:
-        body = await request.body()
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.request(
-            method=request.method,
-            url=target_url,
-            headers=headers,
-            content=body,
-            params=request.query_params
-        )
-    
-    return response
+    # Pasa body y respuesta chunk a chunk, sin cargarlos completos en memoria
+    return await stream_request(SERVICES[service], f"/{path}", request)
 
 # Rutas de autenticación
 @router.post("/auth/login")
@@ -49,14 +31,12 @@ async def proxy_request(service: str, path: str, request: Request):
 @router.get("/auth/verify")
 async def auth_proxy(request: Request):
     path = request.url.path.replace("/auth/", "auth/")
-    response = await proxy_request("auth", path, request)
-    return response.json()
+    return await proxy_request("auth", path, request)
 
 # Rutas de productos
 @router.api_route("/products/{path:path}", methods=["GET", "POST", "PUT", "DELETE"])
 async def products_proxy(path: str, request: Request):
-    response = await proxy_request("products", f"products/{path}", request)
-    return response.json()
+    return await proxy_request("products", f"products/{path}", request)
 
 @router.api_route("/moldes", methods=["GET", "POST"])
 @router.api_route("/moldes/{molde_id}", methods=["GET", "PUT", "DELETE"])
@@ -67,4 +47,6 @@ async def moldes_proxy(request: Request, molde_id: str = None):
         path = "products/moldes"
     
     response = await proxy_request("products", path, request)
-    return response.json()
+    if request.method != "GET":
+        response_cache.invalidate("/moldes")
+    return response
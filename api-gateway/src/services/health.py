@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Optional
+from ..core.config import settings
+from .http_pool import get_http_client
+
+logger = logging.getLogger(__name__)
+
+class HealthMonitor:
+    """Sondea la salud de los microservicios en paralelo y en segundo plano
+    
+    El endpoint /health responde desde el estado cacheado; solo sondea en línea
+    cuando el último resultado es más viejo que el TTL (ej: el monitor no arrancó).
+    """
+    
+    def __init__(
+        self,
+        services: Dict[str, str],
+        interval: float = settings.health_check_interval,
+        timeout: float = settings.health_check_timeout,
+        ttl: float = settings.health_cache_ttl
+    ):
+        self.services = services
+        self.interval = interval
+        self.timeout = timeout
+        self.ttl = ttl
+        self.services_status: Dict[str, str] = {name: "unknown" for name in services}
+        self.checked_at: Optional[datetime] = None
+        self._last_probe = float("-inf")
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+    
+    async def _probe(self, service_url: str) -> str:
+        try:
+            client = get_http_client(service_url)
+            response = await client.get(f"{service_url}/health", timeout=self.timeout)
+            return "healthy" if response.status_code == 200 else "unhealthy"
+        except Exception:
+            return "unhealthy"
+    
+    async def probe_all(self) -> Dict[str, str]:
+        """Sondea todos los servicios a la vez; tarda lo que el más lento (máx. timeout)"""
+        names = list(self.services)
+        results = await asyncio.gather(*(self._probe(self.services[name]) for name in names))
+        
+        self.services_status = dict(zip(names, results))
+        self.checked_at = datetime.utcnow()
+        self._last_probe = time.monotonic()
+        return self.services_status
+    
+    def is_stale(self) -> bool:
+        return time.monotonic() - self._last_probe > self.ttl
+    
+    async def get_status(self) -> Dict[str, str]:
+        """Devuelve el estado cacheado, refrescándolo solo si expiró"""
+        if self.is_stale():
+            async with self._lock:
+                # Otra petición pudo haber refrescado mientras esperábamos el lock
+                if self.is_stale():
+                    await self.probe_all()
+        return self.services_status
+    
+    async def _run(self):
+        while True:
+            try:
+                await self.probe_all()
+            except Exception as e:
+                logger.warning(f"Error sondeando servicios: {e}")
+            await asyncio.sleep(self.interval)
+    
+    def start(self):
+        """Arranca el sondeo periódico en segundo plano"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
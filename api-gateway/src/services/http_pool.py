@@ -0,0 +1,102 @@
+import httpx
+from typing import Dict, Iterable
+from urllib.parse import urlsplit
+from ..core.config import settings
+from .metrics import registry, CallbackGauge
+
+# HTTP/2 solo está disponible si el paquete opcional `h2` está instalado
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+def _pool_connections(client: httpx.AsyncClient):
+    """Conexiones del pool de httpcore, o None si el transporte no permite inspeccionarlo
+    
+    httpx no expone contadores del pool; se leen atributos internos (`_transport._pool`)
+    que pueden cambiar entre versiones o no existir con un transporte propio.
+    """
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = getattr(pool, "connections", None)
+    if connections is None:
+        return None
+    try:
+        connections = list(connections)
+        if not all(callable(getattr(connection, "is_idle", None)) for connection in connections):
+            return None
+    except TypeError:
+        return None
+    return connections
+
+class UpstreamPool:
+    """Mantiene un cliente HTTP keep-alive por microservicio, compartido por todas las rutas"""
+    
+    def __init__(
+        self,
+        max_connections: int = settings.upstream_max_connections,
+        max_keepalive_connections: int = settings.upstream_max_keepalive_connections,
+        keepalive_expiry: float = settings.upstream_keepalive_expiry,
+        timeout: float = settings.upstream_timeout,
+        connect_timeout: float = settings.upstream_connect_timeout,
+        http2: bool = settings.upstream_http2
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.clients: Dict[str, httpx.AsyncClient] = {}
+    
+    def _build_client(self, service_url: str) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=service_url,
+            limits=self.limits,
+            timeout=self.timeout,
+            http2=self.http2
+        )
+    
+    async def start(self, service_urls: Iterable[str]):
+        """Crea los pools de los servicios conocidos al arrancar el gateway"""
+        for service_url in service_urls:
+            self.get_client(service_url)
+    
+    def get_client(self, service_url: str) -> httpx.AsyncClient:
+        """Obtiene el cliente del servicio, creándolo si aún no existe"""
+        client = self.clients.get(service_url)
+        if client is None or client.is_closed:
+            client = self._build_client(service_url)
+            self.clients[service_url] = client
+        return client
+    
+    def connection_stats(self):
+        """Conexiones del pool por servicio y estado (activas/ociosas), para /metrics"""
+        for service_url, client in self.clients.items():
+            service = urlsplit(service_url).hostname or service_url
+            connections = _pool_connections(client)
+            if connections is not None:
+                idle = sum(1 for connection in connections if connection.is_idle())
+                yield (service, "active"), len(connections) - idle
+                yield (service, "idle"), idle
+            yield (service, "max"), self.limits.max_connections
+    
+    async def close(self):
+        """Cierra todas las conexiones abiertas"""
+        for client in self.clients.values():
+            await client.aclose()
+        self.clients.clear()
+
+http_pool = UpstreamPool()
+
+registry.register(CallbackGauge(
+    "gateway_upstream_pool_connections",
+    "Conexiones del pool hacia cada microservicio por estado",
+    ("service", "state"),
+    http_pool.connection_stats
+))
+
+def get_http_client(service_url: str) -> httpx.AsyncClient:
+    """Obtiene el cliente compartido para un microservicio"""
+    return http_pool.get_client(service_url)
@@ -0,0 +1,203 @@
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+import time
+
+# Buckets en segundos pensados para latencias de un gateway (1 ms a 30 s)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Metric:
+    kind = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+    
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+class Counter(Metric):
+    """Contador monótono por combinación de labels"""
+    kind = "counter"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+    
+    def inc(self, *labels: str, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+    
+    def _samples(self):
+        for labels, value in self.values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+class Gauge(Counter):
+    """Valor que sube y baja (ej: peticiones en vuelo)"""
+    kind = "gauge"
+    
+    def dec(self, *labels: str, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) - amount
+    
+    def set(self, *labels: str, value: float):
+        self.values[labels] = value
+
+class CallbackGauge(Metric):
+    """Gauge calculado al exponer las métricas (sin costo por petición)"""
+    kind = "gauge"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        callback: Callable[[], Iterable[Tuple[Tuple[str, ...], float]]]
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+    
+    def _samples(self):
+        for labels, value in self.callback():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+class Histogram(Metric):
+    """Histograma de buckets fijos; observe() es una búsqueda binaria y dos sumas"""
+    kind = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Por labels: [conteo por bucket (+Inf al final), suma]
+        self.series: Dict[Tuple[str, ...], List] = {}
+    
+    def observe(self, value: float, *labels: str):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+    
+    def _samples(self):
+        for labels, (counts, total) in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {repr(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+class MetricsRegistry:
+    """Conjunto de métricas expuestas en /metrics (formato de texto de Prometheus)"""
+    
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+    
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+    
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+    
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+    
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+REQUESTS_TOTAL = registry.counter(
+    "gateway_requests_total", "Peticiones atendidas por el gateway", ("route", "method", "status")
+)
+REQUEST_DURATION = registry.histogram(
+    "gateway_request_duration_seconds", "Latencia total de las peticiones en el gateway", ("route", "method")
+)
+REQUESTS_IN_FLIGHT = registry.gauge(
+    "gateway_requests_in_flight", "Peticiones en curso en el gateway"
+)
+UPSTREAM_REQUESTS_TOTAL = registry.counter(
+    "gateway_upstream_requests_total", "Llamadas a microservicios por resultado", ("service", "status")
+)
+UPSTREAM_DURATION = registry.histogram(
+    "gateway_upstream_request_duration_seconds",
+    "Latencia de cada intento de llamada a un microservicio (hasta recibir headers)",
+    ("service", "method")
+)
+UPSTREAM_IN_FLIGHT = registry.gauge(
+    "gateway_upstream_in_flight", "Llamadas en curso por microservicio", ("service",)
+)
+RATE_LIMIT_REJECTIONS = registry.counter(
+    "gateway_rate_limit_rejections_total", "Peticiones rechazadas por rate limit", ("scope",)
+)
+
+class MetricsMiddleware:
+    """Middleware ASGI que mide latencia, estado y peticiones en vuelo por ruta
+    
+    Usa la plantilla de la ruta (ej: /insumos/{insumo_id}) como label para que la
+    cardinalidad no crezca con los IDs.
+    """
+    
+    def __init__(self, app, exempt_paths: Iterable[str] = ("/metrics",)):
+        self.app = app
+        self.exempt_paths = frozenset(exempt_paths)
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+        
+        status_code = 500
+        
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        start = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            route_name = route.path if route is not None else "unmatched"
+            method = scope["method"]
+            REQUEST_DURATION.observe(time.perf_counter() - start, route_name, method)
+            REQUESTS_TOTAL.inc(route_name, method, str(status_code))
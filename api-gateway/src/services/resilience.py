@@ -0,0 +1,315 @@
+from fastapi import HTTPException
+from typing import Callable, Dict, Optional
+from urllib.parse import urlsplit
+import asyncio
+import math
+import random
+import time
+import httpx
+from ..core.config import settings
+from .metrics import (
+    registry, CallbackGauge, UPSTREAM_DURATION, UPSTREAM_IN_FLIGHT, UPSTREAM_REQUESTS_TOTAL
+)
+from .tracing import tracer
+
+# Solo se reintentan métodos idempotentes sin body
+RETRYABLE_METHODS = {"GET", "HEAD", "OPTIONS"}
+# Respuestas que indican que el microservicio no está disponible (no errores de negocio)
+UNAVAILABLE_STATUS_CODES = {502, 503, 504}
+
+class CircuitBreaker:
+    """Circuit breaker por microservicio: closed → open → half_open → closed"""
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(
+        self,
+        failure_threshold: int = settings.circuit_breaker_failure_threshold,
+        reset_timeout: float = settings.circuit_breaker_reset_timeout,
+        clock=time.monotonic
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+    
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+    
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (self.clock() - self.opened_at))
+    
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._trial_in_flight:
+            # Una sola petición de prueba decide si el servicio se recuperó
+            self._trial_in_flight = True
+            return True
+        return False
+    
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+    
+    def release(self):
+        """Libera la prueba half-open si la petición terminó sin resultado (ej: cancelada)"""
+        self._trial_in_flight = False
+    
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self._trial_in_flight or self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = self.clock()
+        self._trial_in_flight = False
+    
+    def snapshot(self) -> Dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_after": round(self.retry_after(), 2)
+        }
+
+class RetryBudget:
+    """Limita los reintentos a una fracción de las peticiones originales
+    
+    Cada petición deposita `ratio` tokens y cada reintento consume uno, así que un
+    servicio caído recibe como máximo ~(1 + ratio) veces el tráfico normal.
+    """
+    
+    def __init__(self, ratio: float = settings.upstream_retry_budget_ratio, max_tokens: float = 100.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens * ratio
+    
+    def deposit(self):
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+    
+    def withdraw(self) -> bool:
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+class _SlotReleasingStream(httpx.AsyncByteStream):
+    """Body en streaming que libera su cupo de in-flight al cerrarse la respuesta"""
+    
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+    
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+    
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            release, self._release = self._release, None
+            if release:
+                release()
+
+class Resilience:
+    """Envía peticiones a los microservicios con circuit breaker, reintentos y load shedding"""
+    
+    def __init__(
+        self,
+        route_timeouts: Optional[Dict[str, float]] = None,
+        max_retries: int = settings.upstream_max_retries,
+        backoff_base: float = settings.upstream_retry_backoff_base,
+        backoff_max: float = settings.upstream_retry_backoff_max,
+        max_in_flight: int = settings.upstream_max_in_flight,
+        retry_budget: Optional[RetryBudget] = None,
+        default_timeout: float = settings.upstream_timeout,
+        connect_timeout: float = settings.upstream_connect_timeout
+    ):
+        self.route_timeouts = sorted(
+            (route_timeouts if route_timeouts is not None else settings.upstream_route_timeouts).items(),
+            key=lambda item: len(item[0]),
+            reverse=True
+        )
+        self.default_timeout = httpx.Timeout(default_timeout, connect=connect_timeout)
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_in_flight = max_in_flight
+        self.retry_budget = retry_budget or RetryBudget()
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.service_labels: Dict[str, str] = {}
+        self.in_flight = 0
+        self.shed_count = 0
+    
+    def breaker(self, service_url: str) -> CircuitBreaker:
+        breaker = self.breakers.get(service_url)
+        if breaker is None:
+            breaker = self.breakers[service_url] = CircuitBreaker()
+        return breaker
+    
+    def service_label(self, service_url: str) -> str:
+        label = self.service_labels.get(service_url)
+        if label is None:
+            label = self.service_labels[service_url] = urlsplit(service_url).hostname or service_url
+        return label
+    
+    def timeout_for(self, path: str) -> httpx.Timeout:
+        """Timeout específico de la ruta, o el general de las llamadas a microservicios"""
+        for prefix, timeout in self.route_timeouts:
+            if path.startswith(prefix):
+                return httpx.Timeout(timeout, connect=self.connect_timeout)
+        return self.default_timeout
+    
+    def backoff(self, attempt: int) -> float:
+        """Backoff exponencial con full jitter"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+    
+    async def send(
+        self,
+        client: httpx.AsyncClient,
+        service_url: str,
+        request: httpx.Request,
+        stream: bool = False
+    ) -> httpx.Response:
+        """Envía la petición; lanza HTTPException 503 si se descarta o el circuito está abierto
+        
+        Los errores de transporte del último intento se propagan tal cual. Cada
+        llamada abre un span de cliente (reintentos incluidos) y propaga su
+        `traceparent` al servicio destino. Con `stream=True` la petición sigue
+        contando como in-flight hasta que se cierra la respuesta, no solo hasta
+        que llegan los headers.
+        """
+        service = self.service_label(service_url)
+        span = tracer.start_span(
+            f"{request.method} {service}",
+            kind="client",
+            attributes={"http.method": request.method, "http.url": str(request.url), "peer.service": service}
+        )
+        request.headers["traceparent"] = span.traceparent
+        error = None
+        try:
+            response = await self._send(client, service_url, service, request, stream)
+            span.attributes["http.status_code"] = response.status_code
+            if response.status_code >= 500:
+                span.status = "error"
+            return response
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            tracer.finish(span, error=error)
+    
+    async def _send(
+        self,
+        client: httpx.AsyncClient,
+        service_url: str,
+        service: str,
+        request: httpx.Request,
+        stream: bool
+    ) -> httpx.Response:
+        if self.in_flight >= self.max_in_flight:
+            self.shed_count += 1
+            UPSTREAM_REQUESTS_TOTAL.inc(service, "shed")
+            raise HTTPException(
+                status_code=503,
+                detail="Gateway overloaded, try again later",
+                headers={"Retry-After": "1"}
+            )
+        
+        breaker = self.breaker(service_url)
+        if not breaker.allow_request():
+            UPSTREAM_REQUESTS_TOTAL.inc(service, "circuit_open")
+            raise HTTPException(
+                status_code=503,
+                detail=f"Service unavailable: circuit open for {service_url}",
+                headers={"Retry-After": str(math.ceil(breaker.retry_after()) or 1)}
+            )
+        
+        retryable = request.method in RETRYABLE_METHODS
+        self.retry_budget.deposit()
+        self.in_flight += 1
+        UPSTREAM_IN_FLIGHT.inc(service)
+        recorded = False
+        held = False
+        
+        def release():
+            self.in_flight -= 1
+            UPSTREAM_IN_FLIGHT.dec(service)
+        
+        def hold(response: httpx.Response) -> httpx.Response:
+            # El cupo se libera cuando termine de retransmitirse el body
+            nonlocal held
+            if stream:
+                held = True
+                response.stream = _SlotReleasingStream(response.stream, release)
+            return response
+        
+        try:
+            attempt = 0
+            while True:
+                start = time.perf_counter()
+                try:
+                    response = await client.send(request, stream=stream)
+                except httpx.TransportError as e:
+                    UPSTREAM_DURATION.observe(time.perf_counter() - start, service, request.method)
+                    UPSTREAM_REQUESTS_TOTAL.inc(service, type(e).__name__)
+                    if not (retryable and attempt < self.max_retries and self.retry_budget.withdraw()):
+                        recorded = True
+                        breaker.record_failure()
+                        raise
+                else:
+                    UPSTREAM_DURATION.observe(time.perf_counter() - start, service, request.method)
+                    UPSTREAM_REQUESTS_TOTAL.inc(service, str(response.status_code))
+                    if response.status_code not in UNAVAILABLE_STATUS_CODES:
+                        recorded = True
+                        breaker.record_success()
+                        return hold(response)
+                    if not (retryable and attempt < self.max_retries and self.retry_budget.withdraw()):
+                        recorded = True
+                        breaker.record_failure()
+                        return hold(response)
+                    await response.aclose()
+                
+                await asyncio.sleep(self.backoff(attempt))
+                attempt += 1
+        finally:
+            if not held:
+                release()
+            if not recorded:
+                breaker.release()
+    
+    def snapshot(self) -> Dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "shed_requests": self.shed_count,
+            "retry_budget_tokens": round(self.retry_budget.tokens, 2),
+            "circuit_breakers": {url: breaker.snapshot() for url, breaker in self.breakers.items()}
+        }
+
+    def breaker_states(self):
+        """Estado de cada circuit breaker (0 closed, 1 half_open, 2 open), para /metrics"""
+        codes = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+        for service_url, breaker in self.breakers.items():
+            yield (self.service_label(service_url),), codes[breaker.state]
+
+resilience = Resilience()
+
+registry.register(CallbackGauge(
+    "gateway_circuit_breaker_state",
+    "Estado del circuit breaker por microservicio (0 closed, 1 half_open, 2 open)",
+    ("service",),
+    resilience.breaker_states
+))
@@ -0,0 +1,277 @@
+from fastapi import Request, Response
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import hashlib
+import time
+import httpx
+from ..core.config import settings
+from .streaming_proxy import stream_request, filter_headers
+from .single_flight import SingleFlight
+from .metrics import registry, CallbackGauge
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """Respuesta del microservicio guardada tal cual (bytes crudos)"""
+    path: str
+    status_code: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+    etag: str
+    expires_at: float
+    cacheable: bool
+    
+    @property
+    def size(self) -> int:
+        return len(self.body)
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in candidates)
+
+def build_request_key(request: Request) -> str:
+    """Clave por ruta, query, alcance de autenticación y codificación aceptada
+    
+    El alcance cubre el header Authorization y las cookies, así que un microservicio
+    que autentique por cookie tampoco comparte respuestas entre usuarios.
+    """
+    authorization = request.headers.get("authorization")
+    cookie = request.headers.get("cookie")
+    if authorization or cookie:
+        credentials = f"{authorization or ''}\n{cookie or ''}"
+        scope = hashlib.sha256(credentials.encode()).hexdigest()[:32]
+    else:
+        scope = "anon"
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    encoding = request.headers.get("accept-encoding", "")
+    return f"{request.url.path}?{query}|{scope}|{encoding}"
+
+def respond(entry: CachedResponse, request: Request, source: bytes = b"HIT") -> Response:
+    """Responde desde memoria, con 304 si el cliente ya tiene esa versión"""
+    if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+        response = Response(status_code=304)
+        response.raw_headers = [(b"etag", entry.etag.encode("latin-1"))]
+        return response
+    
+    response = Response(content=entry.body, status_code=entry.status_code)
+    response.raw_headers = entry.headers + [
+        (b"etag", entry.etag.encode("latin-1")),
+        (b"x-cache", source),
+    ]
+    return response
+
+class ResponseCache:
+    """Caché LRU acotada por tamaño para respuestas GET del gateway
+    
+    La clave incluye ruta, query y el alcance de autenticación (token y cookies), así
+    que dos usuarios con credenciales distintas nunca comparten entradas.
+    """
+    
+    def __init__(
+        self,
+        max_bytes: int = settings.response_cache_max_bytes,
+        default_ttl: float = settings.response_cache_ttl,
+        max_entry_bytes: int = settings.response_cache_max_entry_bytes,
+        clock=time.monotonic
+    ):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.max_entry_bytes = max_entry_bytes
+        self.clock = clock
+        self.entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self.keys_by_path: Dict[str, Set[str]] = {}
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # Contador global de invalidaciones y el último valor con el que se invalidó cada prefijo
+        self._generation = 0
+        self._invalidated_at: Dict[str, int] = {}
+    
+    def generation(self, path: str) -> int:
+        """Generación de la ruta: cambia cada vez que se invalida un prefijo que la cubre
+        
+        Una respuesta pedida con una generación distinta de la actual empezó antes de
+        una escritura y no se debe guardar.
+        """
+        return max(
+            (gen for prefix, gen in self._invalidated_at.items() if path.startswith(prefix)),
+            default=0
+        )
+    
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= self.clock():
+            self._remove(key)
+            self.misses += 1
+            return None
+        
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+    
+    def build_entry(
+        self,
+        path: str,
+        response: httpx.Response,
+        body: bytes,
+        ttl: Optional[float] = None
+    ) -> CachedResponse:
+        """Empaqueta la respuesta; solo es cacheable si es 200, sin cookies ni no-store"""
+        cache_control = response.headers.get("cache-control", "").lower()
+        cacheable = (
+            response.status_code == 200
+            and len(body) <= self.max_entry_bytes
+            and "set-cookie" not in response.headers
+            and "no-store" not in cache_control
+            and "private" not in cache_control
+        )
+        etag = response.headers.get("etag") or f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        headers = [
+            (name, value) for name, value in filter_headers(response.headers.raw)
+            if name.lower() != b"etag"
+        ]
+        return CachedResponse(
+            path=path,
+            status_code=response.status_code,
+            headers=headers,
+            body=body,
+            etag=etag,
+            expires_at=self.clock() + (self.default_ttl if ttl is None else ttl),
+            cacheable=cacheable
+        )
+    
+    def set(self, key: str, entry: CachedResponse) -> bool:
+        """Guarda la entrada si es cacheable, desalojando las menos usadas"""
+        if not entry.cacheable:
+            return False
+        
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = entry
+        self.keys_by_path.setdefault(entry.path, set()).add(key)
+        self.current_bytes += entry.size
+        
+        while self.current_bytes > self.max_bytes and self.entries:
+            self._remove(next(iter(self.entries)))
+        return True
+    
+    def _remove(self, key: str):
+        entry = self.entries.pop(key)
+        self.current_bytes -= entry.size
+        keys = self.keys_by_path.get(entry.path)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.keys_by_path[entry.path]
+    
+    def invalidate(self, *path_prefixes: str) -> int:
+        """Elimina las entradas cuyas rutas empiezan por alguno de los prefijos
+        
+        También avanza la generación de esas rutas, así que las peticiones que
+        estaban en curso no guardan su respuesta (ver `coalesced_request`).
+        """
+        self._generation += 1
+        for prefix in path_prefixes:
+            self._invalidated_at[prefix] = self._generation
+        
+        removed = 0
+        for path in [p for p in self.keys_by_path if p.startswith(path_prefixes)]:
+            for key in list(self.keys_by_path.get(path, ())):
+                self._remove(key)
+                removed += 1
+        return removed
+    
+    def clear(self):
+        self.entries.clear()
+        self.keys_by_path.clear()
+        self.current_bytes = 0
+
+response_cache = ResponseCache()
+single_flight = SingleFlight(max_wait=settings.upstream_timeout)
+
+registry.register(CallbackGauge(
+    "gateway_response_cache",
+    "Estado de la caché de respuestas (hits, misses, bytes, entradas, peticiones agrupadas)",
+    ("stat",),
+    lambda: (
+        (("hits",), response_cache.hits),
+        (("misses",), response_cache.misses),
+        (("bytes",), response_cache.current_bytes),
+        (("entries",), len(response_cache.entries)),
+        (("coalesced",), single_flight.coalesced),
+    )
+))
+
+async def coalesced_request(
+    service_url: str,
+    path: str,
+    request: Request,
+    ttl: Optional[float] = None,
+    on_entry: Optional[Callable[[str, CachedResponse], None]] = None,
+    cache: Optional[ResponseCache] = None
+) -> Response:
+    """GET agrupado (single-flight): solo la primera petición idéntica en curso sale al
+    microservicio
+    
+    El líder hace streaming a su cliente guardando una copia del body; los seguidores
+    esperan y responden con esa copia. Si el líder no la pudo compartir (body muy grande,
+    error o desconexión) cada seguidor hace su propia petición.
+    
+    La generación de la ruta se toma al empezar y forma parte de la clave del grupo:
+    si hay un `invalidate` mientras la petición está en curso, las nuevas peticiones
+    no se suman a ella y su respuesta no se pasa a `on_entry`.
+    """
+    cache = cache or response_cache
+    key = build_request_key(request)
+    generation = cache.generation(request.url.path)
+    flight_key = f"{key}#{generation}"
+    future, leader = single_flight.join(flight_key)
+    
+    if not leader:
+        entry = await single_flight.wait(future)
+        if entry is not None:
+            return respond(entry, request, b"COALESCED")
+        return await stream_request(service_url, path, request)
+    
+    def complete(upstream_response: httpx.Response, body: Optional[bytes]):
+        entry = None
+        if body is not None:
+            entry = cache.build_entry(request.url.path, upstream_response, body, ttl)
+            if on_entry and cache.generation(request.url.path) == generation:
+                on_entry(key, entry)
+        single_flight.resolve(flight_key, future, entry)
+    
+    try:
+        response = await stream_request(
+            service_url, path, request, on_complete=complete, max_buffer=cache.max_entry_bytes
+        )
+    except BaseException:
+        single_flight.resolve(flight_key, future, None)
+        raise
+    
+    response.raw_headers.append((b"x-cache", b"MISS"))
+    return response
+
+async def cached_request(
+    service_url: str,
+    path: str,
+    request: Request,
+    ttl: Optional[float] = None,
+    cache: Optional[ResponseCache] = None
+) -> Response:
+    """GET con caché: responde desde memoria o hace una única petición agrupada"""
+    cache = cache or response_cache
+    
+    if "no-cache" not in request.headers.get("cache-control", ""):
+        entry = cache.get(build_request_key(request))
+        if entry is not None:
+            return respond(entry, request)
+    
+    return await coalesced_request(service_url, path, request, ttl, on_entry=cache.set, cache=cache)
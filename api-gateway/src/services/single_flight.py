@@ -0,0 +1,85 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Resultado que indica a los seguidores que el líder fue cancelado
+_ABANDONED = object()
+
+def _consume_exception(future: asyncio.Future):
+    # Evita "Future exception was never retrieved" cuando nadie esperaba al líder
+    if not future.cancelled():
+        future.exception()
+
+class SingleFlight:
+    """Agrupa llamadas idénticas en curso: solo la primera (líder) sale al microservicio
+    y el resto espera y comparte su resultado
+    """
+    
+    def __init__(self, max_wait: float = 30.0, clock=time.monotonic):
+        self.max_wait = max_wait
+        self.clock = clock
+        self._calls: Dict[Hashable, Tuple[asyncio.Future, float]] = {}
+        self.coalesced = 0
+    
+    def __len__(self) -> int:
+        return len(self._calls)
+    
+    def join(self, key: Hashable) -> Tuple[asyncio.Future, bool]:
+        """Devuelve el futuro de la llamada y si quien llama es el líder"""
+        call = self._calls.get(key)
+        # Un líder que nunca resolvió (ej: cliente desconectado) no bloquea para siempre
+        if call is not None and self.clock() - call[1] < self.max_wait:
+            self.coalesced += 1
+            return call[0], False
+        
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_consume_exception)
+        self._calls[key] = (future, self.clock())
+        return future, True
+    
+    def _release(self, key: Hashable, future: asyncio.Future):
+        call = self._calls.get(key)
+        if call is not None and call[0] is future:
+            del self._calls[key]
+    
+    def resolve(self, key: Hashable, future: asyncio.Future, result: Any = None):
+        """Publica el resultado del líder y libera la clave para la siguiente ronda"""
+        self._release(key, future)
+        if not future.done():
+            future.set_result(result)
+    
+    async def wait(self, future: asyncio.Future) -> Any:
+        """Espera el resultado del líder como seguidor (None si tarda más de max_wait)"""
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), self.max_wait)
+        except asyncio.TimeoutError:
+            return None
+    
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Ejecuta `fn` una sola vez por clave entre las llamadas concurrentes
+        
+        Si el líder falla, los seguidores reciben la misma excepción; si el líder es
+        cancelado, uno de los seguidores toma su lugar.
+        """
+        while True:
+            future, leader = self.join(key)
+            if leader:
+                break
+            result = await asyncio.shield(future)
+            if result is not _ABANDONED:
+                return result
+        
+        try:
+            result = await fn()
+        except Exception as e:
+            self._release(key, future)
+            future.set_exception(e)
+            raise
+        except BaseException:
+            self.resolve(key, future, _ABANDONED)
+            raise
+        
+        self.resolve(key, future, result)
+        return result
@@ -0,0 +1,97 @@
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from typing import AsyncIterator, Callable, Iterable, List, Optional, Tuple
+import httpx
+from .http_pool import get_http_client
+from .resilience import resilience
+
+# Headers que solo aplican a un salto de la conexión y no deben reenviarse
+HOP_BY_HOP_HEADERS = {
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailer",
+    "transfer-encoding",
+    "upgrade",
+    "host",
+}
+
+BODY_METHODS = ("POST", "PUT", "PATCH")
+
+def filter_headers(raw_headers: Iterable[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    """Quita los headers hop-by-hop conservando duplicados (ej: set-cookie)"""
+    return [
+        (name, value) for name, value in raw_headers
+        if name.decode("latin-1").lower() not in HOP_BY_HOP_HEADERS
+    ]
+
+async def _relay(
+    upstream_response: httpx.Response,
+    on_complete: Optional[Callable[[httpx.Response, Optional[bytes]], None]],
+    max_buffer: int
+) -> AsyncIterator[bytes]:
+    """Emite los chunks del microservicio y, si se pide, guarda una copia del body"""
+    chunks: Optional[List[bytes]] = [] if on_complete else None
+    size = 0
+    completed = False
+    
+    try:
+        async for chunk in upstream_response.aiter_raw():
+            if chunks is not None:
+                size += len(chunk)
+                if size > max_buffer:
+                    chunks = None
+                else:
+                    chunks.append(chunk)
+            yield chunk
+        completed = True
+    finally:
+        try:
+            # Se notifica siempre; el body es None si no llegó completo o no cabe en el buffer
+            if on_complete:
+                on_complete(upstream_response, b"".join(chunks) if completed and chunks is not None else None)
+        finally:
+            # Cerrar aquí (y no solo en el background task) libera el cupo de in-flight
+            # aunque el cliente se desconecte a mitad del body
+            await upstream_response.aclose()
+
+async def stream_request(
+    service_url: str,
+    path: str,
+    request: Request,
+    params: Optional[httpx.QueryParams] = None,
+    on_complete: Optional[Callable[[httpx.Response, Optional[bytes]], None]] = None,
+    max_buffer: int = 0
+) -> StreamingResponse:
+    """Reenvía la petición en modo streaming, sin decodificar ni re-serializar JSON
+    
+    El body de la petición se envía al microservicio a medida que llega y la respuesta
+    se devuelve chunk a chunk con el mismo status y headers del microservicio.
+    `on_complete` recibe la respuesta y el body completo (o None si no llegó entero o
+    supera `max_buffer` bytes); lo usan la caché y el agrupamiento de peticiones.
+    """
+    client = get_http_client(service_url)
+    upstream_request = client.build_request(
+        request.method,
+        f"{service_url}{path}",
+        headers=filter_headers(request.headers.raw),
+        params=params if params is not None else request.query_params,
+        content=request.stream() if request.method in BODY_METHODS else None,
+        timeout=resilience.timeout_for(path)
+    )
+    
+    try:
+        upstream_response = await resilience.send(client, service_url, upstream_request, stream=True)
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=503, detail=f"Service unavailable: {str(e)}")
+    
+    response = StreamingResponse(
+        _relay(upstream_response, on_complete, max_buffer),
+        status_code=upstream_response.status_code,
+        background=BackgroundTask(upstream_response.aclose)
+    )
+    response.raw_headers = filter_headers(upstream_response.headers.raw)
+    return response
@@ -0,0 +1,159 @@
+# Copia deliberada: este archivo es idéntico en api-gateway y product-service porque
+# cada imagen Docker solo incluye el directorio de su servicio. Cualquier cambio se
+# aplica en ambos; scripts/testing/check_shared_copies.py verifica que no diverjan.
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import httpx
+import jwt
+from jwt.algorithms import RSAAlgorithm
+
+logger = logging.getLogger(__name__)
+
+class TokenVerificationError(Exception):
+    """El token no es válido, expiró o fue firmado con una clave desconocida"""
+    pass
+
+class TokenVerifier:
+    """Verifica tokens JWT localmente, sin llamar al auth-service en cada petición
+    
+    - HS256: con el SECRET_KEY compartido con el auth-service.
+    - RS256: con las claves públicas del JWKS del auth-service; se refresca
+      periódicamente y también al ver un `kid` desconocido (rotación de claves).
+    
+    Los claims verificados se cachean en un LRU acotado hasta que el token expira.
+    """
+    
+    def __init__(
+        self,
+        secret_key: Optional[str],
+        algorithms: List[str],
+        jwks_url: Optional[str] = None,
+        cache_size: int = 10000,
+        jwks_refresh_interval: float = 300.0,
+        jwks_min_refresh_interval: float = 30.0,
+        default_ttl: float = 60.0,
+        clock=time.time
+    ):
+        if not algorithms:
+            # Sin algoritmos todos los tokens se rechazarían en silencio
+            raise ValueError(
+                "No hay algoritmos JWT habilitados: configura JWKS_URL (RS256) o un "
+                "SECRET_KEY propio compartido con el auth-service (HS256)"
+            )
+        if not any(algorithm.startswith("HS") for algorithm in algorithms):
+            logger.warning(
+                "Sin SECRET_KEY propio solo se aceptan tokens %s; los tokens HS256 del "
+                "auth-service serán rechazados", ", ".join(algorithms)
+            )
+        self.secret_key = secret_key
+        self.algorithms = algorithms
+        self.jwks_url = jwks_url
+        self.cache_size = cache_size
+        self.jwks_refresh_interval = jwks_refresh_interval
+        self.jwks_min_refresh_interval = jwks_min_refresh_interval
+        self.default_ttl = default_ttl
+        self.clock = clock
+        self._claims: "OrderedDict[str, Tuple[Dict, float]]" = OrderedDict()
+        self._public_keys: Dict[Optional[str], object] = {}
+        self._jwks_fetched_at = float("-inf")
+        self._jwks_lock = asyncio.Lock()
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    async def verify(self, token: str) -> Dict:
+        """Devuelve los claims del token o lanza TokenVerificationError"""
+        cache_key = hashlib.sha256(token.encode()).hexdigest()
+        now = self.clock()
+        
+        cached = self._claims.get(cache_key)
+        if cached is not None:
+            if cached[1] > now:
+                self._claims.move_to_end(cache_key)
+                return cached[0]
+            del self._claims[cache_key]
+        
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.PyJWTError as e:
+            raise TokenVerificationError(f"Token mal formado: {e}")
+        
+        algorithm = header.get("alg")
+        if algorithm not in self.algorithms:
+            raise TokenVerificationError(f"Algoritmo no permitido: {algorithm}")
+        
+        if algorithm.startswith("HS"):
+            if not self.secret_key:
+                raise TokenVerificationError("No hay clave compartida configurada")
+            key = self.secret_key
+        else:
+            key = await self._get_public_key(header.get("kid"))
+        
+        try:
+            payload = jwt.decode(token, key, algorithms=[algorithm])
+        except jwt.PyJWTError as e:
+            raise TokenVerificationError(f"Token inválido: {e}")
+        
+        username = payload.get("sub")
+        if username is None:
+            raise TokenVerificationError("Token sin usuario")
+        
+        claims = {"username": username, "role": payload.get("role", "user"), "valid": True}
+        expires_at = payload.get("exp", now + self.default_ttl)
+        
+        self._claims[cache_key] = (claims, expires_at)
+        while len(self._claims) > self.cache_size:
+            self._claims.popitem(last=False)
+        return claims
+    
+    async def _get_public_key(self, kid: Optional[str]):
+        now = self.clock()
+        stale = now - self._jwks_fetched_at > self.jwks_refresh_interval
+        unknown = kid not in self._public_keys
+        if stale or (unknown and now - self._jwks_fetched_at > self.jwks_min_refresh_interval):
+            await self.refresh_jwks()
+        
+        key = self._public_keys.get(kid)
+        if key is None and kid is None and len(self._public_keys) == 1:
+            key = next(iter(self._public_keys.values()))
+        if key is None:
+            raise TokenVerificationError(f"Clave de firma desconocida: {kid}")
+        return key
+    
+    async def refresh_jwks(self):
+        """Descarga las claves públicas vigentes del auth-service"""
+        if not self.jwks_url:
+            return
+        
+        async with self._jwks_lock:
+            # Otra corrutina pudo haberlas refrescado mientras esperábamos el lock
+            if self.clock() - self._jwks_fetched_at <= self.jwks_min_refresh_interval:
+                return
+            try:
+                if self._client is None:
+                    self._client = httpx.AsyncClient(timeout=5.0)
+                response = await self._client.get(self.jwks_url)
+                response.raise_for_status()
+                keys = {
+                    jwk.get("kid"): RSAAlgorithm.from_jwk(json.dumps(jwk))
+                    for jwk in response.json().get("keys", [])
+                    if jwk.get("kty") == "RSA"
+                }
+            except (httpx.HTTPError, ValueError, KeyError) as e:
+                # Se conservan las claves anteriores si el auth-service no responde
+                logger.warning(f"No se pudo refrescar el JWKS: {e}")
+                self._jwks_fetched_at = self.clock()
+                return
+            
+            if not keys:
+                logger.warning("El JWKS de %s no publica claves RSA; ningún token RS256 será válido", self.jwks_url)
+            self._public_keys = keys
+            self._jwks_fetched_at = self.clock()
+    
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -3,7 +3,6 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from src.models.user import UserCreate, UserLogin, Token, UserResponse
 from src.services.auth_service import AuthService
 from datetime import timedelta
-import jwt
 from src.core.config import settings
 
 router = APIRouter()
@@ -42,15 +41,13 @@ async def login(user_credentials: UserLogin):
 
 @router.get("/verify")
 async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    try:
-        token = credentials.credentials
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        username: str = payload.get("sub")
-        role: str = payload.get("role")
-        
-        if username is None:
-            raise HTTPException(status_code=401, detail="Token inválido")
-        
-        return {"username": username, "role": role, "valid": True}
-    except jwt.JWTError:
+    # Misma verificación que firma create_access_token (HS256 con SECRET_KEY o RS256 con el JWKS)
+    claims = AuthService.verify_token(credentials.credentials)
+    if claims is None:
         raise HTTPException(status_code=401, detail="Token inválido")
+    return claims
+
+@router.get("/.well-known/jwks.json")
+async def jwks():
+    """Claves públicas para que los demás servicios verifiquen tokens RS256 localmente"""
+    return {"keys": AuthService.get_public_jwks()}
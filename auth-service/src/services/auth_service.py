@@ -1,7 +1,10 @@
 from passlib.context import CryptContext
 from jose import JWTError, jwt
+from jwt.algorithms import RSAAlgorithm
+from cryptography.hazmat.primitives.serialization import load_pem_public_key
 from datetime import datetime, timedelta
-from typing import Optional, Dict
+from typing import Optional, Dict, List
+import json
 import os
 import logging
 
@@ -10,6 +13,14 @@ logger = logging.getLogger(__name__)
 # Configurar bcrypt para hash de contraseñas
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+def _read_pem(env_var: str) -> Optional[str]:
+    """Lee una clave PEM del environment (admite saltos de línea escapados como \\n)"""
+    value = os.getenv(env_var)
+    return value.replace("\\n", "\n") if value else None
+
+# Pares (variable del key id, variable de la clave pública) publicados en el JWKS
+PUBLIC_KEY_VARS = (("KEY_ID", "PUBLIC_KEY"), ("PREVIOUS_KEY_ID", "PREVIOUS_PUBLIC_KEY"))
+
 class AuthService:
     """Servicio de autenticación con JWT"""
     
@@ -38,10 +49,44 @@ class AuthService:
         # Obtener configuración del environment
         secret_key = os.getenv("SECRET_KEY", "fallback-secret-key")
         algorithm = os.getenv("ALGORITHM", "HS256")
+        headers = None
         
-        encoded_jwt = jwt.encode(to_encode, secret_key, algorithm=algorithm)
+        if algorithm.startswith("RS"):
+            # Firma asimétrica: los demás servicios verifican con la clave pública del JWKS
+            secret_key = _read_pem("PRIVATE_KEY")
+            headers = {"kid": os.getenv("KEY_ID", "default")}
+        
+        encoded_jwt = jwt.encode(to_encode, secret_key, algorithm=algorithm, headers=headers)
         return encoded_jwt
     
+    @staticmethod
+    def get_public_jwks() -> List[Dict]:
+        """Claves públicas vigentes (actual y anterior, para rotación) en formato JWK"""
+        keys = []
+        for kid_var, pem_var in PUBLIC_KEY_VARS:
+            pem = _read_pem(pem_var)
+            if not pem:
+                continue
+            jwk = json.loads(RSAAlgorithm.to_jwk(load_pem_public_key(pem.encode())))
+            jwk.update({"kid": os.getenv(kid_var, "default"), "use": "sig", "alg": "RS256"})
+            keys.append(jwk)
+        return keys
+    
+    @staticmethod
+    def get_public_key(kid: Optional[str]) -> Optional[str]:
+        """Clave pública PEM del JWKS con ese `kid` (la única publicada si el token no trae kid)"""
+        published = [
+            (os.getenv(kid_var, "default"), _read_pem(pem_var))
+            for kid_var, pem_var in PUBLIC_KEY_VARS
+            if _read_pem(pem_var)
+        ]
+        for key_id, pem in published:
+            if key_id == kid:
+                return pem
+        if kid is None and len(published) == 1:
+            return published[0][1]
+        return None
+    
     @staticmethod
     async def create_user(user_data: Dict) -> Dict:
         """Crear nuevo usuario (simulado por ahora)"""
@@ -107,6 +152,13 @@ class AuthService:
             secret_key = os.getenv("SECRET_KEY", "fallback-secret-key")
             algorithm = os.getenv("ALGORITHM", "HS256")
             
+            if algorithm.startswith("RS"):
+                # Misma clave y kid que publica el JWKS (incluida la anterior durante una rotación)
+                secret_key = AuthService.get_public_key(jwt.get_unverified_header(token).get("kid"))
+                if secret_key is None:
+                    logger.warning("Token firmado con una clave desconocida")
+                    return None
+            
             payload = jwt.decode(token, secret_key, algorithms=[algorithm])
             username: str = payload.get("sub")
             role: str = payload.get("role", "user")
@@ -1,30 +1,66 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
-from typing import Optional, Dict
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Any, AsyncIterator, Iterable, List, Optional, Dict
+from datetime import datetime
+import json
+from pydantic import BaseModel
 from ...use_cases.calculate_product_price import CalculateProductPriceUseCase, RecalculateAllProductsUseCase
+from ...use_cases.simulate_prices import SimulatePricesUseCase, expand_sweep
+from ...use_cases.export_catalog_prices import ExportCatalogPricesUseCase
+from ...api.schemas.simulation import ParameterSweep, SimulationRequest
 from ...domain.entities.producto import ProductoCalculado
+from ...domain.entities.job import Job
 from ...domain.services.cost_calculation_service import CostCalculationService
 from ...domain.services.configuration_service import ConfigurationService
+from ...domain.services.price_dependencies import PriceDependencyIndex
 from ...infrastructure.database.configuration_repository import ConfigurationRepository
 from ...infrastructure.database.molde_repository import MoldeRepository
 from ...infrastructure.database.producto_repository import ProductoRepository
+from ...infrastructure.database.precio_calculado_repository import PrecioCalculadoRepository
+from ...infrastructure.database.params_snapshot_repository import ParamsSnapshotRepository
 from ...infrastructure.database.connection import get_database
+from ...infrastructure.params_cache import params_cache
+from ...infrastructure.params_snapshots import params_snapshot_index
+from ...infrastructure.price_cache import price_result_cache
+from ...infrastructure.jobs.queue import JobQueue
+from ...infrastructure.jobs.worker import ProgressReporter, get_job_queue, job_runtime
 
 router = APIRouter(prefix="/calculations", tags=["calculations"])
 
+RECALCULATE_ALL_JOB = "recalculate_all"
+REPRICE_AFFECTED_JOB = "reprice_affected"
+# Los recálculos escriben los mismos precios: nunca corren dos a la vez
+PRICING_LOCK = "precios"
+# Errores guardados en el trabajo; el total se sigue contando aparte
+MAX_JOB_ERRORS = 100
+
+dependency_index = PriceDependencyIndex()
+
+class RepriceRequest(BaseModel):
+    config_keys: List[str] = []
+    molde_ids: List[str] = []
+
 def get_calculate_product_use_case():
     db = get_database()
     config_repo = ConfigurationRepository(db)
-    molde_repo = MoldeRepository(db)
+    # Editar el peso, pabilo o complejidad de un molde reprecia sus productos
+    molde_repo = MoldeRepository(db, on_pricing_change=lambda molde_ids: enqueue_reprice(molde_ids=molde_ids))
     producto_repo = ProductoRepository(db)
     
     calculation_service = CostCalculationService()
-    configuration_service = ConfigurationService(config_repo)
+    configuration_service = ConfigurationService(
+        config_repo,
+        params_cache,
+        snapshot_repository=ParamsSnapshotRepository(db),
+        snapshot_index=params_snapshot_index
+    )
     
     return CalculateProductPriceUseCase(
         calculation_service, 
         configuration_service, 
         molde_repo, 
-        producto_repo
+        producto_repo,
+        result_cache=price_result_cache
     )
 
 @router.post("/product/{producto_id}", response_model=ProductoCalculado)
@@ -42,24 +78,217 @@ async def calculate_product_price(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error en cálculo: {str(e)}")
 
-@router.post("/recalculate-all")
+@router.post("/recalculate-all", status_code=202)
 async def recalculate_all_products(
-    calculate_use_case: CalculateProductPriceUseCase = Depends(get_calculate_product_use_case)
+    resume_after: Optional[str] = Query(None, description="Continuar después de este producto (ultimo_producto_id)"),
+    queue: JobQueue = Depends(get_job_queue)
 ):
-    """Recalcula todos los productos activos (usar cuando cambien configuraciones)"""
+    """Encola el recálculo de todos los productos activos (usar cuando cambien configuraciones)
+    
+    Devuelve el id del trabajo; el avance se consulta en /jobs/{job_id}. Si ya hay
+    un recálculo igual esperando en la cola se devuelve ese mismo trabajo.
+    """
+    job = await queue.enqueue(Job(
+        type=RECALCULATE_ALL_JOB,
+        payload={"resume_after": resume_after},
+        lock_key=PRICING_LOCK
+    ))
+    if job_runtime.pool is not None:
+        job_runtime.pool.notify()
+    
+    return JSONResponse(
+        status_code=202,
+        content={
+            "message": "Recálculo encolado",
+            "job_id": job.id,
+            "status": job.status.value,
+            "status_url": f"/jobs/{job.id}"
+        },
+        headers={"Location": f"/jobs/{job.id}"}
+    )
+
+async def enqueue_reprice(config_keys: Iterable[str] = (), molde_ids: Iterable[str] = ()) -> Optional[Job]:
+    """Encola el recálculo de los productos afectados; None si el cambio no afecta precios"""
+    config_keys, molde_ids = sorted(set(config_keys)), sorted(set(molde_ids))
+    if dependency_index.affected(config_keys, molde_ids).is_empty:
+        return None
+    
+    queue = get_job_queue()
+    job = await queue.enqueue(Job(
+        type=REPRICE_AFFECTED_JOB,
+        payload={"config_keys": config_keys, "molde_ids": molde_ids},
+        lock_key=PRICING_LOCK
+    ))
+    if job_runtime.pool is not None:
+        job_runtime.pool.notify()
+    return job
+
+@router.post("/reprice", status_code=202)
+async def reprice_affected_products(reprice: RepriceRequest):
+    """Encola el recálculo solo de los productos que dependen de las claves o moldes indicados
+    
+    Los cambios de configuración lo disparan desde `update_configuration` y las
+    ediciones de los campos de cálculo de un molde desde `MoldeRepository.update`.
+    """
+    job = await enqueue_reprice(reprice.config_keys, reprice.molde_ids)
+    if job is None:
+        return {"message": "Ningún producto depende de estos cambios", "job_id": None}
+    
+    return JSONResponse(
+        status_code=202,
+        content={
+            "message": "Recálculo parcial encolado",
+            "job_id": job.id,
+            "status": job.status.value,
+            "status_url": f"/jobs/{job.id}"
+        },
+        headers={"Location": f"/jobs/{job.id}"}
+    )
+
+def _job_progress(resultados: Dict[str, Any], previo: Dict[str, Any]) -> Dict[str, Any]:
+    """Acumula los resultados de esta ejecución con los de intentos anteriores del trabajo"""
+    procesados = previo.get("productos_procesados", 0) + resultados["productos_procesados"]
+    con_error = previo.get("productos_con_error", 0) + resultados["productos_con_error"]
+    duracion = previo.get("duracion_segundos", 0.0) + resultados.get("duracion_segundos", 0.0)
+    errores = (previo.get("errores", []) + resultados["errores"])[:MAX_JOB_ERRORS]
+    return {
+        "productos_procesados": procesados,
+        "productos_con_error": con_error,
+        "errores": errores,
+        "lotes": previo.get("lotes", 0) + resultados["lotes"],
+        "ultimo_producto_id": resultados["ultimo_producto_id"],
+        # Persiste entre intentos: un intento posterior no debe purgar filas que uno anterior no escribió
+        "escritura_fallida": previo.get("escritura_fallida", False) or resultados.get("escritura_fallida", False),
+        "filas_eliminadas": resultados.get("filas_eliminadas", 0),
+        "duracion_segundos": duracion,
+        "productos_por_segundo": round(procesados / duracion, 1) if duracion else None
+    }
+
+def _recalculate_use_case() -> RecalculateAllProductsUseCase:
     db = get_database()
-    producto_repo = ProductoRepository(db)
+    return RecalculateAllProductsUseCase(
+        get_calculate_product_use_case(),
+        ProductoRepository(db),
+        precio_repository=PrecioCalculadoRepository(db)
+    )
+
+async def run_recalculate_all_job(job: Job, report_progress: ProgressReporter) -> Dict[str, Any]:
+    """Handler del worker: si el trabajo se retoma, continúa desde el último checkpoint"""
+    use_case = _recalculate_use_case()
+    previo = job.progress
+    resume_after = previo.get("ultimo_producto_id") or job.payload.get("resume_after")
     
-    recalculate_use_case = RecalculateAllProductsUseCase(calculate_use_case, producto_repo)
+    async def on_progress(resultados: Dict[str, Any]):
+        await report_progress(_job_progress(resultados, previo))
     
+    resultados = await use_case.execute(
+        resume_after=resume_after,
+        on_progress=on_progress,
+        recalculo_id=job.id,
+        # Si se pidió desde un producto intermedio, los anteriores no se reescriben; si un
+        # intento anterior falló al escribir, sus productos siguen sin la marca de este trabajo
+        purge_stale=job.payload.get("resume_after") is None and not previo.get("escritura_fallida")
+    )
+    return _job_progress(resultados, previo)
+
+async def run_reprice_affected_job(job: Job, report_progress: ProgressReporter) -> Dict[str, Any]:
+    """Handler del worker: recalcula solo el subconjunto que depende del cambio"""
+    use_case = _recalculate_use_case()
+    selector = dependency_index.affected(job.payload.get("config_keys", []), job.payload.get("molde_ids", []))
+    previo = job.progress
+    
+    async def on_progress(resultados: Dict[str, Any]):
+        await report_progress(_job_progress(resultados, previo))
+    
+    resultados = await use_case.execute(
+        resume_after=previo.get("ultimo_producto_id"),
+        on_progress=on_progress,
+        selector=selector,
+        recalculo_id=job.id
+    )
+    return _job_progress(resultados, previo)
+
+JOB_HANDLERS = {
+    RECALCULATE_ALL_JOB: run_recalculate_all_job,
+    REPRICE_AFFECTED_JOB: run_reprice_affected_job,
+}
+
+def get_export_catalog_prices_use_case():
+    db = get_database()
+    return ExportCatalogPricesUseCase(
+        RecalculateAllProductsUseCase(get_calculate_product_use_case(), ProductoRepository(db))
+    )
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} no es serializable")
+
+async def _ndjson(primero: List[Dict[str, Any]], lotes: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+    """Un chunk por lote, una línea JSON por fila"""
+    filas = primero
     try:
-        resultados = await recalculate_use_case.execute()
-        return {
-            "message": "Recálculo completado",
-            "results": resultados
-        }
+        while filas is not None:
+            yield "".join(
+                json.dumps(fila, default=_json_default, ensure_ascii=False) + "\n" for fila in filas
+            ).encode()
+            filas = await anext(lotes, None)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error en recálculo masivo: {str(e)}")
+        # Los headers ya salieron con 200: el error va como última línea (sin resumen)
+        yield (json.dumps({"error": f"Exportación interrumpida: {e}"}, ensure_ascii=False) + "\n").encode()
+    finally:
+        await lotes.aclose()
+
+@router.get("/export")
+async def export_catalog_prices(
+    incluir_desglose: bool = Query(True, description="Incluir el desglose de costos de cada producto"),
+    fecha: Optional[datetime] = Query(None, description="Valorizar con los parámetros vigentes en esta fecha"),
+    use_case: ExportCatalogPricesUseCase = Depends(get_export_catalog_prices_use_case)
+):
+    """Precios de todos los productos activos en NDJSON, generados y enviados por lotes
+    
+    Una línea por producto con el formato de /precios, las líneas de error como
+    {"producto_id", "error"} y al final {"resumen": {...}}; si la última línea no
+    es el resumen la exportación quedó incompleta. Con `fecha` responde cuánto
+    habría costado cada producto (moldes y productos actuales) con los parámetros
+    de esa fecha.
+    """
+    lotes = use_case.stream(incluir_desglose, fecha)
+    try:
+        # El primer lote se calcula antes de responder para que un error de parámetros sea un 400
+        primero = await anext(lotes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return StreamingResponse(_ndjson(primero, lotes), media_type="application/x-ndjson")
+
+def get_simulate_prices_use_case():
+    use_case = get_calculate_product_use_case()
+    return SimulatePricesUseCase(
+        use_case.calculation_service,
+        use_case.configuration_service,
+        use_case.molde_repository,
+        use_case.producto_repository
+    )
+
+@router.post("/simulation")
+async def simulate_price_grid(
+    simulation: SimulationRequest,
+    use_case: SimulatePricesUseCase = Depends(get_simulate_prices_use_case)
+):
+    """Simula precios y márgenes de varios productos (o todo el catálogo) sobre un grid de parámetros
+    
+    Ej: {"variaciones": {"porc_ganancia": {"desde": 200, "hasta": 300, "paso": 10},
+    "valor_cera_kg": [15000, 16500]}} devuelve matrices escenario x producto.
+    """
+    variaciones = {
+        nombre: expand_sweep(v.desde, v.hasta, v.paso) if isinstance(v, ParameterSweep) else v
+        for nombre, v in simulation.variaciones.items()
+    }
+    try:
+        return await use_case.execute(variaciones, simulation.producto_ids, simulation.incluir_matriz)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/simulation/{producto_id}")
 async def simulate_price_changes(
@@ -101,16 +330,35 @@ async def simulate_price_changes(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error en simulación: {str(e)}")
 
+@router.get("/cache")
+async def get_price_cache_stats():
+    """Estado del cache de resultados de /calculations/product (entradas, hits, misses)"""
+    return price_result_cache.stats()
+
 @router.get("/params")
-async def get_current_calculation_params():
-    """Obtiene los parámetros actuales de cálculo"""
+async def get_current_calculation_params(
+    as_of: Optional[datetime] = Query(None, description="Parámetros vigentes en esta fecha (desde el histórico)")
+):
+    """Obtiene los parámetros actuales de cálculo, o los de una fecha pasada con `as_of`"""
     db = get_database()
     config_repo = ConfigurationRepository(db)
-    config_service = ConfigurationService(config_repo)
+    config_service = ConfigurationService(
+        config_repo,
+        params_cache,
+        snapshot_repository=ParamsSnapshotRepository(db),
+        snapshot_index=params_snapshot_index
+    )
     
     try:
-        params = await config_service.get_calculation_params()
+        # En los dos casos `version` es la de params_snapshots (None si la fecha
+        # es anterior a la primera versión)
+        if as_of is not None:
+            version, params = await config_service.get_calculation_params_at(as_of)
+        else:
+            version, params = await config_service.get_versioned_calculation_params()
         return {
+            "version": version,
+            "as_of": as_of,
             "parametros": {
                 "porcentajes": {
                     "aditivo": float(params.porc_aditivo),
@@ -1,20 +1,32 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List, Optional
+from datetime import datetime
 from ...use_cases.manage_configurations import ManageConfigurationsUseCase
-from ...domain.entities.configuration import Configuration, ConfigurationHistory
+from ...domain.entities.configuration import Configuration, ConfigurationHistoryPage
 from ...infrastructure.database.configuration_repository import ConfigurationRepository
+from ...infrastructure.database.params_snapshot_repository import ParamsSnapshotRepository
 from ...domain.services.configuration_service import ConfigurationService
 from ...infrastructure.database.connection import get_database
+from ...infrastructure.params_cache import params_cache
+from ...infrastructure.params_snapshots import params_snapshot_index
+from .calculation_routes import enqueue_reprice
 
 router = APIRouter(prefix="/configurations", tags=["configurations"])
 
 def get_configuration_use_case():
     db = get_database()
     config_repo = ConfigurationRepository(db)
-    config_service = ConfigurationService(config_repo)
+    config_service = ConfigurationService(
+        config_repo,
+        params_cache,
+        on_change=enqueue_reprice,
+        snapshot_repository=ParamsSnapshotRepository(db),
+        snapshot_index=params_snapshot_index
+    )
     return ManageConfigurationsUseCase(config_service)
 
-@router.get("/", response_model=List[Configuration])
+@router.get("", response_model=List[Configuration])
+@router.get("/", response_model=List[Configuration], include_in_schema=False)
 async def get_configurations(
     category: Optional[str] = Query(None),
     use_case: ManageConfigurationsUseCase = Depends(get_configuration_use_case)
@@ -44,13 +56,20 @@ async def update_configuration(
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
-@router.get("/{key}/history", response_model=List[ConfigurationHistory])
+@router.get("/{key}/history", response_model=ConfigurationHistoryPage)
 async def get_configuration_history(
     key: str,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="`next_cursor` de la página anterior"),
+    desde: Optional[datetime] = Query(None, description="Cambios desde esta fecha (inclusive)"),
+    hasta: Optional[datetime] = Query(None, description="Cambios hasta esta fecha (inclusive)"),
     use_case: ManageConfigurationsUseCase = Depends(get_configuration_use_case)
 ):
-    """Obtiene el histórico de cambios de una configuración"""
-    return await use_case.get_configuration_history(key)
+    """Obtiene el histórico de cambios de una configuración, del más reciente al más antiguo"""
+    try:
+        return await use_case.get_configuration_history(key, limit, cursor, desde, hasta)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/initialize")
 async def initialize_default_configurations(
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import List, Optional
+from ...domain.entities.job import Job
+from ...infrastructure.jobs.queue import JobQueue
+from ...infrastructure.jobs.worker import get_job_queue
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+@router.get("/{job_id}", response_model=Job)
+async def get_job(job_id: str, queue: JobQueue = Depends(get_job_queue)):
+    """Estado, progreso, errores y throughput de un trabajo en segundo plano"""
+    job = await queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Trabajo {job_id} no encontrado")
+    return job
+
+@router.get("", response_model=List[Job])
+async def list_jobs(
+    type: Optional[str] = Query(None, description="Filtrar por tipo de trabajo"),
+    limit: int = Query(20, ge=1, le=100),
+    queue: JobQueue = Depends(get_job_queue)
+):
+    """Últimos trabajos, del más reciente al más antiguo"""
+    return await queue.list(type, limit)
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import List, Literal, Optional
+from ...domain.entities.precio_calculado import PrecioCalculado
+from ...infrastructure.database.precio_calculado_repository import PrecioCalculadoRepository
+from ...infrastructure.database.connection import get_database
+
+router = APIRouter(prefix="/precios", tags=["precios"])
+
+def get_precio_repository():
+    return PrecioCalculadoRepository(get_database())
+
+@router.get("", response_model=List[PrecioCalculado])
+async def list_precios(
+    categoria: Optional[str] = Query(None, description="Filtrar por categoría"),
+    precio_min: Optional[int] = Query(None, ge=0, description="Precio mínimo (inclusive)"),
+    precio_max: Optional[int] = Query(None, ge=0, description="Precio máximo (inclusive)"),
+    margen_min: Optional[float] = Query(None, description="Margen mínimo en % sobre el precio"),
+    margen_max: Optional[float] = Query(None, description="Margen máximo en % sobre el precio"),
+    orden: Literal["precio", "margen_porcentual"] = Query("precio"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    repository: PrecioCalculadoRepository = Depends(get_precio_repository)
+):
+    """Precios precalculados por categoría, banda de precio y/o rango de margen
+    
+    Lee la colección `precios_calculados` que mantiene el recálculo; no calcula nada.
+    """
+    return await repository.find_range(
+        categoria, precio_min, precio_max, margen_min, margen_max, orden, skip, limit
+    )
+
+@router.get("/{producto_id}", response_model=PrecioCalculado)
+async def get_precio(
+    producto_id: str,
+    repository: PrecioCalculadoRepository = Depends(get_precio_repository)
+):
+    """Desglose y precios por cantidad precalculados de un producto (para cotizaciones)"""
+    precio = await repository.get_by_producto_id(producto_id)
+    if not precio:
+        raise HTTPException(status_code=404, detail=f"Precio de {producto_id} no calculado")
+    return precio
@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional, Union
+from decimal import Decimal
+
+class ParameterSweep(BaseModel):
+    """Rango de valores para un parámetro: desde..hasta (inclusive) cada `paso`"""
+    desde: Decimal
+    hasta: Decimal
+    paso: Decimal = Field(..., gt=0)
+
+class SimulationRequest(BaseModel):
+    """Simulación de precios sobre un grid de variaciones de parámetros
+    
+    Cada entrada de `variaciones` es una lista de valores o un rango; los
+    escenarios son el producto cartesiano de todas las variaciones.
+    """
+    producto_ids: Optional[List[str]] = None  # None = todo el catálogo activo
+    variaciones: Dict[str, Union[ParameterSweep, List[Any]]] = Field(default_factory=dict)
+    incluir_matriz: bool = True  # Precios y márgenes por producto y escenario
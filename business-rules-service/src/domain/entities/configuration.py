@@ -1,5 +1,5 @@
 from pydantic import BaseModel, validator
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from decimal import Decimal
 from datetime import datetime
 from enum import Enum
@@ -71,3 +71,8 @@ class ConfigurationHistory(BaseModel):
     changed_by: str
     changed_at: datetime
     reason: Optional[str] = None
+
+class ConfigurationHistoryPage(BaseModel):
+    """Página del histórico; `next_cursor` se pasa como `cursor` para pedir la siguiente"""
+    items: List[ConfigurationHistory]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,28 @@
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any
+from datetime import datetime
+from enum import Enum
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class Job(BaseModel):
+    """Trabajo en segundo plano (ej: recálculo masivo de precios)"""
+    id: Optional[str] = None
+    type: str
+    status: JobStatus = JobStatus.QUEUED
+    payload: Dict[str, Any] = Field(default_factory=dict)
+    lock_key: Optional[str] = None  # Trabajos con la misma clave no corren a la vez
+    progress: Dict[str, Any] = Field(default_factory=dict)  # Último checkpoint reportado
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    worker_id: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    lease_expires_at: Optional[datetime] = None  # Si vence, otro worker puede retomarlo
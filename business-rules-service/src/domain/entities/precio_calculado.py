@@ -0,0 +1,29 @@
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, List
+from datetime import datetime
+
+class DescuentoCantidad(BaseModel):
+    """Precio unitario a partir de una cantidad mínima"""
+    cantidad: int
+    porcentaje: float
+    precio_unitario: float
+
+class PrecioCalculado(BaseModel):
+    """Precio precalculado de un producto (colección `precios_calculados`)
+    
+    Lo escribe el pipeline de recálculo; catálogo y cotizaciones lo leen con una
+    sola consulta indexada en lugar de recalcular el desglose.
+    """
+    producto_id: str
+    molde_id: str
+    nombre: str
+    categoria: str
+    precio: int  # valor_redondeado, múltiplo entero de multiplo_redondeo
+    costo_base: float
+    ganancia_neta: float  # precio - costo_base
+    margen_porcentual: float  # ganancia_neta sobre el precio, en %
+    desglose: Dict[str, Dict[str, float]]  # Mismo formato que desglose_detallado
+    descuentos: List[DescuentoCantidad] = Field(default_factory=list)
+    params_version: Optional[int] = None  # Versión de params_snapshots usada en el cálculo
+    recalculo_id: Optional[str] = None  # Recálculo que escribió la fila
+    calculado_en: datetime
@@ -1,18 +1,146 @@
-from typing import Dict, List, Optional
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
 from decimal import Decimal
-from ..entities.configuration import Configuration, ConfigurationHistory
+from datetime import datetime
+import logging
+from ..entities.configuration import Configuration, ConfigurationHistory, ConfigurationHistoryPage
 from ..value_objects.calculation_params import CalculationParams
 
+logger = logging.getLogger(__name__)
+
+# Reintentos si otra réplica escribe la misma versión de parámetros a la vez
+SNAPSHOT_WRITE_ATTEMPTS = 3
+
+def encode_history_cursor(history: ConfigurationHistory) -> str:
+    """Cursor opaco con la posición (changed_at, id) de un registro del histórico"""
+    return f"{history.changed_at.isoformat()}_{history.id}"
+
+def decode_history_cursor(cursor: str) -> Tuple[datetime, str]:
+    changed_at, _, history_id = cursor.rpartition("_")
+    try:
+        if len(history_id) != 24:
+            raise ValueError(history_id)
+        int(history_id, 16)
+        return datetime.fromisoformat(changed_at), history_id
+    except ValueError:
+        raise ValueError(f"Cursor inválido: {cursor}")
+
 class ConfigurationService:
     """Servicio para manejo de configuraciones dinámicas"""
     
-    def __init__(self, config_repository):
+    def __init__(
+        self,
+        config_repository,
+        params_cache=None,
+        on_change: Optional[Callable[[List[str]], Awaitable[None]]] = None,
+        snapshot_repository=None,
+        snapshot_index=None
+    ):
         self.config_repository = config_repository
+        self.params_cache = params_cache
+        # Se llama con las claves modificadas (ej: para recalcular los productos afectados)
+        self.on_change = on_change
+        # Versiones inmutables de los parámetros (params_snapshots) y su índice en memoria
+        self.snapshot_repository = snapshot_repository
+        self.snapshot_index = snapshot_index
     
     async def get_calculation_params(self) -> CalculationParams:
-        """Obtiene todos los parámetros activos para cálculos"""
-        configs = await self.config_repository.get_active_configs()
+        """Obtiene todos los parámetros activos para cálculos
+        
+        Con `params_cache` se sirve el snapshot en memoria y solo se consulta
+        la base cuando el cache fue invalidado.
+        """
+        if self.params_cache is not None:
+            return await self.params_cache.get(self._load_calculation_params)
+        return await self._load_calculation_params()
+    
+    async def get_versioned_calculation_params(self) -> Tuple[Optional[int], CalculationParams]:
+        """Parámetros junto con su versión en `params_snapshots` (None sin snapshots)
+        
+        La versión es la misma en todas las réplicas y reinicios. Si los parámetros
+        vigentes todavía no tienen versión (ej: configuraciones inicializadas o
+        editadas fuera de `update_configuration`) se registra una.
+        """
+        params = await self.get_calculation_params()
+        if self.snapshot_repository is None or self.snapshot_index is None:
+            return None, params
+        
+        version = self.snapshot_index.version_of(params)
+        if version is not None:
+            return version, params
+        try:
+            return await self.record_params_snapshot(params, datetime.utcnow(), ()), params
+        except Exception as e:
+            logger.warning("No se pudo registrar la versión de los parámetros vigentes: %s", e)
+            return None, params
+    
+    def invalidate_calculation_params(self):
+        if self.params_cache is not None:
+            self.params_cache.invalidate()
+    
+    async def get_calculation_params_as_of(self, timestamp: datetime) -> CalculationParams:
+        """Parámetros que estaban vigentes en `timestamp`, reconstruidos desde el histórico
+        
+        No pasa por el cache: el snapshot cacheado es siempre el actual.
+        """
+        configs, descuentos = await self.config_repository.get_params_values_as_of(timestamp)
+        return self._build_calculation_params(configs, descuentos)
+    
+    async def get_calculation_params_at(self, timestamp: datetime) -> Tuple[Optional[int], CalculationParams]:
+        """Parámetros vigentes en `timestamp` junto con su versión
         
+        Con snapshots es una búsqueda en el índice en memoria. Para fechas
+        anteriores a la primera versión (o sin snapshots) se reconstruyen desde
+        el histórico y la versión es None.
+        """
+        if self.snapshot_index is not None and self.snapshot_repository is not None:
+            if self.snapshot_index.needs_refresh(timestamp):
+                async with self.snapshot_index.lock:
+                    await self._load_new_snapshots()
+            snapshot = self.snapshot_index.at(timestamp)
+            if snapshot is not None:
+                return snapshot.version, snapshot.params
+        return None, await self.get_calculation_params_as_of(timestamp)
+    
+    async def record_params_snapshot(
+        self,
+        params: CalculationParams,
+        valid_from: datetime,
+        keys: Sequence[str],
+        changed_by: Optional[str] = None
+    ) -> int:
+        """Guarda una versión inmutable de los parámetros si cambiaron respecto de la última
+        
+        Devuelve el número de la versión que tiene estos valores (la nueva, o la
+        última si no hubo cambios).
+        """
+        async with self.snapshot_index.lock:
+            for _ in range(SNAPSHOT_WRITE_ATTEMPTS):
+                await self._load_new_snapshots()
+                snapshot = self.snapshot_index.next_snapshot(params, valid_from, keys, changed_by)
+                if snapshot is None:
+                    return self.snapshot_index.last_version
+                if await self.snapshot_repository.insert(snapshot):
+                    self.snapshot_index.add([snapshot])
+                    return snapshot["version"]
+        raise RuntimeError(f"No se pudo registrar la versión de parámetros tras {SNAPSHOT_WRITE_ATTEMPTS} intentos")
+    
+    async def _load_new_snapshots(self):
+        self.snapshot_index.add(await self.snapshot_repository.find_since(self.snapshot_index.last_version))
+    
+    async def _load_calculation_params(self) -> CalculationParams:
+        # Solo clave y valor: no hace falta validar el documento completo
+        configs = await self.config_repository.get_active_configs(fields=("key", "value"))
+        
+        # Obtener descuentos por cantidad
+        descuentos = await self.config_repository.get_quantity_discounts()
+        
+        return self._build_calculation_params(configs, descuentos)
+    
+    @staticmethod
+    def _build_calculation_params(
+        configs: List[Dict[str, str]],
+        descuentos: Dict[int, Decimal]
+    ) -> CalculationParams:
         # Valores por defecto en caso de que no existan configuraciones
         defaults = {
             'porc_aditivo': Decimal('8.0'),
@@ -31,14 +159,12 @@ class ConfigurationService:
         # Sobrescribir con valores de la base de datos
         params_dict = defaults.copy()
         for config in configs:
-            if config.key in params_dict:
-                if config.key == 'multiplo_redondeo':
-                    params_dict[config.key] = int(config.value)
+            key = config['key']
+            if key in params_dict:
+                if key == 'multiplo_redondeo':
+                    params_dict[key] = int(config['value'])
                 else:
-                    params_dict[config.key] = Decimal(config.value)
-        
-        # Obtener descuentos por cantidad
-        descuentos = await self.config_repository.get_quantity_discounts()
+                    params_dict[key] = Decimal(config['value'])
         
         return CalculationParams(
             **params_dict,
@@ -75,15 +201,44 @@ class ConfigurationService:
         current_config.value = new_value
         current_config.updated_at = datetime.utcnow()
         
-        return await self.config_repository.update(current_config)
+        updated = await self.config_repository.update(current_config)
+        self.invalidate_calculation_params()
+        if self.snapshot_repository is not None and self.snapshot_index is not None:
+            try:
+                await self.record_params_snapshot(
+                    await self.get_calculation_params(), history.changed_at, [key], user_id
+                )
+            except Exception as e:
+                # El cambio ya está guardado; esa fecha se sigue pudiendo reconstruir desde el histórico
+                logger.warning("No se pudo registrar la versión de parámetros tras cambiar %s: %s", key, e)
+        if self.on_change is not None:
+            try:
+                await self.on_change([key])
+            except Exception as e:
+                # Un 500 aquí haría que el cliente reintente un cambio que ya quedó guardado
+                logger.warning("No se pudo encolar el recálculo tras cambiar %s: %s", key, e)
+        return updated
     
-    async def get_configuration_history(self, key: str) -> List[ConfigurationHistory]:
-        """Obtiene el histórico de cambios de una configuración"""
+    async def get_configuration_history(
+        self,
+        key: str,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        desde: Optional[datetime] = None,
+        hasta: Optional[datetime] = None
+    ) -> ConfigurationHistoryPage:
+        """Obtiene una página del histórico de cambios de una configuración"""
+        before = decode_history_cursor(cursor) if cursor else None
         config = await self.config_repository.get_by_key(key)
         if not config:
-            return []
+            return ConfigurationHistoryPage(items=[])
         
-        return await self.config_repository.get_history(config.id)
+        # Se pide uno de más para saber si hay otra página sin contar el total
+        items = await self.config_repository.get_history(config.id, limit + 1, before, desde, hasta)
+        if len(items) <= limit:
+            return ConfigurationHistoryPage(items=items)
+        items = items[:limit]
+        return ConfigurationHistoryPage(items=items, next_cursor=encode_history_cursor(items[-1]))
     
     def validate_configuration_value(self, config: Configuration, new_value: str) -> List[str]:
         """Valida que un nuevo valor sea válido para una configuración"""
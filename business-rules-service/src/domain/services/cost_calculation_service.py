@@ -1,14 +1,46 @@
-from decimal import Decimal, ROUND_UP
-from typing import Dict, List
-import math
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 from ..entities.molde import Molde
 from ..entities.producto import Producto
 from ..value_objects.calculation_params import CalculationParams, CostBreakdown
-from datetime import datetime
+from ..value_objects.pricing_kernel import CostComponents, PricingRates, compute_cost_components
+from ..value_objects.pricing_batch import (
+    BatchCostBreakdown, PricingBatch, COMPLEJIDAD_MULTIPLIERS_X10, INT64_MAX,
+    decimal_places, max_abs, scale_decimal
+)
 
 class CostCalculationService:
     """Servicio de dominio para cálculos de costos de productos"""
     
+    def __init__(self):
+        # Tasas del último CalculationParams usado (los snapshots del cache son inmutables)
+        self._rates: Optional[Tuple[CalculationParams, PricingRates]] = None
+    
+    def pricing_rates(self, params: CalculationParams) -> PricingRates:
+        """Tasas derivadas de `params`, calculadas una vez por objeto de parámetros"""
+        if self._rates is None or self._rates[0] is not params:
+            self._rates = (params, PricingRates.from_params(params))
+        return self._rates[1]
+    
+    def compute_costs(
+        self,
+        molde: Molde,
+        producto: Producto,
+        params: CalculationParams,
+        cantidad_gotas: int = 0
+    ) -> CostComponents:
+        """Calcula el desglose sin construir modelos pydantic (camino interno)"""
+        return compute_cost_components(
+            self.pricing_rates(params),
+            molde.peso_figura,
+            molde.longitud_pabilo,
+            molde.complejidad,
+            cantidad_gotas,
+            producto.margen_ganancia_custom,
+            producto.porcentaje_detalle_custom
+        )
+    
     def calculate_product_cost(
         self, 
         molde: Molde, 
@@ -16,66 +48,128 @@ class CostCalculationService:
         params: CalculationParams,
         cantidad_gotas: int = 0
     ) -> CostBreakdown:
-        """Calcula el costo completo de un producto siguiendo las reglas de negocio"""
-        
-        # 1. Cálculo de cera
-        peso_cera_kg = molde.peso_figura / 1000
-        costo_cera = peso_cera_kg * params.valor_cera_kg
-        
-        # 2. Cálculo de aditivo
-        gramos_aditivo = molde.peso_figura * (params.porc_aditivo / 100)
-        costo_aditivo = (gramos_aditivo / 1000) * params.valor_aditivo_kg
+        """Calcula el costo completo de un producto siguiendo las reglas de negocio
         
-        # 3. Cálculo de fragancia
-        gramos_fragancia = molde.peso_figura * (params.porc_fragancia / 100)
-        ml_fragancia = gramos_fragancia  # Aproximación 1g = 1ml
-        costo_fragancia = ml_fragancia * params.valor_fragancia_ml
+        El cálculo lo hace `compute_cost_components`; aquí solo se arma el modelo
+        pydantic que sale por la API.
+        """
+        return self.compute_costs(molde, producto, params, cantidad_gotas).to_cost_breakdown(params)
+    
+    def calculate_batch_costs(
+        self,
+        batch: PricingBatch,
+        params: CalculationParams,
+        exact: bool = True
+    ) -> BatchCostBreakdown:
+        """Calcula el desglose de costos de todo un lote en una pasada vectorizada
         
-        # 4. Cálculo de colorante
-        costo_colorante = Decimal(cantidad_gotas) * params.valor_colorante_gota
+        Aplica las mismas reglas que `calculate_product_cost`. En modo exacto
+        (por defecto) trabaja en punto fijo con enteros, por lo que cada componente,
+        el redondeo y los descuentos coinciden exactamente con el cálculo Decimal.
+        Con exact=False usa float64, más rápido pero sujeto a error de redondeo.
+        """
+        if exact:
+            return self._calculate_batch_exact(batch, params)
+        return self._calculate_batch_float(batch, params)
+    
+    def _calculate_batch_exact(self, batch: PricingBatch, params: CalculationParams) -> BatchCostBreakdown:
+        def fixed(value: Decimal) -> Tuple[int, int]:
+            places = decimal_places(value)
+            return scale_decimal(value, places), places
         
-        # 5. Cálculo de pabilo
-        costo_pabilo = molde.longitud_pabilo * params.valor_pabilo_metro
+        cera, s_cera = fixed(params.valor_cera_kg)
+        porc_aditivo, s_porc_aditivo = fixed(params.porc_aditivo)
+        aditivo, s_aditivo = fixed(params.valor_aditivo_kg)
+        porc_fragancia, s_porc_fragancia = fixed(params.porc_fragancia)
+        fragancia, s_fragancia = fixed(params.valor_fragancia_ml)
+        colorante, s_colorante = fixed(params.valor_colorante_gota)
+        pabilo, s_pabilo = fixed(params.valor_pabilo_metro)
+        ganancia, s_ganancia = fixed(params.porc_ganancia)
+        detalle, s_detalle = fixed(params.porc_detalle)
+        admin, s_admin = fixed(params.porc_admin)
+        multiplo = params.multiplo_redondeo
         
-        # 6. Otros insumos (por ahora 0, se puede extender)
-        costo_otros_insumos = Decimal('0')
+        # Exponente común de los costos base y coeficiente entero de cada término
+        s_peso = batch.pesos.exponent
+        exponents = {
+            "cera": s_peso + s_cera + 3,
+            "aditivo": s_peso + s_porc_aditivo + s_aditivo + 5,
+            "fragancia": s_peso + s_porc_fragancia + s_fragancia + 2,
+            "colorante": s_colorante,
+            "pabilo": batch.longitudes_pabilo.exponent + s_pabilo,
+        }
+        e_base = max(exponents.values())
+        k_cera = cera * 10 ** (e_base - exponents["cera"])
+        k_aditivo = porc_aditivo * aditivo * 10 ** (e_base - exponents["aditivo"])
+        k_fragancia = porc_fragancia * fragancia * 10 ** (e_base - exponents["fragancia"])
+        k_colorante = colorante * 10 ** (e_base - exponents["colorante"])
+        k_pabilo = pabilo * 10 ** (e_base - exponents["pabilo"])
         
-        # 7. Costo base total
-        costo_base = (
-            costo_cera + costo_aditivo + costo_fragancia + 
-            costo_colorante + costo_pabilo + costo_otros_insumos
+        # Porcentajes de ganancia y detalle por producto en una escala común
+        s_pct = max(
+            s_ganancia, s_detalle + 1,
+            batch.margenes_custom.exponent, batch.detalles_custom.exponent
         )
-        
-        # 8. Aplicar ganancia y detalle
-        # Usar margen custom del producto o el general
-        porc_ganancia_final = (
-            producto.margen_ganancia_custom or params.porc_ganancia
+        cien_pct = 100 * 10 ** s_pct
+        ganancias = np.where(
+            batch.margenes_mask,
+            batch.margenes_custom.rescale(s_pct),
+            ganancia * 10 ** (s_pct - s_ganancia)
         )
-        porc_detalle_final = (
-            producto.porcentaje_detalle_custom or 
-            self._get_detalle_by_complejidad(molde.complejidad, params.porc_detalle)
+        detalles = np.where(
+            batch.detalles_mask,
+            batch.detalles_custom.rescale(s_pct),
+            detalle * COMPLEJIDAD_MULTIPLIERS_X10[batch.complejidades] * 10 ** (s_pct - s_detalle - 1)
         )
+        cien_admin = 100 * 10 ** s_admin
+        e_sin_admin = e_base + 2 + s_pct
+        e_con_admin = e_sin_admin + 2 + s_admin
+        divisor = 10 ** e_con_admin * multiplo
         
-        costo_ganancia = costo_base * (porc_ganancia_final / 100)
-        costo_detalle = costo_base * (porc_detalle_final / 100)
-        subtotal_sin_admin = costo_base + costo_ganancia + costo_detalle
+        # Si algún resultado intermedio no cabe en int64 se trabaja con enteros de Python
+        pesos = batch.pesos.numerators
+        longitudes = batch.longitudes_pabilo.numerators
+        gotas = batch.gotas
+        base_bound = (
+            max_abs(pesos) * (abs(k_cera) + abs(k_aditivo) + abs(k_fragancia))
+            + max_abs(gotas) * abs(k_colorante)
+            + max_abs(longitudes) * abs(k_pabilo)
+        )
+        pct_bound = cien_pct + max_abs(ganancias) + max_abs(detalles)
+        bound = base_bound * pct_bound * max(cien_admin + abs(admin), abs(admin))
+        if bound > INT64_MAX or divisor > INT64_MAX:
+            pesos, longitudes, gotas, ganancias, detalles = (
+                a.astype(object) for a in (pesos, longitudes, gotas, ganancias, detalles)
+            )
         
-        # 9. Gastos administrativos
-        gastos_admin = subtotal_sin_admin * (params.porc_admin / 100)
-        subtotal_con_admin = subtotal_sin_admin + gastos_admin
+        costo_cera = pesos * k_cera
+        costo_aditivo = pesos * k_aditivo
+        costo_fragancia = pesos * k_fragancia
+        costo_colorante = gotas * k_colorante
+        costo_pabilo = longitudes * k_pabilo
+        costo_otros_insumos = np.zeros_like(costo_cera)
+        costo_base = costo_cera + costo_aditivo + costo_fragancia + costo_colorante + costo_pabilo
         
-        # 10. Redondeo
-        valor_redondeado = self._redondear_al_multiplo(
-            subtotal_con_admin, params.multiplo_redondeo
-        )
+        costo_ganancia = costo_base * ganancias
+        costo_detalle = costo_base * detalles
+        subtotal_sin_admin = costo_base * (cien_pct + ganancias + detalles)
+        gastos_admin = subtotal_sin_admin * admin
+        subtotal_con_admin = subtotal_sin_admin * (cien_admin + admin)
+        
+        # Techo entero exacto: -(-a // b)
+        valor_redondeado = -((-subtotal_con_admin) // divisor) * multiplo
         
-        # 11. Calcular descuentos aplicables
-        descuentos_aplicables = {}
+        descuentos, descuentos_exponents = {}, {}
         for cantidad, porcentaje in params.descuentos_cantidad.items():
-            precio_con_descuento = valor_redondeado * (1 - porcentaje / 100)
-            descuentos_aplicables[cantidad] = precio_con_descuento
+            pct, s_desc = fixed(porcentaje)
+            factor = 100 * 10 ** s_desc - pct
+            valores = valor_redondeado
+            if valores.dtype != object and max_abs(valores) * abs(factor) > INT64_MAX:
+                valores = valores.astype(object)
+            descuentos[cantidad] = valores * factor
+            descuentos_exponents[cantidad] = 2 + s_desc
         
-        return CostBreakdown(
+        return BatchCostBreakdown(
             costo_cera=costo_cera,
             costo_aditivo=costo_aditivo,
             costo_fragancia=costo_fragancia,
@@ -89,23 +183,73 @@ class CostCalculationService:
             gastos_admin=gastos_admin,
             subtotal_con_admin=subtotal_con_admin,
             valor_redondeado=valor_redondeado,
-            descuentos_aplicables=descuentos_aplicables,
-            fecha_calculo=datetime.utcnow(),
-            parametros_usados=params
+            descuentos_aplicables=descuentos,
+            exponents={
+                "costo_cera": e_base,
+                "costo_aditivo": e_base,
+                "costo_fragancia": e_base,
+                "costo_colorante": e_base,
+                "costo_pabilo": e_base,
+                "costo_otros_insumos": e_base,
+                "costo_base": e_base,
+                "costo_ganancia": e_sin_admin,
+                "costo_detalle": e_sin_admin,
+                "subtotal_sin_admin": e_sin_admin,
+                "gastos_admin": e_con_admin,
+                "subtotal_con_admin": e_con_admin,
+                "valor_redondeado": 0,
+            },
+            descuentos_exponents=descuentos_exponents
         )
     
-    def _get_detalle_by_complejidad(self, complejidad: str, base_detalle: Decimal) -> Decimal:
-        """Ajusta el porcentaje de detalle según complejidad"""
-        multipliers = {
-            "simple": Decimal('1.0'),
-            "intermedio": Decimal('1.5'),
-            "complejo": Decimal('2.0')
+    def _calculate_batch_float(self, batch: PricingBatch, params: CalculationParams) -> BatchCostBreakdown:
+        pesos = batch.pesos.to_float()
+        longitudes = batch.longitudes_pabilo.to_float()
+        gotas = batch.gotas.astype(np.float64)
+        
+        costo_cera = pesos / 1000 * float(params.valor_cera_kg)
+        costo_aditivo = pesos * (float(params.porc_aditivo) / 100) / 1000 * float(params.valor_aditivo_kg)
+        costo_fragancia = pesos * (float(params.porc_fragancia) / 100) * float(params.valor_fragancia_ml)
+        costo_colorante = gotas * float(params.valor_colorante_gota)
+        costo_pabilo = longitudes * float(params.valor_pabilo_metro)
+        costo_otros_insumos = np.zeros_like(costo_cera)
+        costo_base = costo_cera + costo_aditivo + costo_fragancia + costo_colorante + costo_pabilo
+        
+        ganancias = np.where(batch.margenes_mask, batch.margenes_custom.to_float(), float(params.porc_ganancia))
+        detalles = np.where(
+            batch.detalles_mask,
+            batch.detalles_custom.to_float(),
+            float(params.porc_detalle) * COMPLEJIDAD_MULTIPLIERS_X10[batch.complejidades] / 10
+        )
+        costo_ganancia = costo_base * (ganancias / 100)
+        costo_detalle = costo_base * (detalles / 100)
+        subtotal_sin_admin = costo_base + costo_ganancia + costo_detalle
+        gastos_admin = subtotal_sin_admin * (float(params.porc_admin) / 100)
+        subtotal_con_admin = subtotal_sin_admin + gastos_admin
+        
+        multiplo = params.multiplo_redondeo
+        valor_redondeado = np.ceil(subtotal_con_admin / multiplo) * multiplo
+        descuentos = {
+            cantidad: valor_redondeado * (1 - float(porcentaje) / 100)
+            for cantidad, porcentaje in params.descuentos_cantidad.items()
         }
-        return base_detalle * multipliers.get(complejidad, Decimal('1.0'))
-    
-    def _redondear_al_multiplo(self, valor: Decimal, multiplo: int) -> Decimal:
-        """Redondea hacia arriba al múltiplo especificado"""
-        return Decimal(math.ceil(float(valor) / multiplo) * multiplo)
+        
+        return BatchCostBreakdown(
+            costo_cera=costo_cera,
+            costo_aditivo=costo_aditivo,
+            costo_fragancia=costo_fragancia,
+            costo_colorante=costo_colorante,
+            costo_pabilo=costo_pabilo,
+            costo_otros_insumos=costo_otros_insumos,
+            costo_base=costo_base,
+            costo_ganancia=costo_ganancia,
+            costo_detalle=costo_detalle,
+            subtotal_sin_admin=subtotal_sin_admin,
+            gastos_admin=gastos_admin,
+            subtotal_con_admin=subtotal_con_admin,
+            valor_redondeado=valor_redondeado,
+            descuentos_aplicables=descuentos
+        )
     
     def calculate_bulk_discount(
         self, 
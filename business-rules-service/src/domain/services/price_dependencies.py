@@ -0,0 +1,79 @@
+from dataclasses import dataclass
+from typing import FrozenSet, Iterable
+
+# Parámetros que entran en el precio de todos los productos
+UNIVERSAL_KEYS = frozenset({
+    "porc_aditivo",
+    "porc_fragancia",
+    "porc_admin",
+    "valor_cera_kg",
+    "valor_aditivo_kg",
+    "valor_fragancia_ml",
+    "valor_pabilo_metro",
+    "multiplo_redondeo",
+})
+
+@dataclass(frozen=True)
+class ProductSelector:
+    """Conjunto de productos activos descrito por condiciones unidas con OR"""
+    todos: bool = False
+    sin_margen_custom: bool = False  # Usan porc_ganancia general
+    sin_detalle_custom: bool = False  # Usan porc_detalle general
+    con_colorante: bool = False  # Tienen cantidad_gotas > 0
+    molde_ids: FrozenSet[str] = frozenset()
+    
+    @property
+    def is_empty(self) -> bool:
+        return not (
+            self.todos or self.sin_margen_custom or self.sin_detalle_custom
+            or self.con_colorante or self.molde_ids
+        )
+    
+    def merge(self, other: "ProductSelector") -> "ProductSelector":
+        return ProductSelector(
+            todos=self.todos or other.todos,
+            sin_margen_custom=self.sin_margen_custom or other.sin_margen_custom,
+            sin_detalle_custom=self.sin_detalle_custom or other.sin_detalle_custom,
+            con_colorante=self.con_colorante or other.con_colorante,
+            molde_ids=self.molde_ids | other.molde_ids
+        )
+
+class PriceDependencyIndex:
+    """Índice de dependencias del precio sugerido
+    
+    Traduce un cambio (claves de configuración y/o moldes editados) en el
+    subconjunto de productos cuyo `precio_sugerido` o fila de `precios_calculados`
+    puede cambiar, siguiendo las mismas reglas que
+    `CostCalculationService.calculate_product_cost`.
+    """
+    
+    def selector_for_config(self, key: str) -> ProductSelector:
+        if key in UNIVERSAL_KEYS:
+            return ProductSelector(todos=True)
+        if key == "porc_ganancia":
+            return ProductSelector(sin_margen_custom=True)
+        if key == "porc_detalle":
+            return ProductSelector(sin_detalle_custom=True)
+        if key == "valor_colorante_gota":
+            return ProductSelector(con_colorante=True)
+        if key.startswith("descuento_"):
+            # No cambia el precio sugerido, pero sí los precios por cantidad que
+            # cada fila de `precios_calculados` guarda
+            return ProductSelector(todos=True)
+        # El resto de claves no participa en el cálculo
+        return ProductSelector()
+    
+    def selector_for_moldes(self, molde_ids: Iterable[str]) -> ProductSelector:
+        return ProductSelector(molde_ids=frozenset(molde_ids))
+    
+    def affected(
+        self,
+        config_keys: Iterable[str] = (),
+        molde_ids: Iterable[str] = ()
+    ) -> ProductSelector:
+        selector = self.selector_for_moldes(molde_ids)
+        for key in config_keys:
+            selector = selector.merge(self.selector_for_config(key))
+        if selector.todos:
+            return ProductSelector(todos=True)
+        return selector
@@ -1,9 +1,12 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from decimal import Decimal
 from typing import Dict, Optional
+from datetime import datetime
 
 class CalculationParams(BaseModel):
-    """Parámetros para cálculo de costos"""
+    """Parámetros para cálculo de costos (inmutables: se comparten desde el cache)"""
+    model_config = ConfigDict(frozen=True)
+    
     # Porcentajes
     porc_aditivo: Decimal
     porc_fragancia: Decimal
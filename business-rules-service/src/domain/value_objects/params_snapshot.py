@@ -0,0 +1,51 @@
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, Tuple
+from .calculation_params import CalculationParams
+
+DESCUENTO_PREFIX = "descuento_"
+
+# Campos escalares de CalculationParams; los descuentos van como descuento_<cantidad>
+PARAM_FIELDS = tuple(
+    field for field in CalculationParams.model_fields if field != "descuentos_cantidad"
+)
+
+@dataclass(frozen=True, slots=True)
+class ParamsVersion:
+    """Parámetros vigentes desde `valid_from` hasta la versión siguiente"""
+    version: int
+    valid_from: datetime
+    params: CalculationParams
+
+def flatten_params(params: CalculationParams) -> Dict[str, str]:
+    """CalculationParams como {campo: valor} en texto (Decimal exacto, sin pasar por float)"""
+    values = {field: str(getattr(params, field)) for field in PARAM_FIELDS}
+    values.update({
+        f"{DESCUENTO_PREFIX}{cantidad}": str(porcentaje)
+        for cantidad, porcentaje in params.descuentos_cantidad.items()
+    })
+    return values
+
+def unflatten_params(values: Dict[str, str]) -> CalculationParams:
+    params = {field: values[field] for field in PARAM_FIELDS}
+    params["multiplo_redondeo"] = int(params["multiplo_redondeo"])
+    params["descuentos_cantidad"] = {
+        int(key[len(DESCUENTO_PREFIX):]): Decimal(value)
+        for key, value in values.items()
+        if key.startswith(DESCUENTO_PREFIX)
+    }
+    return CalculationParams(**params)
+
+def diff_values(previous: Dict[str, str], current: Dict[str, str]) -> Tuple[Dict[str, str], Tuple[str, ...]]:
+    """Delta entre dos versiones: campos nuevos o modificados y campos eliminados"""
+    changed = {key: value for key, value in current.items() if previous.get(key) != value}
+    removed = tuple(sorted(key for key in previous if key not in current))
+    return changed, removed
+
+def apply_delta(values: Dict[str, str], changed: Dict[str, str], removed: Iterable[str]) -> Dict[str, str]:
+    result = dict(values)
+    result.update(changed)
+    for key in removed:
+        result.pop(key, None)
+    return result
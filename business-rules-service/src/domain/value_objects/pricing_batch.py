@@ -0,0 +1,196 @@
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Dict, Optional, Sequence, Tuple
+import numpy as np
+from .calculation_params import CalculationParams, CostBreakdown
+from datetime import datetime
+
+INT64_MAX = int(np.iinfo(np.int64).max)
+
+# Código numérico de complejidad -> multiplicador del % de detalle en décimas
+COMPLEJIDAD_CODES = {"simple": 0, "intermedio": 1, "complejo": 2}
+COMPLEJIDAD_MULTIPLIERS_X10 = np.array([10, 15, 20], dtype=np.int64)
+
+BREAKDOWN_FIELDS = (
+    "costo_cera", "costo_aditivo", "costo_fragancia", "costo_colorante",
+    "costo_pabilo", "costo_otros_insumos", "costo_base", "costo_ganancia",
+    "costo_detalle", "subtotal_sin_admin", "gastos_admin", "subtotal_con_admin",
+    "valor_redondeado"
+)
+
+def to_decimal(value: Any) -> Decimal:
+    """Convierte a Decimal sin arrastrar el error binario de los float"""
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, float):
+        return Decimal(repr(value))
+    return Decimal(value)
+
+def decimal_places(value: Decimal) -> int:
+    exponent = value.as_tuple().exponent
+    return -exponent if exponent < 0 else 0
+
+def scale_decimal(value: Decimal, places: int) -> int:
+    """Entero exacto `value * 10**places` (places >= decimales de value)"""
+    return int(value.scaleb(places))
+
+def int_array(values: Sequence[int]) -> np.ndarray:
+    """Array int64 si todos los valores caben; si no, dtype=object con enteros de Python"""
+    if all(-INT64_MAX <= v <= INT64_MAX for v in values):
+        return np.array(values, dtype=np.int64)
+    array = np.empty(len(values), dtype=object)
+    array[:] = list(values)
+    return array
+
+@dataclass(frozen=True)
+class FixedPointArray:
+    """Valores decimales como enteros escalados: valor = numerador / 10**exponent"""
+    numerators: np.ndarray
+    exponent: int
+
+    @classmethod
+    def from_values(cls, values: Sequence[Any]) -> "FixedPointArray":
+        decimals = [to_decimal(v) for v in values]
+        exponent = max((decimal_places(d) for d in decimals), default=0)
+        return cls(int_array([scale_decimal(d, exponent) for d in decimals]), exponent)
+
+    def rescale(self, exponent: int) -> np.ndarray:
+        """Numeradores llevados a un exponente mayor o igual al propio"""
+        factor = 10 ** (exponent - self.exponent)
+        if factor == 1:
+            return self.numerators
+        if self.numerators.dtype != object and max_abs(self.numerators) * factor > INT64_MAX:
+            return self.numerators.astype(object) * factor
+        return self.numerators * factor
+
+    def to_float(self) -> np.ndarray:
+        return self.numerators.astype(np.float64) / (10 ** self.exponent)
+
+def max_abs(array: np.ndarray) -> int:
+    if len(array) == 0:
+        return 0
+    return int(np.abs(array).max())
+
+class PricingBatch:
+    """Entradas de un lote de productos preparadas para el cálculo vectorizado
+
+    Se construye una vez (ej: todo el catálogo) y se puede re-valorizar con
+    distintos CalculationParams sin volver a recorrer los objetos.
+    Los overrides ausentes (None o 0) usan el valor general, igual que el
+    `or` de `calculate_product_cost`.
+    """
+
+    def __init__(
+        self,
+        pesos: Sequence[Any],
+        longitudes_pabilo: Sequence[Any],
+        complejidades: Sequence[Any],
+        gotas: Optional[Sequence[int]] = None,
+        margenes_custom: Optional[Sequence[Any]] = None,
+        detalles_custom: Optional[Sequence[Any]] = None
+    ):
+        size = len(pesos)
+        if len(longitudes_pabilo) != size or len(complejidades) != size:
+            raise ValueError("Todas las entradas del lote deben tener el mismo largo")
+
+        self.size = size
+        self.pesos = FixedPointArray.from_values(pesos)
+        self.longitudes_pabilo = FixedPointArray.from_values(longitudes_pabilo)
+        self.gotas = int_array([int(g) for g in (gotas if gotas is not None else [0] * size)])
+        self.complejidades = np.array(
+            [c if isinstance(c, (int, np.integer)) else COMPLEJIDAD_CODES.get(str(c).lower(), 0)
+             for c in complejidades],
+            dtype=np.int64
+        )
+        self.margenes_custom, self.margenes_mask = self._overrides(margenes_custom)
+        self.detalles_custom, self.detalles_mask = self._overrides(detalles_custom)
+
+    def _overrides(self, values: Optional[Sequence[Any]]) -> Tuple[FixedPointArray, np.ndarray]:
+        values = values if values is not None else [None] * self.size
+        if len(values) != self.size:
+            raise ValueError("Todas las entradas del lote deben tener el mismo largo")
+        mask = np.array([bool(v) for v in values], dtype=bool)
+        return FixedPointArray.from_values([v if v else 0 for v in values]), mask
+
+    @classmethod
+    def from_products(cls, items: Sequence[Tuple[Any, Any, int]]) -> "PricingBatch":
+        """Construye el lote desde tuplas (molde, producto, cantidad_gotas)"""
+        return cls(
+            pesos=[molde.peso_figura for molde, _, _ in items],
+            longitudes_pabilo=[molde.longitud_pabilo for molde, _, _ in items],
+            complejidades=[molde.complejidad for molde, _, _ in items],
+            gotas=[gotas for _, _, gotas in items],
+            margenes_custom=[producto.margen_ganancia_custom for _, producto, _ in items],
+            detalles_custom=[producto.porcentaje_detalle_custom for _, producto, _ in items]
+        )
+
+    def __len__(self) -> int:
+        return self.size
+
+@dataclass
+class BatchCostBreakdown:
+    """Desglose de costos de un lote; cada campo es un array alineado con el lote
+
+    En modo exacto los arrays son numeradores enteros y `exponents` indica la
+    escala de cada campo (valor = numerador / 10**exponente); en modo float los
+    arrays ya son float64 y `exponents` es None.
+    """
+    costo_cera: np.ndarray
+    costo_aditivo: np.ndarray
+    costo_fragancia: np.ndarray
+    costo_colorante: np.ndarray
+    costo_pabilo: np.ndarray
+    costo_otros_insumos: np.ndarray
+    costo_base: np.ndarray
+    costo_ganancia: np.ndarray
+    costo_detalle: np.ndarray
+    subtotal_sin_admin: np.ndarray
+    gastos_admin: np.ndarray
+    subtotal_con_admin: np.ndarray
+    valor_redondeado: np.ndarray
+    descuentos_aplicables: Dict[int, np.ndarray]
+    exponents: Optional[Dict[str, int]] = None
+    descuentos_exponents: Optional[Dict[int, int]] = None
+
+    @property
+    def exact(self) -> bool:
+        return self.exponents is not None
+
+    def __len__(self) -> int:
+        return len(self.valor_redondeado)
+
+    def as_float(self, field: str) -> np.ndarray:
+        values = getattr(self, field)
+        if not self.exact:
+            return values
+        return values.astype(np.float64) / (10 ** self.exponents[field])
+
+    def as_decimal(self, field: str, index: int) -> Decimal:
+        value = getattr(self, field)[index]
+        if not self.exact:
+            return Decimal(repr(float(value)))
+        return Decimal(int(value)).scaleb(-self.exponents[field])
+
+    def descuento_float(self, cantidad: int) -> np.ndarray:
+        values = self.descuentos_aplicables[cantidad]
+        if not self.exact:
+            return values
+        return values.astype(np.float64) / (10 ** self.descuentos_exponents[cantidad])
+
+    def descuento_decimal(self, cantidad: int, index: int) -> Decimal:
+        value = self.descuentos_aplicables[cantidad][index]
+        if not self.exact:
+            return Decimal(repr(float(value)))
+        return Decimal(int(value)).scaleb(-self.descuentos_exponents[cantidad])
+
+    def to_cost_breakdown(self, index: int, params: CalculationParams) -> CostBreakdown:
+        """Desglose de un producto del lote con el mismo formato que el cálculo unitario"""
+        return CostBreakdown(
+            **{field: self.as_decimal(field, index) for field in BREAKDOWN_FIELDS},
+            descuentos_aplicables={
+                cantidad: self.descuento_decimal(cantidad, index)
+                for cantidad in self.descuentos_aplicables
+            },
+            fecha_calculo=datetime.utcnow(),
+            parametros_usados=params
+        )
@@ -0,0 +1,192 @@
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Optional, Tuple
+from .calculation_params import CalculationParams, CostBreakdown
+
+COMPLEJIDAD_MULTIPLIERS = {
+    "simple": Decimal('1.0'),
+    "intermedio": Decimal('1.5'),
+    "complejo": Decimal('2.0')
+}
+
+@dataclass(frozen=True, slots=True)
+class PricingRates:
+    """Tasas derivadas de CalculationParams que no dependen del producto
+    
+    Se calculan una vez por snapshot de parámetros; los porcentajes ya vienen
+    divididos por 100 con las mismas operaciones Decimal que el cálculo original,
+    así que los resultados son idénticos.
+    """
+    valor_cera_kg: Decimal
+    valor_aditivo_kg: Decimal
+    valor_fragancia_ml: Decimal
+    valor_colorante_gota: Decimal
+    valor_pabilo_metro: Decimal
+    aditivo: Decimal
+    fragancia: Decimal
+    ganancia: Decimal
+    admin: Decimal
+    detalle_por_complejidad: Dict[str, Decimal]
+    detalle_default: Decimal
+    multiplo_redondeo: int
+    descuentos: Tuple[Tuple[int, Decimal], ...]  # (cantidad, 1 - porcentaje / 100)
+    
+    @classmethod
+    def from_params(cls, params: CalculationParams) -> "PricingRates":
+        return cls(
+            valor_cera_kg=params.valor_cera_kg,
+            valor_aditivo_kg=params.valor_aditivo_kg,
+            valor_fragancia_ml=params.valor_fragancia_ml,
+            valor_colorante_gota=params.valor_colorante_gota,
+            valor_pabilo_metro=params.valor_pabilo_metro,
+            aditivo=params.porc_aditivo / 100,
+            fragancia=params.porc_fragancia / 100,
+            ganancia=params.porc_ganancia / 100,
+            admin=params.porc_admin / 100,
+            detalle_por_complejidad={
+                complejidad: params.porc_detalle * multiplier / 100
+                for complejidad, multiplier in COMPLEJIDAD_MULTIPLIERS.items()
+            },
+            detalle_default=params.porc_detalle * Decimal('1.0') / 100,
+            multiplo_redondeo=params.multiplo_redondeo,
+            descuentos=tuple(
+                (cantidad, 1 - porcentaje / 100)
+                for cantidad, porcentaje in params.descuentos_cantidad.items()
+            )
+        )
+
+@dataclass(frozen=True, slots=True)
+class CostComponents:
+    """Desglose de costos de un producto sin validación ni metadata
+    
+    Representación interna del cálculo; se convierte a CostBreakdown (pydantic)
+    solo cuando sale por la API.
+    """
+    costo_cera: Decimal
+    costo_aditivo: Decimal
+    costo_fragancia: Decimal
+    costo_colorante: Decimal
+    costo_pabilo: Decimal
+    costo_otros_insumos: Decimal
+    costo_base: Decimal
+    costo_ganancia: Decimal
+    costo_detalle: Decimal
+    subtotal_sin_admin: Decimal
+    gastos_admin: Decimal
+    subtotal_con_admin: Decimal
+    valor_redondeado: Decimal
+    descuentos_aplicables: Dict[int, Decimal]
+    
+    def to_cost_breakdown(
+        self,
+        params: CalculationParams,
+        fecha_calculo: Optional[datetime] = None
+    ) -> CostBreakdown:
+        return CostBreakdown(
+            costo_cera=self.costo_cera,
+            costo_aditivo=self.costo_aditivo,
+            costo_fragancia=self.costo_fragancia,
+            costo_colorante=self.costo_colorante,
+            costo_pabilo=self.costo_pabilo,
+            costo_otros_insumos=self.costo_otros_insumos,
+            costo_base=self.costo_base,
+            costo_ganancia=self.costo_ganancia,
+            costo_detalle=self.costo_detalle,
+            subtotal_sin_admin=self.subtotal_sin_admin,
+            gastos_admin=self.gastos_admin,
+            subtotal_con_admin=self.subtotal_con_admin,
+            valor_redondeado=self.valor_redondeado,
+            descuentos_aplicables=self.descuentos_aplicables,
+            fecha_calculo=fecha_calculo or datetime.utcnow(),
+            parametros_usados=params
+        )
+
+def redondear_al_multiplo(valor: Decimal, multiplo: int) -> Decimal:
+    """Redondea hacia arriba al múltiplo especificado
+    
+    Usa divmod exacto de Decimal (sin pasar por float) para que el resultado
+    coincida con el cálculo por lotes en punto fijo.
+    
+    Cambio de comportamiento deliberado respecto al `math.ceil(float(valor) / multiplo)`
+    original: un valor que supera un múltiplo por menos de lo que distingue un float
+    (ej: 1500.0000000000000001 con múltiplo 500) ahora sube a 2000 en vez de quedarse
+    en 1500. En los valores exactamente múltiplos y en el resto de casos el resultado
+    es el mismo.
+    """
+    cociente, resto = divmod(valor, multiplo)
+    if resto > 0:
+        cociente += 1
+    return Decimal(int(cociente) * multiplo)
+
+def compute_cost_components(
+    rates: PricingRates,
+    peso_figura: Decimal,
+    longitud_pabilo: Decimal,
+    complejidad: str,
+    cantidad_gotas: int = 0,
+    margen_ganancia_custom: Optional[Decimal] = None,
+    porcentaje_detalle_custom: Optional[Decimal] = None
+) -> CostComponents:
+    """Calcula el costo completo de un producto siguiendo las reglas de negocio"""
+    # 1. Cera
+    costo_cera = peso_figura / 1000 * rates.valor_cera_kg
+    
+    # 2. Aditivo (gramos = peso * porc_aditivo)
+    costo_aditivo = (peso_figura * rates.aditivo / 1000) * rates.valor_aditivo_kg
+    
+    # 3. Fragancia (aproximación 1g = 1ml)
+    costo_fragancia = peso_figura * rates.fragancia * rates.valor_fragancia_ml
+    
+    # 4. Colorante
+    costo_colorante = Decimal(cantidad_gotas) * rates.valor_colorante_gota
+    
+    # 5. Pabilo
+    costo_pabilo = longitud_pabilo * rates.valor_pabilo_metro
+    
+    # 6. Otros insumos (por ahora 0, se puede extender)
+    costo_otros_insumos = Decimal('0')
+    
+    # 7. Costo base total
+    costo_base = (
+        costo_cera + costo_aditivo + costo_fragancia +
+        costo_colorante + costo_pabilo + costo_otros_insumos
+    )
+    
+    # 8. Ganancia y detalle: margen custom del producto o el general (ajustado por complejidad)
+    ganancia = margen_ganancia_custom / 100 if margen_ganancia_custom else rates.ganancia
+    if porcentaje_detalle_custom:
+        detalle = porcentaje_detalle_custom / 100
+    else:
+        detalle = rates.detalle_por_complejidad.get(complejidad, rates.detalle_default)
+    
+    costo_ganancia = costo_base * ganancia
+    costo_detalle = costo_base * detalle
+    subtotal_sin_admin = costo_base + costo_ganancia + costo_detalle
+    
+    # 9. Gastos administrativos
+    gastos_admin = subtotal_sin_admin * rates.admin
+    subtotal_con_admin = subtotal_sin_admin + gastos_admin
+    
+    # 10. Redondeo
+    valor_redondeado = redondear_al_multiplo(subtotal_con_admin, rates.multiplo_redondeo)
+    
+    # 11. Descuentos por cantidad
+    return CostComponents(
+        costo_cera=costo_cera,
+        costo_aditivo=costo_aditivo,
+        costo_fragancia=costo_fragancia,
+        costo_colorante=costo_colorante,
+        costo_pabilo=costo_pabilo,
+        costo_otros_insumos=costo_otros_insumos,
+        costo_base=costo_base,
+        costo_ganancia=costo_ganancia,
+        costo_detalle=costo_detalle,
+        subtotal_sin_admin=subtotal_sin_admin,
+        gastos_admin=gastos_admin,
+        subtotal_con_admin=subtotal_con_admin,
+        valor_redondeado=valor_redondeado,
+        descuentos_aplicables={
+            cantidad: valor_redondeado * factor for cantidad, factor in rates.descuentos
+        }
+    )
@@ -0,0 +1,46 @@
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import ClassVar, Dict, Optional, Tuple
+
+@dataclass(frozen=True, slots=True)
+class MoldePricing:
+    """Campos de un molde que usa el cálculo de precios, sin validación pydantic"""
+    FIELDS: ClassVar[Tuple[str, ...]] = ("peso_figura", "longitud_pabilo", "complejidad")
+    
+    id: str
+    peso_figura: Decimal
+    longitud_pabilo: Decimal
+    complejidad: str
+
+@dataclass(frozen=True, slots=True)
+class ProductoPricing:
+    """Campos de un producto que usan el cálculo de precios y `precios_calculados`
+    
+    Expone los mismos atributos que Producto para esos campos, así que el cálculo
+    por lotes lo acepta en su lugar.
+    """
+    FIELDS: ClassVar[Tuple[str, ...]] = (
+        "molde_id", "nombre", "categoria", "color_config",
+        "margen_ganancia_custom", "porcentaje_detalle_custom"
+    )
+    
+    id: str
+    molde_id: str
+    nombre: str
+    categoria: str
+    color_config: Dict
+    margen_ganancia_custom: Optional[Decimal] = None
+    porcentaje_detalle_custom: Optional[Decimal] = None
+
+@dataclass(frozen=True, slots=True)
+class PricingRevision:
+    """Revisiones (`updated_at`) del producto y su molde, para validar un precio memoizado
+    
+    `molde_updated_at` es None tanto si el molde nunca se editó como si no existe;
+    en los dos casos la cotización completa decide.
+    """
+    producto_id: str
+    molde_id: str
+    producto_updated_at: Optional[datetime]
+    molde_updated_at: Optional[datetime]
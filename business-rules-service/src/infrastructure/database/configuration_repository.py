@@ -1,13 +1,27 @@
-from typing import List, Optional, Dict
+import asyncio
+from typing import Any, List, Optional, Dict, Sequence, Tuple
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
-from datetime import datetime
+from datetime import datetime, timezone
+from pymongo import ASCENDING, DESCENDING
 from ...domain.entities.configuration import Configuration, ConfigurationHistory
 from decimal import Decimal
+from ..tracing import traced_repository
+from .projection import document_mapper
+from .indexes import index
 
+@traced_repository
 class ConfigurationRepository:
     """Repositorio para configuraciones del sistema"""
     
+    INDEXES = (
+        index("configurations", "key"),
+        index("configurations", "is_active"),
+        index("configurations", "category"),
+        # Sirve la paginación por (changed_at, _id) y las consultas "a una fecha"
+        index("configuration_history", "configuration_id", ("changed_at", -1), ("_id", -1)),
+    )
+    
     def __init__(self, database: AsyncIOMotorDatabase):
         self.db = database
         self.collection = database.configurations
@@ -60,17 +74,14 @@ class ConfigurationRepository:
         
         return configs
     
-    async def get_active_configs(self) -> List[Configuration]:
-        """Obtiene solo configuraciones activas"""
-        cursor = self.collection.find({"is_active": True})
-        configs = []
+    async def get_active_configs(self, fields: Optional[Sequence[str]] = None) -> List[Any]:
+        """Obtiene solo configuraciones activas
         
-        async for doc in cursor:
-            doc['id'] = str(doc['_id'])
-            del doc['_id']
-            configs.append(Configuration(**doc))
-        
-        return configs
+        Con `fields` devuelve dicts solo con esos campos (sin validación pydantic).
+        """
+        projection, to_item = document_mapper(Configuration, fields=fields)
+        cursor = self.collection.find({"is_active": True}, projection)
+        return [to_item(doc) async for doc in cursor]
     
     async def update(self, config: Configuration) -> Configuration:
         """Actualiza una configuración"""
@@ -91,11 +102,41 @@ class ConfigurationRepository:
         history.id = str(result.inserted_id)
         return history
     
-    async def get_history(self, config_id: str) -> List[ConfigurationHistory]:
-        """Obtiene el histórico de una configuración"""
-        cursor = self.history_collection.find(
-            {"configuration_id": config_id}
-        ).sort("changed_at", -1)
+    async def get_history(
+        self,
+        config_id: str,
+        limit: int = 50,
+        before: Optional[Tuple[datetime, str]] = None,
+        desde: Optional[datetime] = None,
+        hasta: Optional[datetime] = None
+    ) -> List[ConfigurationHistory]:
+        """Obtiene una página del histórico de una configuración, del cambio más reciente al más antiguo
+        
+        Paginación por keyset: `before` es el (changed_at, id) del último registro
+        de la página anterior, así cada página es un rango del índice y no
+        depende de cuántos cambios se saltan. `desde`/`hasta` acotan changed_at
+        (inclusive).
+        """
+        query: Dict[str, Any] = {"configuration_id": config_id}
+        rango = {}
+        if desde is not None:
+            rango["$gte"] = desde
+        if hasta is not None:
+            rango["$lte"] = hasta
+        if rango:
+            query["changed_at"] = rango
+        if before is not None:
+            changed_at, history_id = before
+            query["$or"] = [
+                {"changed_at": {"$lt": changed_at}},
+                {"changed_at": changed_at, "_id": {"$lt": ObjectId(history_id)}}
+            ]
+        
+        cursor = (
+            self.history_collection.find(query)
+            .sort([("changed_at", DESCENDING), ("_id", DESCENDING)])
+            .limit(limit)
+        )
         
         history = []
         async for doc in cursor:
@@ -105,13 +146,72 @@ class ConfigurationRepository:
         
         return history
     
+    async def _value_as_of(self, config: Dict[str, Any], timestamp: datetime) -> str:
+        config_id = str(config['_id'])
+        # Último cambio hasta la fecha: su new_value es el valor vigente
+        doc = await self.history_collection.find_one(
+            {"configuration_id": config_id, "changed_at": {"$lte": timestamp}},
+            {"new_value": 1},
+            sort=[("changed_at", DESCENDING), ("_id", DESCENDING)]
+        )
+        if doc:
+            return doc['new_value']
+        
+        # Sin cambios previos: el valor es el anterior al primer cambio posterior
+        doc = await self.history_collection.find_one(
+            {"configuration_id": config_id, "changed_at": {"$gt": timestamp}},
+            {"old_value": 1},
+            sort=[("changed_at", ASCENDING), ("_id", ASCENDING)]
+        )
+        return doc['old_value'] if doc else config['value']
+    
+    async def get_params_values_as_of(
+        self,
+        timestamp: datetime
+    ) -> Tuple[List[Dict[str, str]], Dict[int, Decimal]]:
+        """Reconstruye las configuraciones activas y los descuentos vigentes en `timestamp`
+        
+        Devuelve lo mismo que `get_active_configs(fields=("key", "value"))` y
+        `get_quantity_discounts()` devolverían en esa fecha. Cada valor sale de a
+        lo sumo dos búsquedas puntuales en el índice del histórico, sin recorrerlo.
+        Las configuraciones creadas después de `timestamp` se omiten; `is_active`
+        no tiene histórico, así que se usa el estado actual.
+        """
+        if timestamp.tzinfo is not None:
+            # MongoDB devuelve fechas UTC sin zona; se comparan en la misma forma
+            timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+        configs = [
+            doc async for doc in self.collection.find(
+                {}, {"key": 1, "value": 1, "category": 1, "is_active": 1, "created_at": 1}
+            )
+            if doc.get('created_at') is None or doc['created_at'] <= timestamp
+        ]
+        values = await asyncio.gather(*(self._value_as_of(doc, timestamp) for doc in configs))
+        
+        vigentes = [
+            {"key": doc['key'], "value": value, "category": doc.get('category')}
+            for doc, value in zip(configs, values)
+        ]
+        active = [
+            {"key": item['key'], "value": item['value']}
+            for item, doc in zip(vigentes, configs)
+            if doc.get('is_active', True)
+        ]
+        return active, self._parse_quantity_discounts(vigentes)
+    
     async def get_quantity_discounts(self) -> Dict[int, Decimal]:
         """Obtiene descuentos por cantidad desde configuraciones"""
         # Buscar configuraciones de descuentos
-        cursor = self.collection.find({"category": "descuentos_cantidad"})
+        cursor = self.collection.find({"category": "descuentos_cantidad"}, {"key": 1, "value": 1})
+        return self._parse_quantity_discounts([doc async for doc in cursor])
+    
+    @staticmethod
+    def _parse_quantity_discounts(docs: List[Dict[str, Any]]) -> Dict[int, Decimal]:
         discounts = {}
         
-        async for doc in cursor:
+        for doc in docs:
+            if doc.get('category', 'descuentos_cantidad') != 'descuentos_cantidad':
+                continue
             if doc['key'].startswith('descuento_'):
                 try:
                     # Extraer cantidad del key (ej: descuento_10, descuento_50)
@@ -0,0 +1,80 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+import logging
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+IndexKey = Union[str, Tuple[str, int]]
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """Índice que un repositorio necesita para no recorrer toda la colección"""
+    collection: str
+    keys: Tuple[Tuple[str, int], ...]
+    unique: bool = False
+    # Solo indexa los documentos que cumplen el filtro (ej: unicidad entre trabajos en espera)
+    partial_filter: Optional[Dict[str, Any]] = field(default=None, hash=False)
+    
+    @property
+    def name(self) -> str:
+        # Mismo nombre que MongoDB genera por defecto, así se reconocen índices ya creados a mano
+        return "_".join(f"{field}_{direction}" for field, direction in self.keys)
+    
+    def to_model(self) -> IndexModel:
+        options = {"partialFilterExpression": self.partial_filter} if self.partial_filter else {}
+        return IndexModel(list(self.keys), name=self.name, unique=self.unique, **options)
+
+def index(
+    collection: str,
+    *keys: IndexKey,
+    unique: bool = False,
+    partial_filter: Optional[Dict[str, Any]] = None
+) -> IndexSpec:
+    """Declara un índice: `index("productos", "is_active", ("changed_at", -1))`"""
+    return IndexSpec(
+        collection=collection,
+        keys=tuple(key if isinstance(key, tuple) else (key, ASCENDING) for key in keys),
+        unique=unique,
+        partial_filter=partial_filter
+    )
+
+async def ensure_indexes(database, specs: Iterable[IndexSpec]) -> Dict[str, List[str]]:
+    """Crea los índices declarados que falten (idempotente)
+    
+    Un índice con el mismo nombre pero otra definición no se toca: se reporta en
+    `conflictos` para resolverlo a mano. Un error al crear un índice no impide
+    crear los demás.
+    """
+    resultado = {"creados": [], "existentes": [], "conflictos": [], "errores": []}
+    por_coleccion: Dict[str, List[IndexSpec]] = {}
+    for spec in specs:
+        por_coleccion.setdefault(spec.collection, []).append(spec)
+    
+    for nombre_coleccion, declarados in por_coleccion.items():
+        collection = database[nombre_coleccion]
+        actuales = {idx["name"]: idx async for idx in collection.list_indexes()}
+        
+        for spec in declarados:
+            etiqueta = f"{nombre_coleccion}.{spec.name}"
+            actual = actuales.get(spec.name)
+            if actual is not None:
+                if (
+                    list(actual["key"].items()) != list(spec.keys)
+                    or bool(actual.get("unique")) != spec.unique
+                    or (actual.get("partialFilterExpression") or None) != spec.partial_filter
+                ):
+                    resultado["conflictos"].append(etiqueta)
+                else:
+                    resultado["existentes"].append(etiqueta)
+                continue
+            
+            try:
+                await collection.create_indexes([spec.to_model()])
+                resultado["creados"].append(etiqueta)
+            except OperationFailure as e:
+                logger.error("No se pudo crear el índice %s: %s", etiqueta, e)
+                resultado["errores"].append(etiqueta)
+    
+    return resultado
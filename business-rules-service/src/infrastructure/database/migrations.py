@@ -0,0 +1,36 @@
+from typing import Dict, List
+import logging
+from .indexes import IndexSpec, ensure_indexes
+from .configuration_repository import ConfigurationRepository
+from .molde_repository import MoldeRepository
+from .producto_repository import ProductoRepository
+from .precio_calculado_repository import PrecioCalculadoRepository
+from .params_snapshot_repository import ParamsSnapshotRepository
+from ..jobs.queue import MongoJobQueue
+
+logger = logging.getLogger(__name__)
+
+# Cada clase declara en INDEXES los índices que usan sus consultas
+INDEXED_REPOSITORIES = (
+    ConfigurationRepository,
+    MoldeRepository,
+    ProductoRepository,
+    PrecioCalculadoRepository,
+    ParamsSnapshotRepository,
+    MongoJobQueue,
+)
+
+def required_indexes() -> List[IndexSpec]:
+    return [spec for repository in INDEXED_REPOSITORIES for spec in repository.INDEXES]
+
+async def apply_index_migrations(database) -> Dict[str, List[str]]:
+    """Crea al arrancar los índices que falten; los existentes no se recrean"""
+    resultado = await ensure_indexes(database, required_indexes())
+    if resultado["creados"]:
+        logger.info("Índices creados: %s", ", ".join(resultado["creados"]))
+    if resultado["conflictos"]:
+        logger.warning(
+            "Índices con otra definición en la base (no se modificaron): %s",
+            ", ".join(resultado["conflictos"])
+        )
+    return resultado
@@ -1,16 +1,41 @@
-from typing import List, Optional
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
 from datetime import datetime
+from pymongo import ReturnDocument
+import logging
 from ...domain.entities.molde import Molde, MoldeInsumo
+from ...domain.value_objects.pricing_records import MoldePricing
+from .projection import document_mapper, to_molde_pricing
+from .indexes import index
+from ..tracing import traced_repository
 
+logger = logging.getLogger(__name__)
+
+def _pricing_values(doc: Dict[str, Any]) -> tuple:
+    """Valores del molde que entran al cálculo de precios, normalizados para compararlos"""
+    pricing = to_molde_pricing(doc)
+    return tuple(getattr(pricing, field) for field in MoldePricing.FIELDS)
+
+@traced_repository
 class MoldeRepository:
     """Repositorio para moldes"""
     
-    def __init__(self, database: AsyncIOMotorDatabase):
+    INDEXES = (
+        index("moldes", "is_active"),
+        index("molde_insumos", "molde_id"),
+    )
+    
+    def __init__(
+        self,
+        database: AsyncIOMotorDatabase,
+        on_pricing_change: Optional[Callable[[List[str]], Awaitable[Any]]] = None
+    ):
         self.db = database
         self.collection = database.moldes
         self.molde_insumos_collection = database.molde_insumos
+        # Se llama con los ids de los moldes cuyo peso, pabilo o complejidad cambió
+        self.on_pricing_change = on_pricing_change
     
     async def create(self, molde: Molde) -> Molde:
         """Crea un nuevo molde"""
@@ -34,28 +59,68 @@ class MoldeRepository:
             return None
         return None
     
-    async def get_all_active(self) -> List[Molde]:
-        """Obtiene todos los moldes activos"""
-        cursor = self.collection.find({"is_active": True})
-        moldes = []
+    @staticmethod
+    def _mapper(fields: Optional[Sequence[str]], raw: bool):
+        return document_mapper(Molde, (MoldePricing.FIELDS, to_molde_pricing), fields, raw)
+    
+    async def find_many_by_ids(
+        self,
+        molde_ids: Iterable[str],
+        fields: Optional[Sequence[str]] = None,
+        raw: bool = False
+    ) -> Dict[str, Any]:
+        """Obtiene varios moldes en una sola consulta `$in`, indexados por ID
+        
+        Con `raw` devuelve MoldePricing (solo los campos del cálculo) y con
+        `fields` dicts con esos campos; por defecto, Molde completos.
+        """
+        object_ids = [ObjectId(molde_id) for molde_id in set(molde_ids) if ObjectId.is_valid(molde_id)]
+        if not object_ids:
+            return {}
+        
+        projection, to_item = self._mapper(fields, raw)
+        cursor = self.collection.find({"_id": {"$in": object_ids}}, projection)
+        moldes = {}
         
         async for doc in cursor:
-            doc['id'] = str(doc['_id'])
-            del doc['_id']
-            moldes.append(Molde(**doc))
+            moldes[str(doc['_id'])] = to_item(doc)
         
         return moldes
     
+    async def get_all_active(self, fields: Optional[Sequence[str]] = None, raw: bool = False) -> List[Any]:
+        """Obtiene todos los moldes activos (mismos modos que `find_many_by_ids`)"""
+        projection, to_item = self._mapper(fields, raw)
+        cursor = self.collection.find({"is_active": True}, projection)
+        return [to_item(doc) async for doc in cursor]
+    
     async def update(self, molde: Molde) -> Molde:
-        """Actualiza un molde"""
+        """Actualiza un molde
+        
+        Si cambia alguno de los campos del cálculo (`MoldePricing.FIELDS`) avisa a
+        `on_pricing_change` para recalcular los productos de ese molde; cambios de
+        nombre, descripción o imagen no mueven ningún precio.
+        """
         molde_dict = molde.dict(exclude={'id'})
         molde_dict['updated_at'] = datetime.utcnow()
         
-        await self.collection.update_one(
+        anterior = await self.collection.find_one_and_update(
             {"_id": ObjectId(molde.id)},
-            {"$set": molde_dict}
+            {"$set": molde_dict},
+            projection={field: 1 for field in MoldePricing.FIELDS},
+            return_document=ReturnDocument.BEFORE
         )
         
+        if (
+            self.on_pricing_change is not None
+            and anterior is not None
+            and _pricing_values(anterior) != _pricing_values({**molde_dict, "_id": anterior["_id"]})
+        ):
+            try:
+                await self.on_pricing_change([molde.id])
+            except Exception as e:
+                # El molde ya está guardado; el recálculo se puede pedir luego con /calculations/reprice
+                logger.warning("No se pudo encolar el recálculo del molde %s: %s", molde.id, e)
+        
         return molde
     
     async def get_insumos_for_molde(self, molde_id: str) -> List[MoldeInsumo]:
@@ -0,0 +1,39 @@
+from typing import Any, Dict, List
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+from ..tracing import traced_repository
+from .indexes import index
+
+@traced_repository
+class ParamsSnapshotRepository:
+    """Repositorio de versiones inmutables de CalculationParams (`params_snapshots`)
+    
+    Los documentos solo se insertan, nunca se modifican. Cada uno guarda el
+    delta respecto de la versión anterior, salvo los keyframes que guardan
+    todos los valores.
+    """
+    
+    INDEXES = (
+        # La versión única serializa a los escritores de distintas réplicas
+        index("params_snapshots", "version", unique=True),
+    )
+    
+    def __init__(self, database: AsyncIOMotorDatabase):
+        self.db = database
+        self.collection = database.params_snapshots
+    
+    async def insert(self, snapshot: Dict[str, Any]) -> bool:
+        """Inserta una versión; False si otro proceso ya escribió ese número de versión"""
+        try:
+            await self.collection.insert_one(dict(snapshot))
+        except DuplicateKeyError:
+            return False
+        return True
+    
+    async def find_since(self, version: int) -> List[Dict[str, Any]]:
+        """Versiones posteriores a `version`, en orden"""
+        cursor = self.collection.find(
+            {"version": {"$gt": version}}, {"_id": 0}
+        ).sort("version", ASCENDING)
+        return [doc async for doc in cursor]
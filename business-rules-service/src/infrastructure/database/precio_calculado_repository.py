@@ -0,0 +1,102 @@
+from typing import Any, Dict, List, Optional
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from bson import ObjectId
+from pymongo import ASCENDING, ReplaceOne
+from ...domain.entities.precio_calculado import PrecioCalculado
+from ..tracing import traced_repository
+from .indexes import index
+
+# Campos por los que se puede ordenar un rango
+ORDEN_CAMPOS = ("precio", "margen_porcentual")
+
+@traced_repository
+class PrecioCalculadoRepository:
+    """Repositorio de la vista materializada de precios (`precios_calculados`)
+    
+    Cada documento usa el mismo _id que el producto, así que reescribir un
+    producto reemplaza su fila en lugar de duplicarla.
+    """
+    
+    # Terminan en _id para que el orden de `find_range` salga del índice sin sort en memoria
+    INDEXES = tuple(
+        spec
+        for campo in ORDEN_CAMPOS
+        for spec in (
+            index("precios_calculados", "categoria", campo, "_id"),
+            index("precios_calculados", campo, "_id"),
+        )
+    )
+    
+    def __init__(self, database: AsyncIOMotorDatabase):
+        self.db = database
+        self.collection = database.precios_calculados
+    
+    @staticmethod
+    def _to_precio(doc: Dict) -> PrecioCalculado:
+        del doc['_id']
+        return PrecioCalculado(**doc)
+    
+    async def bulk_upsert(self, filas: List[Dict[str, Any]]) -> int:
+        """Reemplaza (o crea) las filas de varios productos con un solo bulk_write"""
+        if not filas:
+            return 0
+        
+        operations = [
+            ReplaceOne({"_id": ObjectId(fila["producto_id"])}, fila, upsert=True)
+            for fila in filas
+        ]
+        result = await self.collection.bulk_write(operations, ordered=False)
+        return result.matched_count + result.upserted_count
+    
+    async def delete_stale(self, recalculo_id: str) -> int:
+        """Elimina las filas que un recálculo completo no reescribió
+        
+        Son productos desactivados o eliminados, o que ya no tienen molde.
+        """
+        result = await self.collection.delete_many({"recalculo_id": {"$ne": recalculo_id}})
+        return result.deleted_count
+    
+    async def get_by_producto_id(self, producto_id: str) -> Optional[PrecioCalculado]:
+        """Obtiene la fila de un producto"""
+        if not ObjectId.is_valid(producto_id):
+            return None
+        doc = await self.collection.find_one({"_id": ObjectId(producto_id)})
+        return self._to_precio(doc) if doc else None
+    
+    async def find_range(
+        self,
+        categoria: Optional[str] = None,
+        precio_min: Optional[int] = None,
+        precio_max: Optional[int] = None,
+        margen_min: Optional[float] = None,
+        margen_max: Optional[float] = None,
+        orden: str = "precio",
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[PrecioCalculado]:
+        """Filas de una categoría y/o banda de precio y/o rango de margen"""
+        if orden not in ORDEN_CAMPOS:
+            raise ValueError(f"Orden inválido: {orden}")
+        
+        query: Dict[str, Any] = {}
+        if categoria is not None:
+            query["categoria"] = categoria
+        for campo, minimo, maximo in (
+            ("precio", precio_min, precio_max),
+            ("margen_porcentual", margen_min, margen_max)
+        ):
+            rango = {}
+            if minimo is not None:
+                rango["$gte"] = minimo
+            if maximo is not None:
+                rango["$lte"] = maximo
+            if rango:
+                query[campo] = rango
+        
+        cursor = (
+            self.collection.find(query)
+            .sort([(orden, ASCENDING), ("_id", ASCENDING)])
+            .skip(skip)
+            .limit(limit)
+        )
+        return [self._to_precio(doc) async for doc in cursor]
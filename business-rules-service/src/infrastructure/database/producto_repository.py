@@ -1,12 +1,31 @@
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
+from pymongo import UpdateOne
+from decimal import Decimal
 from datetime import datetime
 from ...domain.entities.producto import Producto
+from ...domain.services.price_dependencies import ProductSelector
+from ...domain.value_objects.pricing_records import PricingRevision, ProductoPricing
+from .projection import document_mapper, to_producto_pricing
+from .indexes import index
+from ..tracing import traced_repository
 
+@traced_repository
 class ProductoRepository:
     """Repositorio para productos del catálogo"""
     
+    INDEXES = (
+        # Recorrido por lotes de iter_active_products (filtro + orden + reanudación por _id)
+        index("productos", "is_active", "_id"),
+        index("productos", "categoria", "is_active"),
+        # Una rama del $or de _selector_conditions cada uno
+        index("productos", "molde_id"),
+        index("productos", "margen_ganancia_custom"),
+        index("productos", "porcentaje_detalle_custom"),
+        index("productos", "color_config.cantidad_gotas"),
+    )
+    
     def __init__(self, database: AsyncIOMotorDatabase):
         self.db = database
         self.collection = database.productos
@@ -33,18 +52,67 @@ class ProductoRepository:
             return None
         return None
     
-    async def get_active_products(self) -> List[Producto]:
-        """Obtiene todos los productos activos"""
-        cursor = self.collection.find({"is_active": True})
-        productos = []
+    async def get_pricing_revision(self, producto_id: str) -> Optional[PricingRevision]:
+        """`updated_at` del producto y de su molde en una sola consulta (sin cargar los documentos)"""
+        if not ObjectId.is_valid(producto_id):
+            return None
+        cursor = self.collection.aggregate([
+            {"$match": {"_id": ObjectId(producto_id)}},
+            {"$project": {"molde_id": 1, "updated_at": 1}},
+            {"$lookup": {
+                "from": "moldes",
+                "let": {"molde_id": {"$convert": {"input": "$molde_id", "to": "objectId", "onError": None}}},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$_id", "$$molde_id"]}}},
+                    {"$project": {"_id": 0, "updated_at": 1}}
+                ],
+                "as": "molde"
+            }}
+        ])
+        async for doc in cursor:
+            molde = doc["molde"][0] if doc["molde"] else {}
+            return PricingRevision(
+                producto_id=producto_id,
+                molde_id=doc.get("molde_id"),
+                producto_updated_at=doc.get("updated_at"),
+                molde_updated_at=molde.get("updated_at")
+            )
+        return None
+    
+    @staticmethod
+    def _mapper(fields: Optional[Sequence[str]], raw: bool):
+        return document_mapper(Producto, (ProductoPricing.FIELDS, to_producto_pricing), fields, raw)
+    
+    async def find_many_by_ids(
+        self,
+        producto_ids: Iterable[str],
+        fields: Optional[Sequence[str]] = None,
+        raw: bool = False
+    ) -> Dict[str, Any]:
+        """Obtiene varios productos en una sola consulta `$in`, indexados por ID
+        
+        Con `raw` devuelve ProductoPricing (solo los campos del cálculo) y con
+        `fields` dicts con esos campos; por defecto, Producto completos.
+        """
+        object_ids = [ObjectId(producto_id) for producto_id in set(producto_ids) if ObjectId.is_valid(producto_id)]
+        if not object_ids:
+            return {}
+        
+        projection, to_item = self._mapper(fields, raw)
+        cursor = self.collection.find({"_id": {"$in": object_ids}}, projection)
+        productos = {}
         
         async for doc in cursor:
-            doc['id'] = str(doc['_id'])
-            del doc['_id']
-            productos.append(Producto(**doc))
+            productos[str(doc['_id'])] = to_item(doc)
         
         return productos
     
+    async def get_active_products(self, fields: Optional[Sequence[str]] = None, raw: bool = False) -> List[Any]:
+        """Obtiene todos los productos activos (mismos modos que `find_many_by_ids`)"""
+        projection, to_item = self._mapper(fields, raw)
+        cursor = self.collection.find({"is_active": True}, projection)
+        return [to_item(doc) async for doc in cursor]
+    
     async def update(self, producto: Producto) -> Producto:
         """Actualiza un producto"""
         producto_dict = producto.dict(exclude={'id', 'costo_calculado', 'desglose_costos'})
@@ -68,3 +136,68 @@ class ProductoRepository:
             productos.append(Producto(**doc))
         
         return productos
+    
+    async def iter_active_products(
+        self,
+        after_id: Optional[str] = None,
+        batch_size: int = 500,
+        selector: Optional[ProductSelector] = None,
+        fields: Optional[Sequence[str]] = None,
+        raw: bool = False
+    ) -> AsyncIterator[List[Any]]:
+        """Recorre los productos activos en orden de _id, en lotes de `batch_size`
+        
+        Con `after_id` continúa después de ese producto (para reanudar un recálculo)
+        y con `selector` recorre solo los productos afectados por un cambio.
+        `fields` y `raw` funcionan como en `find_many_by_ids`.
+        """
+        query = {"is_active": True}
+        if selector is not None and not selector.todos:
+            if selector.is_empty:
+                return
+            query["$or"] = self._selector_conditions(selector)
+        if after_id:
+            query["_id"] = {"$gt": ObjectId(after_id)}
+        
+        projection, to_item = self._mapper(fields, raw)
+        cursor = self.collection.find(query, projection).sort("_id", 1).batch_size(batch_size)
+        lote = []
+        
+        async for doc in cursor:
+            lote.append(to_item(doc))
+            if len(lote) >= batch_size:
+                yield lote
+                lote = []
+        
+        if lote:
+            yield lote
+    
+    @staticmethod
+    def _selector_conditions(selector: ProductSelector) -> List[Dict]:
+        conditions = []
+        if selector.sin_margen_custom:
+            conditions.append({"margen_ganancia_custom": {"$in": [None, 0]}})
+        if selector.sin_detalle_custom:
+            conditions.append({"porcentaje_detalle_custom": {"$in": [None, 0]}})
+        if selector.con_colorante:
+            conditions.append({"color_config.cantidad_gotas": {"$gt": 0}})
+        if selector.molde_ids:
+            conditions.append({"molde_id": {"$in": sorted(selector.molde_ids)}})
+        return conditions
+    
+    async def bulk_update_precios(self, precios: Dict[str, Decimal]) -> int:
+        """Actualiza `precio_sugerido` de varios productos con un solo bulk_write"""
+        if not precios:
+            return 0
+        
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {"_id": ObjectId(producto_id)},
+                # El precio redondeado es un múltiplo entero de multiplo_redondeo
+                {"$set": {"precio_sugerido": int(precio), "updated_at": now}}
+            )
+            for producto_id, precio in precios.items()
+        ]
+        result = await self.collection.bulk_write(operations, ordered=False)
+        return result.matched_count
@@ -0,0 +1,54 @@
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, Type
+from pydantic import BaseModel
+from ...domain.value_objects.pricing_batch import to_decimal
+from ...domain.value_objects.pricing_records import MoldePricing, ProductoPricing
+
+DocumentMapper = Callable[[Dict[str, Any]], Any]
+
+def _optional_decimal(value: Any):
+    return to_decimal(value) if value is not None else None
+
+def to_dict(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Documento tal cual, con `id` como string en lugar de `_id`"""
+    doc['id'] = str(doc.pop('_id'))
+    return doc
+
+def to_molde_pricing(doc: Dict[str, Any]) -> MoldePricing:
+    return MoldePricing(
+        id=str(doc['_id']),
+        peso_figura=to_decimal(doc['peso_figura']),
+        longitud_pabilo=to_decimal(doc['longitud_pabilo']),
+        complejidad=str(doc['complejidad']).lower()
+    )
+
+def to_producto_pricing(doc: Dict[str, Any]) -> ProductoPricing:
+    return ProductoPricing(
+        id=str(doc['_id']),
+        molde_id=doc['molde_id'],
+        nombre=doc['nombre'],
+        categoria=doc['categoria'],
+        color_config=doc.get('color_config') or {},
+        margen_ganancia_custom=_optional_decimal(doc.get('margen_ganancia_custom')),
+        porcentaje_detalle_custom=_optional_decimal(doc.get('porcentaje_detalle_custom'))
+    )
+
+def document_mapper(
+    model: Type[BaseModel],
+    record: Optional[Tuple[Sequence[str], DocumentMapper]] = None,
+    fields: Optional[Sequence[str]] = None,
+    raw: bool = False
+) -> Tuple[Optional[Dict[str, int]], DocumentMapper]:
+    """Proyección de MongoDB y función de mapeo según el modo de lectura
+    
+    - `raw`: solo los campos del registro liviano (`record`: campos y constructor)
+    - `fields`: solo esos campos, como dict con `id` y sin validación
+    - por defecto: documento completo validado con el modelo pydantic
+    """
+    if raw:
+        if record is None:
+            raise ValueError(f"{model.__name__} no tiene modo raw")
+        record_fields, constructor = record
+        return {field: 1 for field in record_fields}, constructor
+    if fields is not None:
+        return {field: 1 for field in fields}, to_dict
+    return None, lambda doc: model(**to_dict(doc))
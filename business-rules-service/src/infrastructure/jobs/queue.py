@@ -0,0 +1,323 @@
+from typing import Any, Dict, List, Optional, Sequence
+from datetime import datetime, timedelta
+import asyncio
+import os
+import uuid
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from ...domain.entities.job import Job, JobStatus
+from ..database.indexes import index
+
+JOB_QUEUE_BACKEND = os.getenv("JOB_QUEUE_BACKEND", "mongo")  # "mongo" o "memory"
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+# Un trabajo que tumba al worker en cada intento no se reintenta para siempre
+EXHAUSTED_ERROR = "Se agotaron los intentos (el worker dejó de renovar el lease)"
+
+class JobQueue:
+    """Cola de trabajos con leases
+    
+    Un worker toma un trabajo con `claim` y lo mantiene mientras renueve el lease
+    con `update_progress` o `renew_lease`. Si el proceso muere, el lease vence y otro worker
+    (de esta u otra réplica) lo retoma desde el último progreso guardado.
+    """
+    
+    def __init__(self, lease_seconds: float = JOB_LEASE_SECONDS, max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.lease = timedelta(seconds=lease_seconds)
+        self.max_attempts = max_attempts
+    
+    async def enqueue(self, job: Job) -> Job:
+        """Encola el trabajo; si ya hay uno en espera del mismo tipo y payload devuelve ese
+        
+        Solo se reutilizan trabajos en espera: uno que ya está corriendo pudo haber
+        leído datos anteriores al cambio que motiva el nuevo encolado.
+        """
+        raise NotImplementedError
+    
+    async def claim(self, worker_id: str, types: Sequence[str]) -> Optional[Job]:
+        raise NotImplementedError
+    
+    async def update_progress(self, job_id: str, worker_id: str, progress: Dict[str, Any]) -> bool:
+        """Guarda el progreso y renueva el lease; False si el trabajo ya no es de este worker"""
+        raise NotImplementedError
+    
+    async def renew_lease(self, job_id: str, worker_id: str) -> bool:
+        """Renueva el lease sin tocar el progreso; False si el trabajo ya no es de este worker"""
+        raise NotImplementedError
+    
+    async def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]):
+        raise NotImplementedError
+    
+    async def fail(self, job_id: str, worker_id: str, error: str):
+        raise NotImplementedError
+    
+    async def get(self, job_id: str) -> Optional[Job]:
+        raise NotImplementedError
+    
+    async def list(self, job_type: Optional[str] = None, limit: int = 20) -> List[Job]:
+        raise NotImplementedError
+
+class InMemoryJobQueue(JobQueue):
+    """Cola en memoria del proceso (pruebas y desarrollo); no sobrevive reinicios"""
+    
+    def __init__(self, lease_seconds: float = JOB_LEASE_SECONDS, max_attempts: int = JOB_MAX_ATTEMPTS):
+        super().__init__(lease_seconds, max_attempts)
+        self.jobs: Dict[str, Job] = {}
+        self._lock = asyncio.Lock()
+    
+    async def enqueue(self, job: Job) -> Job:
+        async with self._lock:
+            for existing in self.jobs.values():
+                if (existing.type == job.type and existing.payload == job.payload
+                        and existing.status == JobStatus.QUEUED):
+                    return existing.model_copy(deep=True)
+            job = job.model_copy(update={
+                "id": uuid.uuid4().hex,
+                "status": JobStatus.QUEUED,
+                "created_at": datetime.utcnow()
+            })
+            self.jobs[job.id] = job
+            return job.model_copy(deep=True)
+    
+    async def claim(self, worker_id: str, types: Sequence[str]) -> Optional[Job]:
+        async with self._lock:
+            now = datetime.utcnow()
+            for job in self.jobs.values():
+                if (job.status == JobStatus.RUNNING and job.lease_expires_at < now
+                        and job.attempts >= self.max_attempts):
+                    job.status = JobStatus.FAILED
+                    job.error = EXHAUSTED_ERROR
+                    job.finished_at = now
+            busy = {
+                job.lock_key for job in self.jobs.values()
+                if job.lock_key and job.status == JobStatus.RUNNING and job.lease_expires_at >= now
+            }
+            candidates = [
+                job for job in self.jobs.values()
+                if job.type in types and job.attempts < self.max_attempts
+                and (job.lock_key is None or job.lock_key not in busy) and (
+                    job.status == JobStatus.QUEUED
+                    or (job.status == JobStatus.RUNNING and job.lease_expires_at < now)
+                )
+            ]
+            if not candidates:
+                return None
+            job = min(candidates, key=lambda j: j.created_at)
+            job.status = JobStatus.RUNNING
+            job.worker_id = worker_id
+            job.attempts += 1
+            job.started_at = now
+            job.updated_at = now
+            job.lease_expires_at = now + self.lease
+            return job.model_copy(deep=True)
+    
+    def _owned(self, job_id: str, worker_id: str) -> Optional[Job]:
+        job = self.jobs.get(job_id)
+        if job is None or job.worker_id != worker_id or job.status != JobStatus.RUNNING:
+            return None
+        return job
+    
+    async def update_progress(self, job_id: str, worker_id: str, progress: Dict[str, Any]) -> bool:
+        async with self._lock:
+            job = self._owned(job_id, worker_id)
+            if job is None:
+                return False
+            now = datetime.utcnow()
+            job.progress = progress
+            job.updated_at = now
+            job.lease_expires_at = now + self.lease
+            return True
+    
+    async def renew_lease(self, job_id: str, worker_id: str) -> bool:
+        async with self._lock:
+            job = self._owned(job_id, worker_id)
+            if job is None:
+                return False
+            job.lease_expires_at = datetime.utcnow() + self.lease
+            return True
+    
+    async def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]):
+        await self._finish(job_id, worker_id, JobStatus.COMPLETED, result=result)
+    
+    async def fail(self, job_id: str, worker_id: str, error: str):
+        await self._finish(job_id, worker_id, JobStatus.FAILED, error=error)
+    
+    async def _finish(self, job_id: str, worker_id: str, status: JobStatus, **fields):
+        async with self._lock:
+            job = self._owned(job_id, worker_id)
+            if job is None:
+                return
+            now = datetime.utcnow()
+            job.status = status
+            job.finished_at = now
+            job.updated_at = now
+            job.lease_expires_at = None
+            for name, value in fields.items():
+                setattr(job, name, value)
+    
+    async def get(self, job_id: str) -> Optional[Job]:
+        job = self.jobs.get(job_id)
+        return job.model_copy(deep=True) if job else None
+    
+    async def list(self, job_type: Optional[str] = None, limit: int = 20) -> List[Job]:
+        jobs = [job for job in self.jobs.values() if job_type is None or job.type == job_type]
+        jobs.sort(key=lambda j: j.created_at, reverse=True)
+        return [job.model_copy(deep=True) for job in jobs[:limit]]
+
+class MongoJobQueue(JobQueue):
+    """Cola persistida en la colección `jobs`; el claim es atómico con find_one_and_update
+    
+    Dos índices únicos parciales hacen atómicas las reglas de la cola entre réplicas:
+    un solo trabajo en espera por (tipo, payload) y un solo trabajo corriendo por
+    `lock_key`.
+    """
+    
+    INDEXES = (
+        index("jobs", "type", "status", "created_at"),
+        # Leases vencidos y lock_keys ocupadas
+        index("jobs", "status", "lease_expires_at"),
+        index("jobs", "created_at"),
+        index("jobs", "type", "payload", unique=True, partial_filter={"status": JobStatus.QUEUED.value}),
+        index(
+            "jobs", "lock_key", unique=True,
+            partial_filter={"status": JobStatus.RUNNING.value, "lock_key": {"$type": "string"}}
+        ),
+    )
+    
+    def __init__(self, database, lease_seconds: float = JOB_LEASE_SECONDS, max_attempts: int = JOB_MAX_ATTEMPTS):
+        super().__init__(lease_seconds, max_attempts)
+        self.collection = database.jobs
+    
+    @staticmethod
+    def _to_job(doc: Optional[Dict]) -> Optional[Job]:
+        if not doc:
+            return None
+        doc['id'] = str(doc['_id'])
+        del doc['_id']
+        return Job(**doc)
+    
+    @staticmethod
+    def _object_id(job_id: str) -> Optional[ObjectId]:
+        return ObjectId(job_id) if ObjectId.is_valid(job_id) else None
+    
+    async def enqueue(self, job: Job) -> Job:
+        en_espera = {"type": job.type, "payload": job.payload, "status": JobStatus.QUEUED.value}
+        job_dict = job.dict(exclude={'id', 'type', 'payload', 'status'})
+        job_dict['created_at'] = datetime.utcnow()
+        
+        # El upsert crea el trabajo solo si no hay uno igual en espera; si dos réplicas
+        # insertan a la vez, el índice único deja pasar a una y la otra lee ese trabajo
+        for _ in range(3):
+            try:
+                doc = await self.collection.find_one_and_update(
+                    en_espera,
+                    {"$setOnInsert": job_dict},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+            except DuplicateKeyError:
+                doc = await self.collection.find_one(en_espera)
+            if doc is not None:
+                return self._to_job(doc)
+        raise RuntimeError(f"No se pudo encolar el trabajo {job.type}")
+    
+    async def claim(self, worker_id: str, types: Sequence[str]) -> Optional[Job]:
+        now = datetime.utcnow()
+        await self.collection.update_many(
+            {
+                "status": JobStatus.RUNNING.value,
+                "lease_expires_at": {"$lt": now},
+                "attempts": {"$gte": self.max_attempts}
+            },
+            {"$set": {"status": JobStatus.FAILED.value, "error": EXHAUSTED_ERROR, "finished_at": now}}
+        )
+        # Solo descarta de antemano las lock_keys ocupadas; la exclusión real la garantiza
+        # el índice único parcial sobre lock_key de los trabajos corriendo
+        busy = await self.collection.distinct("lock_key", {
+            "status": JobStatus.RUNNING.value,
+            "lease_expires_at": {"$gte": now},
+            "lock_key": {"$ne": None}
+        })
+        try:
+            doc = await self.collection.find_one_and_update(
+                {
+                    "type": {"$in": list(types)},
+                    "attempts": {"$lt": self.max_attempts},
+                    "lock_key": {"$nin": busy},
+                    "$or": [
+                        {"status": JobStatus.QUEUED.value},
+                        {"status": JobStatus.RUNNING.value, "lease_expires_at": {"$lt": now}}
+                    ]
+                },
+                {
+                    "$set": {
+                        "status": JobStatus.RUNNING.value,
+                        "worker_id": worker_id,
+                        "started_at": now,
+                        "updated_at": now,
+                        "lease_expires_at": now + self.lease
+                    },
+                    "$inc": {"attempts": 1}
+                },
+                sort=[("created_at", ASCENDING)],
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Otra réplica tomó un trabajo con la misma lock_key entre la lectura y el claim
+            return None
+        return self._to_job(doc)
+    
+    def _owned_filter(self, job_id: str, worker_id: str) -> Dict:
+        return {"_id": self._object_id(job_id), "worker_id": worker_id, "status": JobStatus.RUNNING.value}
+    
+    async def update_progress(self, job_id: str, worker_id: str, progress: Dict[str, Any]) -> bool:
+        now = datetime.utcnow()
+        result = await self.collection.update_one(
+            self._owned_filter(job_id, worker_id),
+            {"$set": {"progress": progress, "updated_at": now, "lease_expires_at": now + self.lease}}
+        )
+        return result.matched_count == 1
+    
+    async def renew_lease(self, job_id: str, worker_id: str) -> bool:
+        result = await self.collection.update_one(
+            self._owned_filter(job_id, worker_id),
+            {"$set": {"lease_expires_at": datetime.utcnow() + self.lease}}
+        )
+        return result.matched_count == 1
+    
+    async def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]):
+        await self._finish(job_id, worker_id, JobStatus.COMPLETED, {"result": result})
+    
+    async def fail(self, job_id: str, worker_id: str, error: str):
+        await self._finish(job_id, worker_id, JobStatus.FAILED, {"error": error})
+    
+    async def _finish(self, job_id: str, worker_id: str, status: JobStatus, fields: Dict[str, Any]):
+        now = datetime.utcnow()
+        await self.collection.update_one(
+            self._owned_filter(job_id, worker_id),
+            {"$set": {
+                **fields,
+                "status": status.value,
+                "finished_at": now,
+                "updated_at": now,
+                "lease_expires_at": None
+            }}
+        )
+    
+    async def get(self, job_id: str) -> Optional[Job]:
+        object_id = self._object_id(job_id)
+        if object_id is None:
+            return None
+        return self._to_job(await self.collection.find_one({"_id": object_id}))
+    
+    async def list(self, job_type: Optional[str] = None, limit: int = 20) -> List[Job]:
+        query = {"type": job_type} if job_type else {}
+        cursor = self.collection.find(query).sort("created_at", -1).limit(limit)
+        return [self._to_job(doc) async for doc in cursor]
+
+def build_job_queue(database, backend: str = JOB_QUEUE_BACKEND) -> JobQueue:
+    if backend == "memory":
+        return InMemoryJobQueue()
+    return MongoJobQueue(database)
@@ -0,0 +1,133 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from ...domain.entities.job import Job
+from .queue import JobQueue
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+
+ProgressReporter = Callable[[Dict[str, Any]], Awaitable[None]]
+JobHandler = Callable[[Job, ProgressReporter], Awaitable[Dict[str, Any]]]
+
+class JobCancelled(Exception):
+    """El trabajo fue retomado por otro worker (lease vencido) y este debe abandonarlo"""
+
+class JobWorkerPool:
+    """Pool de workers async que procesa trabajos de la cola
+    
+    `concurrency` limita cuántos trabajos corren a la vez en este proceso.
+    Los workers duermen hasta `notify()` (trabajo encolado localmente) o hasta
+    `poll_interval` (trabajos encolados por otra réplica o leases vencidos).
+    Mientras un trabajo corre, un heartbeat renueva su lease cada tercio del lease.
+    """
+    
+    def __init__(
+        self,
+        queue: JobQueue,
+        handlers: Dict[str, JobHandler],
+        concurrency: int = JOB_WORKERS,
+        poll_interval: float = JOB_POLL_INTERVAL
+    ):
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+    
+    def start(self):
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+    
+    async def stop(self):
+        """Cancela los workers; los trabajos en curso se retoman cuando vence su lease"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+    
+    def notify(self):
+        self._wakeup.set()
+    
+    async def _work(self):
+        while True:
+            try:
+                job = await self.queue.claim(self.worker_id, list(self.handlers))
+            except Exception as e:
+                logger.warning("No se pudo tomar un trabajo de la cola: %s", e)
+                job = None
+            
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            try:
+                await self.run(job)
+            except Exception:
+                # Falló el registro del resultado; al vencer el lease el trabajo vuelve a la cola
+                logger.exception("No se pudo registrar el resultado del trabajo %s", job.id)
+    
+    async def run(self, job: Job):
+        async def report_progress(progress: Dict[str, Any]):
+            if not await self.queue.update_progress(job.id, self.worker_id, progress):
+                raise JobCancelled(job.id)
+        
+        handler = asyncio.create_task(self.handlers[job.type](job, report_progress))
+        heartbeat = asyncio.create_task(self._heartbeat(job, handler))
+        try:
+            result = await handler
+        except JobCancelled:
+            logger.info("Trabajo %s retomado por otro worker", job.id)
+        except asyncio.CancelledError:
+            # Cancelado por el heartbeat (lease perdido) y no por stop()
+            if not heartbeat.done() or heartbeat.cancelled() or not heartbeat.result():
+                raise
+            logger.info("Trabajo %s retomado por otro worker", job.id)
+        except Exception as e:
+            logger.exception("Trabajo %s falló", job.id)
+            await self.queue.fail(job.id, self.worker_id, f"{type(e).__name__}: {e}")
+        else:
+            await self.queue.complete(job.id, self.worker_id, result)
+        finally:
+            heartbeat.cancel()
+    
+    async def _heartbeat(self, job: Job, handler: asyncio.Task) -> bool:
+        """Renueva el lease mientras corre el handler, aunque un lote tarde más que el lease
+        
+        Devuelve True si el trabajo dejó de ser de este worker; entonces cancela el handler
+        para que no siga escribiendo en paralelo con quien lo retomó.
+        """
+        interval = self.queue.lease.total_seconds() / 3
+        while not handler.done():
+            await asyncio.sleep(interval)
+            try:
+                owned = await self.queue.renew_lease(job.id, self.worker_id)
+            except Exception as e:
+                logger.warning("No se pudo renovar el lease del trabajo %s: %s", job.id, e)
+                continue
+            if not owned:
+                handler.cancel()
+                return True
+        return False
+
+class JobRuntime:
+    queue: Optional[JobQueue] = None
+    pool: Optional[JobWorkerPool] = None
+
+job_runtime = JobRuntime()
+
+def get_job_queue() -> JobQueue:
+    """Obtiene la cola de trabajos creada en el arranque del servicio"""
+    return job_runtime.queue
@@ -0,0 +1,170 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+import asyncio
+import logging
+import os
+import time
+from pymongo.errors import OperationFailure, PyMongoError
+from ..domain.value_objects.calculation_params import CalculationParams
+
+logger = logging.getLogger(__name__)
+
+# Red de seguridad: aunque se pierda un evento, el snapshot no vive más que esto
+PARAMS_CACHE_TTL = float(os.getenv("PARAMS_CACHE_TTL", "300"))
+# "auto" (change stream con fallback a polling), "change_stream", "poll" u "off"
+PARAMS_WATCH_MODE = os.getenv("PARAMS_WATCH_MODE", "auto")
+PARAMS_POLL_INTERVAL = float(os.getenv("PARAMS_POLL_INTERVAL", "5"))
+
+@dataclass(frozen=True)
+class ParamsSnapshot:
+    """Versión inmutable de los parámetros de cálculo"""
+    version: int
+    params: CalculationParams
+    loaded_at: datetime
+
+class CalculationParamsCache:
+    """Snapshot en memoria de CalculationParams compartido por todo el proceso
+
+    Solo va a la base de datos cuando no hay snapshot, cuando se invalidó o
+    cuando venció el TTL. Las recargas concurrentes se serializan con un lock
+    y cada recarga incrementa `version` (contador local del proceso; la versión
+    comparable entre réplicas es la de `params_snapshots`).
+    """
+
+    def __init__(self, ttl: Optional[float] = PARAMS_CACHE_TTL, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self.version = 0
+        self.loads = 0
+        self._snapshot: Optional[ParamsSnapshot] = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self) -> bool:
+        return self._snapshot is not None and self.clock() < self._expires_at
+
+    async def get_snapshot(self, loader: Callable[[], Awaitable[CalculationParams]]) -> ParamsSnapshot:
+        if self._is_fresh():
+            return self._snapshot
+
+        async with self._lock:
+            if self._is_fresh():
+                return self._snapshot
+
+            generation = self._generation
+            params = await loader()
+            self.loads += 1
+            self.version += 1
+            snapshot = ParamsSnapshot(version=self.version, params=params, loaded_at=datetime.utcnow())
+
+            # Si se invalidó mientras se cargaba, el resultado se usa una vez pero no se guarda
+            if generation == self._generation:
+                self._snapshot = snapshot
+                self._expires_at = self.clock() + self.ttl if self.ttl else float("inf")
+            return snapshot
+
+    async def get(self, loader: Callable[[], Awaitable[CalculationParams]]) -> CalculationParams:
+        return (await self.get_snapshot(loader)).params
+
+    def invalidate(self):
+        self._generation += 1
+        self._snapshot = None
+        self._expires_at = 0.0
+
+    @property
+    def snapshot(self) -> Optional[ParamsSnapshot]:
+        return self._snapshot
+
+class ConfigurationWatcher:
+    """Invalida el cache cuando cambian las configuraciones en MongoDB
+
+    Usa change streams si la base es un replica set; si no están disponibles,
+    compara periódicamente un fingerprint (cantidad y último updated_at/created_at)
+    de la colección. Así todas las réplicas del servicio se mantienen coherentes.
+    """
+
+    def __init__(
+        self,
+        collection,
+        cache: CalculationParamsCache,
+        mode: str = PARAMS_WATCH_MODE,
+        poll_interval: float = PARAMS_POLL_INTERVAL
+    ):
+        self.collection = collection
+        self.cache = cache
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.active_mode: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.mode == "off" or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        if self.mode in ("auto", "change_stream"):
+            try:
+                await self._watch_change_stream()
+                return
+            except OperationFailure as e:
+                if self.mode == "change_stream":
+                    raise
+                logger.info("Change streams no disponibles (%s), usando polling", e)
+        await self._poll()
+
+    async def _watch_change_stream(self):
+        while True:
+            try:
+                async with self.collection.watch() as stream:
+                    self.active_mode = "change_stream"
+                    # Lo que haya cambiado antes de abrir el stream no se vio
+                    self.cache.invalidate()
+                    async for _change in stream:
+                        self.cache.invalidate()
+            except OperationFailure:
+                raise
+            except PyMongoError as e:
+                logger.warning("Change stream interrumpido (%s), reabriendo", e)
+                self.cache.invalidate()
+                await asyncio.sleep(self.poll_interval)
+
+    async def _fingerprint(self):
+        cursor = self.collection.aggregate([{
+            "$group": {
+                "_id": None,
+                "count": {"$sum": 1},
+                "updated_at": {"$max": "$updated_at"},
+                "created_at": {"$max": "$created_at"}
+            }
+        }])
+        async for doc in cursor:
+            return doc["count"], doc["updated_at"], doc["created_at"]
+        return 0, None, None
+
+    async def _poll(self):
+        self.active_mode = "poll"
+        last = None
+        while True:
+            try:
+                current = await self._fingerprint()
+                if last is not None and current != last:
+                    self.cache.invalidate()
+                last = current
+            except PyMongoError as e:
+                logger.warning("No se pudo consultar configuraciones (%s)", e)
+            await asyncio.sleep(self.poll_interval)
+
+params_cache = CalculationParamsCache()
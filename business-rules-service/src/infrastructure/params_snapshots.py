@@ -0,0 +1,176 @@
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import asyncio
+import os
+from ..domain.value_objects.calculation_params import CalculationParams
+from ..domain.value_objects.params_snapshot import (
+    ParamsVersion, apply_delta, diff_values, flatten_params, unflatten_params
+)
+
+# Cada cuántas versiones se guarda un snapshot completo en lugar de un delta
+PARAMS_SNAPSHOT_KEYFRAME_INTERVAL = int(os.getenv("PARAMS_SNAPSHOT_KEYFRAME_INTERVAL", "20"))
+# Versiones materializadas como CalculationParams que se mantienen en memoria
+PARAMS_SNAPSHOT_MAX_MATERIALIZED = int(os.getenv("PARAMS_SNAPSHOT_MAX_MATERIALIZED", "64"))
+
+@dataclass(frozen=True, slots=True)
+class _Entry:
+    version: int
+    valid_from: datetime
+    full: bool
+    values: Dict[str, str]
+    removed: Tuple[str, ...]
+
+def _naive_utc(timestamp: datetime) -> datetime:
+    # MongoDB devuelve fechas UTC sin zona; todas las comparaciones se hacen así
+    if timestamp.tzinfo is None:
+        return timestamp
+    return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+
+class ParamsSnapshotIndex:
+    """Índice en memoria, por fecha, de las versiones de CalculationParams
+    
+    Guarda las versiones tal como están en `params_snapshots` (keyframes y
+    deltas) y busca la vigente en una fecha con bisect. Los parámetros de una
+    versión se reconstruyen desde el keyframe anterior (a lo sumo
+    `keyframe_interval - 1` deltas) y los últimos usados quedan materializados.
+    Como las versiones son inmutables, solo hace falta leer de la base las
+    versiones nuevas (`last_version`).
+    """
+    
+    def __init__(
+        self,
+        keyframe_interval: int = PARAMS_SNAPSHOT_KEYFRAME_INTERVAL,
+        max_materialized: int = PARAMS_SNAPSHOT_MAX_MATERIALIZED
+    ):
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.max_materialized = max_materialized
+        self.loaded = False
+        self._entries: List[_Entry] = []
+        self._valid_from: List[datetime] = []
+        self._latest_values: Optional[Dict[str, str]] = None
+        self._materialized: "OrderedDict[int, CalculationParams]" = OrderedDict()
+        # Último CalculationParams comparado con la versión más reciente (el cache comparte el objeto)
+        self._checked: Optional[Tuple[CalculationParams, Optional[int]]] = None
+        self.lock = asyncio.Lock()
+    
+    @property
+    def last_version(self) -> int:
+        return self._entries[-1].version if self._entries else 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def add(self, snapshots: Iterable[Dict[str, Any]]):
+        """Agrega versiones leídas de la base (en orden); ignora las ya conocidas
+        
+        Un delta solo tiene sentido sobre la versión anterior: ante un salto de
+        versión se deja de agregar y el resto llega en la próxima lectura.
+        """
+        for doc in snapshots:
+            if doc["version"] <= self.last_version:
+                continue
+            if self._entries and doc["version"] != self.last_version + 1:
+                break
+            if not self._entries and not doc["full"]:
+                break
+            
+            entry = _Entry(
+                version=doc["version"],
+                valid_from=doc["valid_from"],
+                full=doc["full"],
+                values=doc["values"],
+                removed=tuple(doc.get("removed", ()))
+            )
+            self._entries.append(entry)
+            self._valid_from.append(entry.valid_from)
+            self._latest_values = (
+                dict(entry.values) if entry.full
+                else apply_delta(self._latest_values, entry.values, entry.removed)
+            )
+            self._checked = None
+        self.loaded = True
+    
+    def version_of(self, params: CalculationParams) -> Optional[int]:
+        """Versión más reciente si tiene exactamente estos valores; None si no (o si no hay)"""
+        if self._checked is not None and self._checked[0] is params:
+            return self._checked[1]
+        version = None
+        if self._latest_values is not None and self._latest_values == flatten_params(params):
+            version = self.last_version
+        self._checked = (params, version)
+        return version
+    
+    def needs_refresh(self, timestamp: datetime) -> bool:
+        """Si otra réplica pudo haber creado una versión vigente en `timestamp`"""
+        return not self.loaded or not self._entries or _naive_utc(timestamp) >= self._valid_from[-1]
+    
+    def next_snapshot(
+        self,
+        params: CalculationParams,
+        valid_from: datetime,
+        keys: Sequence[str],
+        changed_by: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Documento de la versión siguiente, o None si los parámetros no cambiaron"""
+        values = flatten_params(params)
+        version = self.last_version + 1
+        full = self._latest_values is None or (version - 1) % self.keyframe_interval == 0
+        
+        changed, removed = values, ()
+        if self._latest_values is not None:
+            changed, removed = diff_values(self._latest_values, values)
+            if not changed and not removed:
+                return None
+        
+        valid_from = _naive_utc(valid_from)
+        if self._valid_from and valid_from < self._valid_from[-1]:
+            # Las fechas acompañan a las versiones aunque los relojes de las réplicas difieran
+            valid_from = self._valid_from[-1]
+        return {
+            "version": version,
+            "valid_from": valid_from,
+            "full": full,
+            "values": values if full else changed,
+            "removed": [] if full else list(removed),
+            "keys": list(keys),
+            "changed_by": changed_by,
+            "created_at": datetime.utcnow()
+        }
+    
+    def at(self, timestamp: datetime) -> Optional[ParamsVersion]:
+        """Versión vigente en `timestamp`; None si es anterior a la primera versión"""
+        position = bisect_right(self._valid_from, _naive_utc(timestamp)) - 1
+        if position < 0:
+            return None
+        entry = self._entries[position]
+        return ParamsVersion(
+            version=entry.version,
+            valid_from=entry.valid_from,
+            params=self._params_at(position)
+        )
+    
+    def _params_at(self, position: int) -> CalculationParams:
+        version = self._entries[position].version
+        params = self._materialized.get(version)
+        if params is not None:
+            self._materialized.move_to_end(version)
+            return params
+        
+        keyframe = position
+        while not self._entries[keyframe].full:
+            keyframe -= 1
+        values = dict(self._entries[keyframe].values)
+        for entry in self._entries[keyframe + 1:position + 1]:
+            values = apply_delta(values, entry.values, entry.removed)
+        
+        params = unflatten_params(values)
+        self._materialized[version] = params
+        if len(self._materialized) > self.max_materialized:
+            self._materialized.popitem(last=False)
+        return params
+
+# Compartido por todo el proceso, igual que params_cache
+params_snapshot_index = ParamsSnapshotIndex()
@@ -0,0 +1,53 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+import os
+
+PRICE_CACHE_MAX_ENTRIES = int(os.getenv("PRICE_CACHE_MAX_ENTRIES", "10000"))
+
+class PriceResultCache:
+    """Cache LRU de resultados de cálculo de precio
+    
+    Hay una entrada por (producto, cantidad_gotas) junto con la firma con la que
+    se calculó (revisión del producto, del molde y versión de parámetros). Si
+    cualquiera cambia la firma no coincide, se recalcula y la entrada se reemplaza,
+    así que los cambios invalidan solos y la memoria no crece con las revisiones.
+    """
+    
+    def __init__(self, max_entries: int = PRICE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Hashable, Any]]" = OrderedDict()
+    
+    def get(self, key: Hashable, signature: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != signature:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+    
+    def set(self, key: Hashable, signature: Hashable, value: Any):
+        self._entries[key] = (signature, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def stats(self) -> Dict[str, Any]:
+        consultas = self.hits + self.misses
+        return {
+            "entradas": len(self._entries),
+            "max_entradas": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / consultas if consultas else 0.0
+        }
+    
+    def clear(self):
+        self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+price_result_cache = PriceResultCache()
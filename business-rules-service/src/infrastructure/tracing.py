@@ -0,0 +1,280 @@
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterable, List, Optional
+import atexit
+import functools
+import inspect
+import json
+import os
+import queue
+import re
+import threading
+import time
+
+# W3C Trace Context: 00-<trace_id>-<parent_span_id>-<flags>
+TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+@dataclass
+class Span:
+    """Operación medida dentro de una traza"""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    service: str
+    kind: str = "internal"
+    start: float = field(default_factory=time.time)
+    end: Optional[float] = None
+    status: str = "ok"
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    
+    @property
+    def duration_ms(self) -> Optional[float]:
+        return None if self.end is None else (self.end - self.start) * 1000
+    
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "service": self.service,
+            "kind": self.kind,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+class SpanSink:
+    """Destino de los spans terminados"""
+    
+    def export(self, span: Span):
+        raise NotImplementedError
+
+class NoopSpanSink(SpanSink):
+    def export(self, span: Span):
+        pass
+
+class InMemorySpanSink(SpanSink):
+    """Guarda los últimos spans en memoria (pruebas y depuración)"""
+    
+    def __init__(self, max_spans: int = 10000):
+        self.spans: Deque[Span] = deque(maxlen=max_spans)
+    
+    def export(self, span: Span):
+        self.spans.append(span)
+    
+    def by_trace(self, trace_id: str) -> List[Span]:
+        return [span for span in self.spans if span.trace_id == trace_id]
+
+class FileSpanSink(SpanSink):
+    """Agrega cada span como una línea JSON al archivo indicado
+    
+    `export` solo encola el span: un hilo en segundo plano lo serializa y lo escribe
+    sobre un único archivo abierto, así el event loop nunca hace I/O de disco. Con la
+    cola llena los spans se descartan (y se cuentan en `dropped`) en vez de bloquear.
+    """
+    
+    def __init__(self, path: str, max_queue: int = 10000):
+        self.path = path
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(maxsize=max_queue)
+        self._file = open(path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._write_loop, name="span-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+    
+    def export(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+    
+    def _write_loop(self):
+        while True:
+            span = self._queue.get()
+            if span is None:
+                break
+            try:
+                self._file.write(json.dumps(span.to_dict(), default=str) + "\n")
+                # Un flush por ráfaga, no por span
+                if self._queue.empty():
+                    self._file.flush()
+            except (OSError, TypeError, ValueError):
+                self.dropped += 1
+        self._file.close()
+    
+    def close(self):
+        """Escribe los spans pendientes y cierra el archivo"""
+        if self._thread.is_alive():
+            try:
+                self._queue.put(None, timeout=5)
+            except queue.Full:
+                return
+            self._thread.join(timeout=5)
+
+def build_sink(kind: str, file_path: str) -> SpanSink:
+    if kind == "memory":
+        return InMemorySpanSink()
+    if kind == "file":
+        return FileSpanSink(file_path)
+    return NoopSpanSink()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+def parse_traceparent(value: Optional[str]):
+    """Devuelve (trace_id, parent_span_id) o None si el header no es válido"""
+    if not value:
+        return None
+    match = TRACEPARENT_RE.match(value.strip().lower())
+    if not match or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2)
+
+class Tracer:
+    """Crea spans, mantiene el span actual por contexto async y los exporta al terminar"""
+    
+    def __init__(self, service: str, sink: SpanSink):
+        self.service = service
+        self.sink = sink
+        self.enabled = not isinstance(sink, NoopSpanSink)
+    
+    @staticmethod
+    def current_span() -> Optional[Span]:
+        return _current_span.get()
+    
+    def start_span(
+        self,
+        name: str,
+        kind: str = "internal",
+        traceparent: Optional[str] = None,
+        attributes: Optional[Dict[str, Any]] = None
+    ) -> Span:
+        """Inicia un span hijo del actual, o del `traceparent` remoto si se indica"""
+        remote = parse_traceparent(traceparent)
+        parent = _current_span.get()
+        if remote:
+            trace_id, parent_id = remote
+        elif parent is not None:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        else:
+            trace_id, parent_id = os.urandom(16).hex(), None
+        
+        return Span(
+            name=name,
+            trace_id=trace_id,
+            span_id=os.urandom(8).hex(),
+            parent_id=parent_id,
+            service=self.service,
+            kind=kind,
+            attributes=dict(attributes or {})
+        )
+    
+    def activate(self, span: Span):
+        """Marca el span como actual; devuelve el token para restaurar el anterior"""
+        return _current_span.set(span)
+    
+    def finish(self, span: Span, token=None, error: Optional[BaseException] = None):
+        span.end = time.time()
+        if error is not None:
+            span.status = "error"
+            span.attributes["error"] = f"{type(error).__name__}: {error}"
+        if token is not None:
+            _current_span.reset(token)
+        if self.enabled:
+            self.sink.export(span)
+
+class TracingMiddleware:
+    """Middleware ASGI que abre un span de servidor por petición
+    
+    Continúa la traza del header `traceparent` entrante si existe y devuelve el
+    trace id en `X-Trace-Id` para poder buscar la traza desde el cliente.
+    """
+    
+    def __init__(self, app, tracer: "Tracer", exempt_paths: Iterable[str] = ("/metrics",)):
+        self.app = app
+        self.tracer = tracer
+        self.exempt_paths = frozenset(exempt_paths)
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+        
+        traceparent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+        
+        span = self.tracer.start_span(
+            f"{scope['method']} {scope['path']}",
+            kind="server",
+            traceparent=traceparent,
+            attributes={"http.method": scope["method"], "http.target": scope["path"]}
+        )
+        trace_header = (b"x-trace-id", span.trace_id.encode("latin-1"))
+        
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                span.attributes["http.status_code"] = message["status"]
+                if message["status"] >= 500:
+                    span.status = "error"
+                message["headers"] = list(message.get("headers", [])) + [trace_header]
+            await send(message)
+        
+        token = self.tracer.activate(span)
+        error = None
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            route = scope.get("route")
+            if route is not None:
+                span.name = f"{scope['method']} {route.path}"
+            self.tracer.finish(span, token, error)
+
+TRACING_SINK = os.getenv("TRACING_SINK", "none")
+TRACING_FILE = os.getenv("TRACING_FILE", "/tmp/business-rules-spans.jsonl")
+SERVICE_NAME = os.getenv("SERVICE_NAME", "business-rules-service")
+
+tracer = Tracer(SERVICE_NAME, build_sink(TRACING_SINK, TRACING_FILE))
+
+def traced_repository(cls):
+    """Decorador de clase: registra un span por cada método async público del repositorio"""
+    for attr_name, method in list(vars(cls).items()):
+        if attr_name.startswith("_") or not inspect.iscoroutinefunction(method):
+            continue
+        setattr(cls, attr_name, _trace_method(f"{cls.__name__}.{attr_name}", method))
+    return cls
+
+def _trace_method(span_name: str, method):
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        # Sin sink configurado no hay nada que exportar
+        if not tracer.enabled:
+            return await method(self, *args, **kwargs)
+        collection = getattr(self, "collection", None)
+        span = tracer.start_span(
+            span_name,
+            kind="client",
+            attributes={"db.system": "mongodb", "db.collection": getattr(collection, "name", None)}
+        )
+        token = tracer.activate(span)
+        error = None
+        try:
+            return await method(self, *args, **kwargs)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            tracer.finish(span, token, error)
+    return wrapper
@@ -1,10 +1,46 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
+import logging
+from src.infrastructure.tracing import tracer, TracingMiddleware
+from src.infrastructure.database.connection import connect_to_mongo, close_mongo_connection, get_database
+from src.infrastructure.params_cache import params_cache, ConfigurationWatcher
+from src.infrastructure.database.migrations import apply_index_migrations
+from src.infrastructure.jobs.queue import build_job_queue
+from src.infrastructure.jobs.worker import JobWorkerPool, job_runtime
+from src.api.routes.configuration_routes import router as configuration_router
+from src.api.routes.calculation_routes import router as calculation_router, JOB_HANDLERS
+from src.api.routes.job_routes import router as job_router
+from src.api.routes.precio_routes import router as precio_router
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await connect_to_mongo()
+    # Mantiene el cache de parámetros coherente entre réplicas
+    watcher = ConfigurationWatcher(get_database().configurations, params_cache)
+    watcher.start()
+    
+    try:
+        await apply_index_migrations(get_database())
+    except Exception as e:
+        logger.warning("No se pudieron aplicar las migraciones de índices: %s", e)
+    
+    # Trabajos en segundo plano (recálculo masivo); los pendientes de un reinicio se retoman
+    job_runtime.queue = build_job_queue(get_database())
+    job_runtime.pool = JobWorkerPool(job_runtime.queue, JOB_HANDLERS)
+    job_runtime.pool.start()
+    yield
+    await job_runtime.pool.stop()
+    await watcher.stop()
+    await close_mongo_connection()
 
 app = FastAPI(
     title="Vel Arte Business Rules Service", 
     version="1.0.0",
-    description="Microservicio para reglas de negocio y cálculos de costos"
+    description="Microservicio para reglas de negocio y cálculos de costos",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -15,6 +51,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Continúa la traza que llega del gateway (header traceparent)
+app.add_middleware(TracingMiddleware, tracer=tracer)
+
+app.include_router(configuration_router)
+app.include_router(calculation_router)
+app.include_router(job_router)
+app.include_router(precio_router)
+
 @app.get("/health")
 async def health_check():
     return {
@@ -31,47 +75,10 @@ async def root():
         "status": "running",
         "endpoints": [
             "/health",
+            "/configurations",
+            "/calculations",
+            "/jobs",
+            "/precios",
             "/docs"
         ]
     }
-
-# Endpoints básicos para testing
-@app.get("/configurations")
-async def get_configurations():
-    return {
-        "message": "Configurations endpoint - Basic implementation",
-        "configurations": []
-    }
-
-@app.post("/configurations/initialize")
-async def initialize_configurations():
-    return {
-        "message": "Configurations initialized (basic)",
-        "count": 0
-    }
-
-@app.get("/calculations/params")
-async def get_calculation_params():
-    return {
-        "message": "Calculation params endpoint - Basic implementation",
-        "parametros": {
-            "porcentajes": {
-                "aditivo": 8.0,
-                "fragancia": 6.0,
-                "ganancia": 250.0,
-                "detalle": 20.0,
-                "admin": 10.0
-            },
-            "precios_insumos": {
-                "cera_kg": 15000,
-                "aditivo_kg": 8000,
-                "fragancia_ml": 150,
-                "colorante_gota": 50,
-                "pabilo_metro": 200
-            },
-            "redondeo": {
-                "multiplo": 500
-            },
-            "descuentos_cantidad": {}
-        }
-    }
@@ -1,9 +1,33 @@
-from typing import Dict, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from datetime import datetime
 from decimal import Decimal
+import asyncio
+import time
+import uuid
 from ..domain.services.cost_calculation_service import CostCalculationService
 from ..domain.services.configuration_service import ConfigurationService
 from ..domain.entities.producto import Producto, ProductoCalculado
 from ..domain.entities.molde import Molde
+from ..domain.value_objects.calculation_params import CalculationParams
+from ..domain.value_objects.pricing_batch import BREAKDOWN_FIELDS, BatchCostBreakdown, PricingBatch, to_decimal
+from ..domain.value_objects.pricing_records import MoldePricing, ProductoPricing
+from ..domain.services.price_dependencies import ProductSelector
+
+def apply_param_overrides(base: CalculationParams, overrides: Dict[str, Any]) -> CalculationParams:
+    """Copia de `base` con los parámetros indicados reemplazados"""
+    unknown = set(overrides) - set(CalculationParams.model_fields)
+    if unknown:
+        raise ValueError(f"Parámetros desconocidos: {', '.join(sorted(unknown))}")
+    
+    update = {}
+    for key, value in overrides.items():
+        if key == 'multiplo_redondeo':
+            update[key] = int(value)
+        elif key == 'descuentos_cantidad':
+            update[key] = {int(cantidad): to_decimal(pct) for cantidad, pct in value.items()}
+        else:
+            update[key] = to_decimal(value)
+    return base.model_copy(update=update)
 
 class CalculateProductPriceUseCase:
     """Caso de uso para calcular precio de un producto"""
@@ -13,12 +37,15 @@ class CalculateProductPriceUseCase:
         calculation_service: CostCalculationService,
         configuration_service: ConfigurationService,
         molde_repository,
-        producto_repository
+        producto_repository,
+        result_cache=None
     ):
         self.calculation_service = calculation_service
         self.configuration_service = configuration_service
         self.molde_repository = molde_repository
         self.producto_repository = producto_repository
+        # PriceResultCache opcional; solo se usa con parámetros del sistema versionados
+        self.result_cache = result_cache
     
     async def execute(
         self, 
@@ -28,7 +55,30 @@ class CalculateProductPriceUseCase:
     ) -> ProductoCalculado:
         """Ejecuta el cálculo completo de precio para un producto"""
         
-        # 1. Obtener producto y molde
+        # 1. Obtener parámetros de cálculo
+        params_version = None
+        if custom_params:
+            # Usar parámetros personalizados (para simulaciones)
+            params = await self._build_custom_params(custom_params)
+        else:
+            # Usar parámetros del sistema
+            params_version, params = await self.configuration_service.get_versioned_calculation_params()
+        
+        # Resultado memoizado: antes de leer los documentos se compara la firma
+        # (revisión del producto, revisión del molde, versión de parámetros)
+        cache_key = None
+        if self.result_cache is not None and params_version is not None:
+            cache_key = (producto_id, cantidad_gotas)
+            revision = await self.producto_repository.get_pricing_revision(producto_id)
+            if revision is None:
+                raise ValueError(f"Producto {producto_id} no encontrado")
+            cached = self.result_cache.get(cache_key, (
+                revision.producto_updated_at, revision.molde_id, revision.molde_updated_at, params_version
+            ))
+            if cached is not None:
+                return cached
+        
+        # 2. Obtener producto y molde
         producto = await self.producto_repository.get_by_id(producto_id)
         if not producto:
             raise ValueError(f"Producto {producto_id} no encontrado")
@@ -37,13 +87,23 @@ class CalculateProductPriceUseCase:
         if not molde:
             raise ValueError(f"Molde {producto.molde_id} no encontrado")
         
-        # 2. Obtener parámetros de cálculo
-        if custom_params:
-            # Usar parámetros personalizados (para simulaciones)
-            params = self._build_custom_params(custom_params)
-        else:
-            # Usar parámetros del sistema
-            params = await self.configuration_service.get_calculation_params()
+        resultado = self._calculate(producto, molde, params, cantidad_gotas)
+        if cache_key is not None:
+            # Firma de lo que realmente se leyó: si hubo una edición entre las dos
+            # lecturas, la próxima consulta no coincide y se recalcula
+            self.result_cache.set(cache_key, (
+                producto.updated_at, producto.molde_id, molde.updated_at, params_version
+            ), resultado)
+        return resultado
+    
+    def _calculate(
+        self,
+        producto: Producto,
+        molde: Molde,
+        params: CalculationParams,
+        cantidad_gotas: int
+    ) -> ProductoCalculado:
+        """Calcula el desglose y arma el resultado (sin pasar por el cache)"""
         
         # 3. Validar parámetros
         validation_errors = self.calculation_service.validate_calculation_params(params)
@@ -54,7 +114,8 @@ class CalculateProductPriceUseCase:
         if 'cantidad_gotas' in producto.color_config:
             cantidad_gotas = producto.color_config['cantidad_gotas']
         
-        cost_breakdown = self.calculation_service.calculate_product_cost(
+        # Desglose interno sin pydantic; el único modelo que se construye es la respuesta
+        cost_breakdown = self.calculation_service.compute_costs(
             molde=molde,
             producto=producto,
             params=params,
@@ -103,50 +164,237 @@ class CalculateProductPriceUseCase:
             precio_final=cost_breakdown.valor_redondeado,
             precio_con_descuentos=cost_breakdown.descuentos_aplicables,
             ganancia_neta=ganancia_neta,
-            fecha_calculo=cost_breakdown.fecha_calculo
+            fecha_calculo=datetime.utcnow()
         )
     
-    def _build_custom_params(self, custom_params: Dict):
-        """Construye parámetros personalizados para simulaciones"""
-        # Implementar lógica para parámetros custom
-        pass
+    async def _build_custom_params(self, custom_params: Dict) -> CalculationParams:
+        """Construye parámetros personalizados para simulaciones
+        
+        Parte de los parámetros del sistema y reemplaza solo los indicados.
+        """
+        base = await self.configuration_service.get_calculation_params()
+        return apply_param_overrides(base, custom_params)
 
 class RecalculateAllProductsUseCase:
-    """Caso de uso para recalcular todos los productos cuando cambian configuraciones"""
+    """Caso de uso para recalcular todos los productos cuando cambian configuraciones
+    
+    Carga los parámetros una sola vez, trae los moldes de cada lote con una
+    consulta `$in`, calcula el lote vectorizado y escribe con `bulk_write`.
+    La escritura de un lote se solapa con la lectura y el cálculo del siguiente.
+    Con `precio_repository` también mantiene la colección `precios_calculados`.
+    """
     
     def __init__(
         self,
         calculate_product_use_case: CalculateProductPriceUseCase,
-        producto_repository
+        producto_repository,
+        chunk_size: int = 500,
+        precio_repository=None
     ):
         self.calculate_product_use_case = calculate_product_use_case
         self.producto_repository = producto_repository
+        self.precio_repository = precio_repository
+        self.molde_repository = calculate_product_use_case.molde_repository
+        self.calculation_service = calculate_product_use_case.calculation_service
+        self.configuration_service = calculate_product_use_case.configuration_service
+        self.chunk_size = chunk_size
     
-    async def execute(self) -> Dict[str, any]:
-        """Recalcula todos los productos activos"""
+    async def execute(
+        self,
+        resume_after: Optional[str] = None,
+        on_progress: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+        selector: Optional[ProductSelector] = None,
+        recalculo_id: Optional[str] = None,
+        purge_stale: bool = False
+    ) -> Dict[str, Any]:
+        """Recalcula todos los productos activos
+        
+        `resume_after` continúa después del último producto confirmado de una
+        ejecución anterior (`ultimo_producto_id`). `on_progress` recibe los
+        resultados parciales cada vez que termina la escritura de un lote. Si una
+        escritura falla la ejecución se detiene ahí (`escritura_fallida`) sin
+        avanzar el checkpoint, así que retomarla vuelve a escribir ese lote.
+        Con `selector` solo se recalculan los productos afectados por un cambio.
         
-        productos = await self.producto_repository.get_active_products()
+        Las filas de `precios_calculados` quedan marcadas con `recalculo_id`. Con
+        `purge_stale`, al terminar sin errores de escritura se borran las filas que
+        no tienen esa marca; solo es correcto si todas las ejecuciones con el mismo
+        `recalculo_id` recorrieron juntas el catálogo completo.
+        """
+        start = time.perf_counter()
         resultados = {
             "productos_procesados": 0,
             "productos_con_error": 0,
-            "errores": []
+            "errores": [],
+            "lotes": 0,
+            "ultimo_producto_id": resume_after,
+            "escritura_fallida": False
         }
         
-        for producto in productos:
+        params_version, params = await self.configuration_service.get_versioned_calculation_params()
+        validation_errors = self.calculation_service.validate_calculation_params(params)
+        if validation_errors:
+            raise ValueError(f"Parámetros inválidos: {', '.join(validation_errors)}")
+        
+        recalculo_id = recalculo_id or uuid.uuid4().hex
+        moldes: Dict[str, MoldePricing] = {}
+        pending_write: Optional[asyncio.Task] = None
+        escritura_fallida = False
+        
+        async def write(precios: Dict[str, Decimal], filas: List[Dict[str, Any]], ultimo_id: str):
+            nonlocal escritura_fallida
             try:
-                resultado = await self.calculate_product_use_case.execute(producto.id)
-                
-                # Actualizar precio sugerido del producto
-                producto.precio_sugerido = resultado.precio_final
-                await self.producto_repository.update(producto)
-                
-                resultados["productos_procesados"] += 1
-                
+                escrituras = [self.producto_repository.bulk_update_precios(precios)]
+                if self.precio_repository is not None:
+                    escrituras.append(self.precio_repository.bulk_upsert(filas))
+                await asyncio.gather(*escrituras)
+                resultados["productos_procesados"] += len(precios)
+                # El checkpoint solo avanza si el lote quedó escrito
+                resultados["ultimo_producto_id"] = ultimo_id
             except Exception as e:
+                escritura_fallida = True
+                resultados["escritura_fallida"] = True
+                resultados["productos_con_error"] += len(precios)
+                resultados["errores"].extend(
+                    {"producto_id": producto_id, "error": str(e)} for producto_id in precios
+                )
+            resultados["lotes"] += 1
+            resultados["duracion_segundos"] = time.perf_counter() - start
+            if on_progress is not None:
+                await on_progress(dict(resultados))
+        
+        try:
+            # Registros livianos (solo los campos del cálculo), sin modelos pydantic
+            async for productos in self.producto_repository.iter_active_products(
+                after_id=resume_after, batch_size=self.chunk_size, selector=selector, raw=True
+            ):
+                items, breakdown = await self.price_chunk(productos, params, moldes, resultados)
+                precios = {
+                    producto.id: breakdown.as_decimal("valor_redondeado", i)
+                    for i, (_, producto, _) in enumerate(items)
+                }
+                filas = []
+                if self.precio_repository is not None and items:
+                    filas = self.build_filas(items, breakdown, params, params_version, recalculo_id)
+                
+                # Como máximo una escritura en vuelo: el orden de los checkpoints se mantiene
+                if pending_write is not None:
+                    await pending_write
+                    if escritura_fallida:
+                        break
+                pending_write = asyncio.create_task(write(precios, filas, productos[-1].id))
+            
+            if pending_write is not None:
+                await pending_write
+        finally:
+            if pending_write is not None and not pending_write.done():
+                pending_write.cancel()
+        
+        if purge_stale and self.precio_repository is not None and not escritura_fallida:
+            resultados["filas_eliminadas"] = await self.precio_repository.delete_stale(recalculo_id)
+        
+        resultados["duracion_segundos"] = time.perf_counter() - start
+        return resultados
+    
+    async def price_chunk(
+        self,
+        productos: List[ProductoPricing],
+        params: CalculationParams,
+        moldes: Dict[str, MoldePricing],
+        resultados: Dict[str, Any]
+    ) -> Tuple[List[Tuple[MoldePricing, ProductoPricing, int]], Optional[BatchCostBreakdown]]:
+        """Calcula el desglose de un lote; los moldes ya vistos no se vuelven a consultar
+        
+        Devuelve los productos valorizados (con su molde y gotas) y el desglose
+        alineado con ellos; los productos sin molde se registran como error.
+        """
+        faltantes = {p.molde_id for p in productos if p.molde_id not in moldes}
+        if faltantes:
+            moldes.update(await self.molde_repository.find_many_by_ids(faltantes, raw=True))
+        
+        items = []
+        for producto in productos:
+            molde = moldes.get(producto.molde_id)
+            if molde is None:
                 resultados["productos_con_error"] += 1
                 resultados["errores"].append({
                     "producto_id": producto.id,
-                    "error": str(e)
+                    "error": f"Molde {producto.molde_id} no encontrado"
                 })
+                continue
+            items.append((molde, producto, producto.color_config.get('cantidad_gotas', 0)))
         
-        return resultados
+        if not items:
+            return items, None
+        
+        breakdown = self.calculation_service.calculate_batch_costs(
+            PricingBatch.from_products(items), params
+        )
+        return items, breakdown
+    
+    @staticmethod
+    def build_filas(
+        items: List[Tuple[MoldePricing, ProductoPricing, int]],
+        breakdown: BatchCostBreakdown,
+        params: CalculationParams,
+        params_version: Optional[int],
+        recalculo_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Filas de `precios_calculados` de un lote (formato de PrecioCalculado)"""
+        # Una conversión a float por columna en lugar de una por producto y campo
+        col = {field: breakdown.as_float(field).tolist() for field in BREAKDOWN_FIELDS}
+        descuentos = {
+            cantidad: breakdown.descuento_float(cantidad).tolist()
+            for cantidad in sorted(breakdown.descuentos_aplicables)
+        }
+        now = datetime.utcnow()
+        filas = []
+        
+        for i, (_, producto, _) in enumerate(items):
+            precio = col["valor_redondeado"][i]
+            costo_base = col["costo_base"][i]
+            ganancia_neta = precio - costo_base
+            filas.append({
+                "producto_id": producto.id,
+                "molde_id": producto.molde_id,
+                "nombre": producto.nombre,
+                "categoria": producto.categoria,
+                "precio": int(precio),
+                "costo_base": costo_base,
+                "ganancia_neta": ganancia_neta,
+                "margen_porcentual": ganancia_neta / precio * 100 if precio else 0.0,
+                "desglose": {
+                    "costos_base": {
+                        "cera": col["costo_cera"][i],
+                        "aditivo": col["costo_aditivo"][i],
+                        "fragancia": col["costo_fragancia"][i],
+                        "colorante": col["costo_colorante"][i],
+                        "pabilo": col["costo_pabilo"][i],
+                        "otros": col["costo_otros_insumos"][i],
+                        "total_base": costo_base
+                    },
+                    "aplicaciones": {
+                        "ganancia": col["costo_ganancia"][i],
+                        "detalle": col["costo_detalle"][i],
+                        "administracion": col["gastos_admin"][i]
+                    },
+                    "subtotales": {
+                        "sin_admin": col["subtotal_sin_admin"][i],
+                        "con_admin": col["subtotal_con_admin"][i],
+                        "redondeado": precio
+                    }
+                },
+                "descuentos": [
+                    {
+                        "cantidad": cantidad,
+                        "porcentaje": float(params.descuentos_cantidad[cantidad]),
+                        "precio_unitario": valores[i]
+                    }
+                    for cantidad, valores in descuentos.items()
+                ],
+                "params_version": params_version,
+                "recalculo_id": recalculo_id,
+                "calculado_en": now
+            })
+        
+        return filas
@@ -0,0 +1,89 @@
+from typing import Any, AsyncIterator, Dict, List, Optional
+from datetime import datetime
+import asyncio
+import time
+from .calculate_product_price import RecalculateAllProductsUseCase
+
+class ExportCatalogPricesUseCase:
+    """Caso de uso para exportar los precios de todo el catálogo
+    
+    Recorre los productos activos con un cursor, los valoriza por lotes con el
+    cálculo vectorizado y entrega cada lote apenas está listo. Mientras se consume
+    un lote ya se está leyendo el siguiente, pero nunca más de uno: la memoria
+    no crece con el tamaño del catálogo y un consumidor lento frena la lectura.
+    """
+    
+    def __init__(self, recalculate_use_case: RecalculateAllProductsUseCase):
+        self.recalculate_use_case = recalculate_use_case
+        self.producto_repository = recalculate_use_case.producto_repository
+        self.configuration_service = recalculate_use_case.configuration_service
+        self.calculation_service = recalculate_use_case.calculation_service
+    
+    async def stream(
+        self,
+        incluir_desglose: bool = True,
+        fecha: Optional[datetime] = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Genera una lista de filas por lote y al final una fila con el resumen
+        
+        Las filas de producto tienen el formato de PrecioCalculado (sin
+        `recalculo_id`); los productos que no se pudieron valorizar salen como
+        `{"producto_id", "error"}`. Todo el catálogo usa el mismo snapshot de parámetros:
+        el actual o, con `fecha`, la versión vigente en esa fecha.
+        """
+        start = time.perf_counter()
+        if fecha is not None:
+            params_version, params = await self.configuration_service.get_calculation_params_at(fecha)
+        else:
+            params_version, params = await self.configuration_service.get_versioned_calculation_params()
+        validation_errors = self.calculation_service.validate_calculation_params(params)
+        if validation_errors:
+            raise ValueError(f"Parámetros inválidos: {', '.join(validation_errors)}")
+        
+        resumen = {
+            "productos": 0,
+            "productos_con_error": 0,
+            "lotes": 0,
+            "params_version": params_version,
+            "fecha_parametros": fecha
+        }
+        moldes = {}
+        lotes = self.producto_repository.iter_active_products(
+            batch_size=self.recalculate_use_case.chunk_size, raw=True
+        ).__aiter__()
+        siguiente = asyncio.ensure_future(anext(lotes, None))
+        
+        try:
+            while True:
+                productos = await siguiente
+                if productos is None:
+                    break
+                siguiente = asyncio.ensure_future(anext(lotes, None))
+                
+                errores = {"productos_con_error": 0, "errores": []}
+                items, breakdown = await self.recalculate_use_case.price_chunk(
+                    productos, params, moldes, errores
+                )
+                filas = []
+                if items:
+                    filas = self.recalculate_use_case.build_filas(items, breakdown, params, params_version)
+                for fila in filas:
+                    del fila["recalculo_id"]
+                    if not incluir_desglose:
+                        del fila["desglose"]
+                
+                resumen["productos"] += len(filas)
+                resumen["productos_con_error"] += errores["productos_con_error"]
+                resumen["lotes"] += 1
+                yield filas + errores["errores"]
+        finally:
+            if not siguiente.done():
+                siguiente.cancel()
+                try:
+                    await siguiente
+                except asyncio.CancelledError:
+                    pass
+            await lotes.aclose()
+        
+        resumen["duracion_segundos"] = round(time.perf_counter() - start, 3)
+        yield [{"resumen": resumen}]
@@ -1,5 +1,6 @@
 from typing import List, Optional
-from ..domain.entities.configuration import Configuration, ConfigurationHistory
+from datetime import datetime
+from ..domain.entities.configuration import Configuration, ConfigurationHistoryPage
 from ..domain.services.configuration_service import ConfigurationService
 
 class ManageConfigurationsUseCase:
@@ -24,9 +25,18 @@ class ManageConfigurationsUseCase:
             key, new_value, user_id, reason
         )
     
-    async def get_configuration_history(self, key: str) -> List[ConfigurationHistory]:
-        """Obtiene el histórico de una configuración"""
-        return await self.configuration_service.get_configuration_history(key)
+    async def get_configuration_history(
+        self,
+        key: str,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        desde: Optional[datetime] = None,
+        hasta: Optional[datetime] = None
+    ) -> ConfigurationHistoryPage:
+        """Obtiene una página del histórico de una configuración"""
+        return await self.configuration_service.get_configuration_history(
+            key, limit, cursor, desde, hasta
+        )
     
     async def validate_configuration_change(
         self, 
@@ -129,4 +139,5 @@ class ManageConfigurationsUseCase:
                 created = await self.configuration_service.config_repository.create(config)
                 created_configs.append(created)
         
+        self.configuration_service.invalidate_calculation_params()
         return created_configs
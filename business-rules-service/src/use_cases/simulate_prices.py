@@ -0,0 +1,115 @@
+from typing import Any, Dict, List, Optional, Sequence
+from decimal import Decimal
+from itertools import product
+import numpy as np
+from ..domain.services.cost_calculation_service import CostCalculationService
+from ..domain.services.configuration_service import ConfigurationService
+from ..domain.value_objects.pricing_batch import PricingBatch
+from .calculate_product_price import apply_param_overrides
+
+# Límites para que una simulación no bloquee el servicio
+MAX_ESCENARIOS = 1000
+MAX_CELDAS = 5_000_000  # escenarios x productos
+
+def expand_sweep(desde: Decimal, hasta: Decimal, paso: Decimal) -> List[Decimal]:
+    """Valores desde..hasta inclusive, con aritmética Decimal (sin deriva de float)"""
+    valores = []
+    valor = desde
+    while valor <= hasta:
+        valores.append(valor)
+        valor += paso
+    return valores
+
+class SimulatePricesUseCase:
+    """Caso de uso para simular precios de muchos productos bajo muchos escenarios
+    
+    Los productos se cargan una vez en un PricingBatch; cada escenario del grid
+    se calcula en una pasada vectorizada sobre todo el lote.
+    """
+    
+    def __init__(
+        self,
+        calculation_service: CostCalculationService,
+        configuration_service: ConfigurationService,
+        molde_repository,
+        producto_repository
+    ):
+        self.calculation_service = calculation_service
+        self.configuration_service = configuration_service
+        self.molde_repository = molde_repository
+        self.producto_repository = producto_repository
+    
+    async def execute(
+        self,
+        variaciones: Dict[str, Sequence[Any]],
+        producto_ids: Optional[List[str]] = None,
+        incluir_matriz: bool = True
+    ) -> Dict[str, Any]:
+        nombres = list(variaciones)
+        escenarios = [dict(zip(nombres, valores)) for valores in product(*variaciones.values())]
+        if len(escenarios) > MAX_ESCENARIOS:
+            raise ValueError(f"Máximo {MAX_ESCENARIOS} escenarios por simulación ({len(escenarios)} pedidos)")
+        
+        productos = await self._load_productos(producto_ids)
+        if len(escenarios) * len(productos) > MAX_CELDAS:
+            raise ValueError("La simulación es demasiado grande; reduce productos o escenarios")
+        
+        moldes = await self.molde_repository.find_many_by_ids({p.molde_id for p in productos}, raw=True)
+        items, omitidos = [], []
+        for producto in productos:
+            molde = moldes.get(producto.molde_id)
+            if molde is None:
+                omitidos.append({"producto_id": producto.id, "error": f"Molde {producto.molde_id} no encontrado"})
+                continue
+            items.append((molde, producto, producto.color_config.get('cantidad_gotas', 0)))
+        
+        base = await self.configuration_service.get_calculation_params()
+        batch = PricingBatch.from_products(items)
+        
+        precios = np.full((len(escenarios), len(items)), np.nan)
+        margenes = np.full((len(escenarios), len(items)), np.nan)
+        resumen = []
+        for i, escenario in enumerate(escenarios):
+            params = apply_param_overrides(base, escenario)
+            errores = self.calculation_service.validate_calculation_params(params)
+            if errores:
+                resumen.append({"escenario": escenario, "errores": errores})
+                continue
+            
+            breakdown = self.calculation_service.calculate_batch_costs(batch, params)
+            precio = breakdown.as_float("valor_redondeado")
+            margen = precio - breakdown.as_float("costo_base")
+            precios[i], margenes[i] = precio, margen
+            resumen.append({
+                "escenario": escenario,
+                "precio_promedio": float(precio.mean()) if len(items) else None,
+                "margen_promedio": float(margen.mean()) if len(items) else None,
+                "margen_total": float(margen.sum()),
+                "margen_porcentual": float(margen.sum() / precio.sum() * 100) if precio.sum() else None
+            })
+        
+        resultado = {
+            "parametros": nombres,
+            "escenarios": escenarios,
+            "producto_ids": [producto.id for _, producto, _ in items],
+            "resumen": resumen,
+            "productos_omitidos": omitidos
+        }
+        if incluir_matriz:
+            # Filas = escenarios, columnas = productos; null si el escenario no es válido
+            resultado["precios"] = np.where(np.isnan(precios), None, precios).tolist()
+            resultado["margenes"] = np.where(np.isnan(margenes), None, margenes).tolist()
+        return resultado
+    
+    async def _load_productos(self, producto_ids: Optional[List[str]]):
+        if producto_ids is None:
+            productos = []
+            async for lote in self.producto_repository.iter_active_products(raw=True):
+                productos.extend(lote)
+            return productos
+        
+        encontrados = await self.producto_repository.find_many_by_ids(producto_ids, raw=True)
+        faltantes = [producto_id for producto_id in producto_ids if producto_id not in encontrados]
+        if faltantes:
+            raise ValueError(f"Productos no encontrados: {', '.join(faltantes[:10])}")
+        return [encontrados[producto_id] for producto_id in dict.fromkeys(producto_ids)]
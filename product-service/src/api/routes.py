@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException, Depends
 from typing import List
-from src.models.product import MoldeCreate, MoldeResponse, ProductoCreate, ProductoResponse
+from src.models.product import MoldeCreate, MoldeUpdate, MoldeResponse, ProductoCreate, ProductoResponse
 from src.services.product_service import ProductService
 from src.services.auth_client import verify_token  # ← LÍNEA CAMBIADA
 
@@ -21,6 +21,13 @@ async def get_molde(molde_id: str):
         raise HTTPException(status_code=404, detail="Molde no encontrado")
     return molde
 
+@router.put("/moldes/{molde_id}", response_model=MoldeResponse)
+async def update_molde(molde_id: str, molde: MoldeUpdate, user=Depends(verify_token)):
+    actualizado = await ProductService.update_molde(molde_id, molde)
+    if not actualizado:
+        raise HTTPException(status_code=404, detail="Molde no encontrado")
+    return actualizado
+
 @router.post("/productos", response_model=ProductoResponse)
 async def create_producto(producto: ProductoCreate, user=Depends(verify_token)):
     return await ProductService.create_producto(producto)
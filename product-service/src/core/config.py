@@ -1,5 +1,12 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
+
+# Claves de ejemplo/por defecto del repositorio: cualquiera podría firmar tokens con ellas
+INSECURE_SECRET_KEYS = frozenset({
+    "fallback-secret-key",
+    "your-secret-key-change-in-production",
+    "your-secret-key-here-change-in-production",
+})
 
 class Settings(BaseSettings):
     # Configuración de base de datos
@@ -9,10 +16,38 @@ class Settings(BaseSettings):
     # Configuración de servicios
     auth_service_url: str = "http://auth-service:8000"
     
+    # Verificación local de tokens JWT (mismo SECRET_KEY/ALGORITHM que el auth-service)
+    auth_local_verification: bool = True
+    # HS256 solo se acepta con un SECRET_KEY propio (nunca con los valores por defecto públicos)
+    secret_key: Optional[str] = None
+    # Sin valor explícito: RS256 vía JWKS, más HS256 si hay un SECRET_KEY propio
+    jwt_algorithms: Optional[List[str]] = None
+    jwks_url: str = "http://auth-service:8000/api/v1/.well-known/jwks.json"
+    jwks_refresh_interval: float = 300.0
+    token_cache_size: int = 10000
+    
     # Configuración del servidor
     host: str = "0.0.0.0"
     port: int = 8001
     
+    @property
+    def shared_secret_key(self) -> Optional[str]:
+        """SECRET_KEY para verificar HS256, o None si no se configuró uno propio"""
+        if self.secret_key and self.secret_key not in INSECURE_SECRET_KEYS:
+            return self.secret_key
+        return None
+    
+    @property
+    def verification_algorithms(self) -> List[str]:
+        """Algoritmos JWT aceptados; los HS* se descartan sin un SECRET_KEY propio"""
+        if self.jwt_algorithms is not None:
+            algorithms = list(self.jwt_algorithms)
+        else:
+            algorithms = (["RS256"] if self.jwks_url else []) + ["HS256"]
+        if self.shared_secret_key is None:
+            algorithms = [algorithm for algorithm in algorithms if not algorithm.startswith("HS")]
+        return algorithms
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
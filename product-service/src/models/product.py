@@ -13,6 +13,14 @@ class MoldeBase(BaseModel):
 class MoldeCreate(MoldeBase):
     pass
 
+class MoldeUpdate(BaseModel):
+    nombre: Optional[str] = None
+    material: Optional[str] = None
+    peso: Optional[float] = None
+    precio_base: Optional[float] = None
+    categoria: Optional[str] = None
+    disponible: Optional[bool] = None
+
 class MoldeResponse(MoldeBase):
     id: str
     created_at: datetime
@@ -1,30 +1,66 @@
-from fastapi import HTTPException, Security
+from fastapi import HTTPException, Request, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import httpx
-from typing import Dict
+from typing import Dict, Optional
+from src.core.config import settings
+from src.services.token_verifier import TokenVerifier, TokenVerificationError
 
 security = HTTPBearer()
 
-async def verify_token(credentials: HTTPAuthorizationCredentials = Security(security)) -> Dict:
+# Headers W3C Trace Context que se reenvían al auth-service para no cortar la traza
+TRACE_HEADERS = ("traceparent", "tracestate")
+
+# Solo se construye (y valida la configuración JWT) si se verifica localmente
+token_verifier = TokenVerifier(
+    secret_key=settings.shared_secret_key,
+    algorithms=settings.verification_algorithms,
+    jwks_url=settings.jwks_url,
+    cache_size=settings.token_cache_size,
+    jwks_refresh_interval=settings.jwks_refresh_interval
+) if settings.auth_local_verification else None
+
+_auth_client: Optional[httpx.AsyncClient] = None
+
+def get_auth_client() -> httpx.AsyncClient:
+    """Cliente keep-alive compartido hacia el auth-service"""
+    global _auth_client
+    if _auth_client is None or _auth_client.is_closed:
+        _auth_client = httpx.AsyncClient(base_url=settings.auth_service_url, timeout=5.0)
+    return _auth_client
+
+async def verify_token(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Security(security)
+) -> Dict:
     """
-    Verifica el token JWT comunicándose con el servicio de autenticación
+    Verifica el token JWT localmente (firma + expiración) y cachea los claims.
+    Si la verificación local está desactivada, consulta al servicio de autenticación.
     """
+    if settings.auth_local_verification:
+        try:
+            return await token_verifier.verify(credentials.credentials)
+        except TokenVerificationError:
+            raise HTTPException(
+                status_code=401,
+                detail="Token inválido o expirado"
+            )
+    
     try:
-        async with httpx.AsyncClient() as client:
-            # Comunicarse con auth-service internamente
-            response = await client.post(
-                "http://auth-service:8000/verify",
-                headers={"Authorization": f"Bearer {credentials.credentials}"}
+        # Comunicarse con auth-service internamente
+        headers = {"Authorization": f"Bearer {credentials.credentials}"}
+        for name in TRACE_HEADERS:
+            if name in request.headers:
+                headers[name] = request.headers[name]
+        response = await get_auth_client().get("/api/v1/verify", headers=headers)
+        
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=401,
+                detail="Token inválido o expirado"
             )
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=401,
-                    detail="Token inválido o expirado"
-                )
-            
-            return response.json()
-            
+        
+        return response.json()
+        
     except httpx.RequestError:
         raise HTTPException(
             status_code=503,
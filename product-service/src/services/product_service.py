@@ -1,8 +1,9 @@
 from typing import List, Optional
 from src.database.mongodb import get_database
-from src.models.product import MoldeCreate, MoldeResponse, ProductoCreate, ProductoResponse
+from src.models.product import MoldeCreate, MoldeUpdate, MoldeResponse, ProductoCreate, ProductoResponse
 from datetime import datetime
 from bson import ObjectId
+from pymongo import ReturnDocument
 import uuid
 
 class ProductService:
@@ -41,6 +42,25 @@ class ProductService:
             return MoldeResponse(**molde)
         return None
     
+    @staticmethod
+    async def update_molde(molde_id: str, molde_data: MoldeUpdate) -> Optional[MoldeResponse]:
+        db = await get_database()
+        if not ObjectId.is_valid(molde_id):
+            return None
+        
+        cambios = molde_data.dict(exclude_none=True)
+        cambios["updated_at"] = datetime.utcnow()
+        molde = await db.moldes.find_one_and_update(
+            {"_id": ObjectId(molde_id)},
+            {"$set": cambios},
+            return_document=ReturnDocument.AFTER
+        )
+        
+        if molde:
+            molde["id"] = str(molde["_id"])
+            return MoldeResponse(**molde)
+        return None
+    
     @staticmethod
     async def create_producto(producto_data: ProductoCreate) -> ProductoResponse:
         db = await get_database()
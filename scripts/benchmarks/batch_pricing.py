@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Benchmark del re-cálculo del catálogo completo: Decimal unitario vs lote vectorizado
+
+Genera un catálogo sintético, lo valoriza con `calculate_product_cost` producto por
+producto y con `calculate_batch_costs` (modo exacto y float), verifica que el modo
+exacto coincide con el Decimal en todos los campos y mide el re-cálculo tras un
+cambio del precio de la cera.
+
+Uso:
+    python scripts/benchmarks/batch_pricing.py [--products 10000] [--rounds 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "business-rules-service"))
+
+from src.domain.entities.molde import Molde  # noqa: E402
+from src.domain.entities.producto import Producto  # noqa: E402
+from src.domain.services.cost_calculation_service import CostCalculationService  # noqa: E402
+from src.domain.value_objects.calculation_params import CalculationParams  # noqa: E402
+from src.domain.value_objects.pricing_batch import BREAKDOWN_FIELDS, PricingBatch  # noqa: E402
+
+def build_params(valor_cera_kg: str = "15000") -> CalculationParams:
+    return CalculationParams(
+        porc_aditivo=Decimal("8"),
+        porc_fragancia=Decimal("6.5"),
+        porc_ganancia=Decimal("250"),
+        porc_detalle=Decimal("20"),
+        porc_admin=Decimal("10"),
+        valor_cera_kg=Decimal(valor_cera_kg),
+        valor_aditivo_kg=Decimal("8000"),
+        valor_fragancia_ml=Decimal("150"),
+        valor_colorante_gota=Decimal("50"),
+        valor_pabilo_metro=Decimal("200"),
+        multiplo_redondeo=500,
+        descuentos_cantidad={12: Decimal("5"), 50: Decimal("12.5")}
+    )
+
+def build_catalog(size: int, seed: int = 7):
+    rng = random.Random(seed)
+    items = []
+    for i in range(size):
+        molde = Molde(
+            nombre=f"Molde {i}",
+            codigo=f"M{i}",
+            peso_figura=Decimal(rng.randint(200, 25000)) / 100,
+            longitud_pabilo=Decimal(rng.randint(5, 60)) / 100,
+            complejidad=rng.choice(["simple", "intermedio", "complejo"])
+        )
+        producto = Producto(
+            molde_id=f"M{i}",
+            nombre=f"Producto {i}",
+            color_config={},
+            categoria="velas",
+            margen_ganancia_custom=Decimal(rng.randint(1500, 3500)) / 10 if rng.random() < 0.2 else None,
+            porcentaje_detalle_custom=Decimal(rng.randint(10, 45)) if rng.random() < 0.1 else None
+        )
+        items.append((molde, producto, rng.randint(0, 12)))
+    return items
+
+def best_of(rounds: int, fn):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    service = CostCalculationService()
+    items = build_catalog(args.products)
+    params = build_params()
+
+    start = time.perf_counter()
+    batch = PricingBatch.from_products(items)
+    prepare = time.perf_counter() - start
+
+    # Verificación exacta campo a campo contra el cálculo Decimal
+    result = service.calculate_batch_costs(batch, params)
+    mismatches = 0
+    for i, (molde, producto, gotas) in enumerate(items):
+        reference = service.calculate_product_cost(molde, producto, params, gotas)
+        for field in BREAKDOWN_FIELDS:
+            if result.as_decimal(field, i) != getattr(reference, field):
+                mismatches += 1
+        for cantidad, valor in reference.descuentos_aplicables.items():
+            if result.descuento_decimal(cantidad, i) != valor:
+                mismatches += 1
+
+    float_result = service.calculate_batch_costs(batch, params, exact=False)
+    float_diffs = int((float_result.valor_redondeado != result.as_float("valor_redondeado")).sum())
+
+    # Re-cálculo tras un cambio del precio de la cera
+    new_params = build_params("16250.50")
+    decimal_time = best_of(1, lambda: [
+        service.calculate_product_cost(m, p, new_params, g) for m, p, g in items
+    ])
+    exact_time = best_of(args.rounds, lambda: service.calculate_batch_costs(batch, new_params))
+    float_time = best_of(args.rounds, lambda: service.calculate_batch_costs(batch, new_params, exact=False))
+
+    print(f"productos: {args.products}")
+    print(f"preparación del lote:       {prepare * 1000:9.1f} ms (una vez)")
+    print(f"Decimal unitario:           {decimal_time * 1000:9.1f} ms")
+    print(f"lote exacto (punto fijo):   {exact_time * 1000:9.1f} ms  ({decimal_time / exact_time:6.0f}x)")
+    print(f"lote float64:               {float_time * 1000:9.1f} ms  ({decimal_time / float_time:6.0f}x)")
+    print(f"diferencias exacto vs Decimal: {mismatches}")
+    print(f"valor_redondeado distinto en float64: {float_diffs}")
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
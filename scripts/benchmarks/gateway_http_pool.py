@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Benchmark: cliente httpx por petición vs pool compartido del gateway
+
+Uso:
+    python scripts/benchmarks/gateway_http_pool.py [--requests 2000] [--concurrency 50]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "api-gateway"))
+
+from src.services.http_pool import UpstreamPool  # noqa: E402
+from stub_upstream import StubUpstream  # noqa: E402
+
+async def run_load(send, total: int, concurrency: int):
+    """Lanza `total` peticiones con `concurrency` workers y mide latencias"""
+    latencies = []
+    remaining = iter(range(total))
+    
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            await send()
+            latencies.append(time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return elapsed, latencies
+
+def report(name: str, total: int, elapsed: float, latencies, connections: int):
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(
+        f"{name:<22} {total / elapsed:>9.0f} req/s   p50 {p50:6.2f} ms   "
+        f"p99 {p99:6.2f} ms   conexiones {connections}"
+    )
+
+async def main(total: int, concurrency: int):
+    stub = StubUpstream()
+    await stub.start()
+    url = f"{stub.url}/insumos/"
+    
+    # Comportamiento anterior: un AsyncClient nuevo por cada petición
+    async def per_request_client():
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            response = await client.get(url)
+            response.json()
+    
+    before = stub.connections_opened
+    elapsed, latencies = await run_load(per_request_client, total, concurrency)
+    report("cliente por petición", total, elapsed, latencies, stub.connections_opened - before)
+    
+    # Pool compartido creado una sola vez (como en el lifespan del gateway)
+    pool = UpstreamPool()
+    await pool.start([stub.url])
+    
+    async def pooled_client():
+        response = await pool.get_client(stub.url).get(url)
+        response.json()
+    
+    before = stub.connections_opened
+    elapsed, latencies = await run_load(pooled_client, total, concurrency)
+    report("pool compartido", total, elapsed, latencies, stub.connections_opened - before)
+    
+    await pool.close()
+    await stub.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Costo de la instrumentación del gateway (MetricsMiddleware y Histogram.observe)
+
+Uso:
+    python scripts/benchmarks/gateway_metrics_overhead.py [--requests 5000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import timeit
+
+from fastapi import FastAPI
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "api-gateway"))
+
+from src.services.metrics import Histogram, MetricsMiddleware  # noqa: E402
+
+def build_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+    
+    @app.get("/insumos/{insumo_id}")
+    async def get_insumo(insumo_id: str):
+        return {"id": insumo_id}
+    
+    if instrumented:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+async def measure_app(app: FastAPI, total: int) -> float:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://gw") as client:
+        for i in range(200):
+            await client.get(f"/insumos/{i}")
+        start = time.perf_counter()
+        for i in range(total):
+            await client.get(f"/insumos/{i}")
+        return (time.perf_counter() - start) / total
+
+async def main(total: int):
+    histogram = Histogram("bench_seconds", "bench", ("route", "method"))
+    per_observe = min(timeit.repeat(
+        lambda: histogram.observe(0.0123, "/insumos/{insumo_id}", "GET"), number=100000, repeat=5
+    )) / 100000
+    print(f"Histogram.observe: {per_observe * 1e9:.0f} ns por observación")
+    
+    # Rondas alternadas; se toma el mejor tiempo de cada variante para reducir ruido
+    plain_app, instrumented_app = build_app(False), build_app(True)
+    plain, instrumented = float("inf"), float("inf")
+    for _ in range(5):
+        plain = min(plain, await measure_app(plain_app, total))
+        instrumented = min(instrumented, await measure_app(instrumented_app, total))
+    print(f"petición sin métricas:  {plain * 1e6:8.1f} µs")
+    print(f"petición con métricas:  {instrumented * 1e6:8.1f} µs")
+    print(f"overhead por petición:  {(instrumented - plain) * 1e6:8.1f} µs ({(instrumented / plain - 1) * 100:.1f}%)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
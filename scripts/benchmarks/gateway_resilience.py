@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Escenarios de resiliencia del gateway contra un microservicio falso
+
+Inyecta latencia y fallas en el stub y muestra cómo responden el circuit breaker,
+el presupuesto de reintentos y el load shedding.
+
+Uso:
+    python scripts/benchmarks/gateway_resilience.py [--requests 500] [--concurrency 20]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+
+from fastapi import HTTPException
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "api-gateway"))
+
+from src.services.http_pool import UpstreamPool  # noqa: E402
+from src.services.resilience import Resilience, CircuitBreaker  # noqa: E402
+from stub_upstream import StubUpstream  # noqa: E402
+
+async def run_scenario(name, stub, resilience, pool, total, concurrency):
+    outcomes = Counter()
+    latencies = []
+    remaining = iter(range(total))
+    served_before = stub.requests_served
+    client = pool.get_client(stub.url)
+    
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                request = client.build_request("GET", f"{stub.url}/moldes", timeout=1.0)
+                response = await resilience.send(client, stub.url, request)
+                outcomes[str(response.status_code)] += 1
+            except HTTPException as e:
+                outcomes[f"{e.status_code} ({'shed' if 'overloaded' in e.detail else 'circuit open'})"] += 1
+            except httpx.TransportError as e:
+                outcomes[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - start)
+    
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    upstream_calls = stub.requests_served - served_before
+    breaker = resilience.breaker(stub.url)
+    print(f"\n== {name}")
+    print(f"   resultados: {dict(outcomes)}")
+    print(
+        f"   llamadas al upstream: {upstream_calls} para {total} peticiones "
+        f"(amplificación {upstream_calls / total:.2f}x)"
+    )
+    print(
+        f"   latencia p50 {statistics.median(latencies) * 1000:.1f} ms, "
+        f"máx {max(latencies) * 1000:.1f} ms; breaker: {breaker.state}"
+    )
+
+async def main(total: int, concurrency: int):
+    stub = StubUpstream()
+    await stub.start()
+    pool = UpstreamPool()
+    
+    def fresh_resilience(**kwargs):
+        resilience = Resilience(route_timeouts={}, **kwargs)
+        resilience.breakers[stub.url] = CircuitBreaker(failure_threshold=5, reset_timeout=0.5)
+        return resilience
+    
+    await run_scenario("upstream sano", stub, fresh_resilience(), pool, total, concurrency)
+    
+    stub.failure_rate = 0.3
+    await run_scenario("30% de fallas 503 (reintentos)", stub, fresh_resilience(), pool, total, concurrency)
+    
+    stub.failure_rate = 1.0
+    await run_scenario("upstream caído (breaker abre)", stub, fresh_resilience(), pool, total, concurrency)
+    
+    stub.failure_rate = 0.0
+    stub.latency = 0.2
+    await run_scenario(
+        "upstream lento con límite de 5 en vuelo (load shedding)",
+        stub, fresh_resilience(max_in_flight=5), pool, total // 5, concurrency
+    )
+    
+    await pool.close()
+    await stub.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Benchmark del kernel de precios: CostComponents (slots) vs CostBreakdown (pydantic)
+
+Valoriza un catálogo sintético producto por producto con `compute_costs` (camino
+interno, dataclasses con slots) y con `calculate_product_cost` (mismo cálculo más
+el modelo pydantic de la API), verifica que ambos coinciden campo a campo y mide
+tiempo y memoria por cálculo con tracemalloc.
+
+Uso:
+    python scripts/benchmarks/pricing_kernel.py [--products 10000] [--rounds 5]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "business-rules-service"))
+
+from batch_pricing import best_of, build_catalog, build_params  # noqa: E402
+from src.domain.services.cost_calculation_service import CostCalculationService  # noqa: E402
+from src.domain.value_objects.pricing_batch import BREAKDOWN_FIELDS  # noqa: E402
+
+def memory_per_call(fn, items):
+    """Bytes retenidos por resultado y pico de memoria del recorrido completo"""
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        results = [fn(m, p, g) for m, p, g in items]
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del results
+    return (after - before) / len(items), peak - before
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    service = CostCalculationService()
+    items = build_catalog(args.products)
+    params = build_params()
+
+    def kernel(m, p, g):
+        return service.compute_costs(m, p, params, g)
+
+    def pydantic_model(m, p, g):
+        return service.calculate_product_cost(m, p, params, g)
+
+    mismatches = 0
+    for molde, producto, gotas in items:
+        componentes = kernel(molde, producto, gotas)
+        modelo = pydantic_model(molde, producto, gotas)
+        for field in BREAKDOWN_FIELDS:
+            if getattr(componentes, field) != getattr(modelo, field):
+                mismatches += 1
+        if componentes.descuentos_aplicables != modelo.descuentos_aplicables:
+            mismatches += 1
+
+    kernel_time = best_of(args.rounds, lambda: [kernel(m, p, g) for m, p, g in items])
+    model_time = best_of(args.rounds, lambda: [pydantic_model(m, p, g) for m, p, g in items])
+    kernel_bytes, kernel_peak = memory_per_call(kernel, items)
+    model_bytes, model_peak = memory_per_call(pydantic_model, items)
+
+    n = args.products
+    print(f"productos: {n}")
+    print(f"{'':24}{'us/cálculo':>12}{'bytes/resultado':>18}{'pico (KiB)':>12}")
+    print(f"{'CostBreakdown (pydantic)':24}{model_time / n * 1e6:12.2f}{model_bytes:18.0f}{model_peak / 1024:12.0f}")
+    print(f"{'CostComponents (slots)':24}{kernel_time / n * 1e6:12.2f}{kernel_bytes:18.0f}{kernel_peak / 1024:12.0f}")
+    print(f"mejora: {model_time / kernel_time:.1f}x tiempo, {model_bytes / kernel_bytes:.1f}x memoria por resultado")
+    print(f"diferencias kernel vs pydantic: {mismatches}")
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
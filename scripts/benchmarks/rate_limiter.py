@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Microbenchmark del rate limiter del gateway con 10k clientes distintos
+
+Compara la implementación anterior (lista de datetimes por IP, reconstruida en cada
+petición) con el backend GCRA en memoria.
+
+Uso:
+    python scripts/benchmarks/rate_limiter.py [--clients 10000] [--rounds 20]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "api-gateway"))
+
+from src.middleware.rate_limit import InMemoryRateLimitBackend, RateLimit  # noqa: E402
+
+class ListRateLimiter:
+    """Algoritmo anterior de RateLimitMiddleware, sin la parte HTTP"""
+    
+    def __init__(self, requests_per_minute: int):
+        self.requests_per_minute = requests_per_minute
+        self.requests = defaultdict(list)
+    
+    def hit(self, client_ip: str) -> bool:
+        now = datetime.now()
+        minute_ago = now - timedelta(minutes=1)
+        self.requests[client_ip] = [
+            req_time for req_time in self.requests[client_ip]
+            if req_time > minute_ago
+        ]
+        if len(self.requests[client_ip]) >= self.requests_per_minute:
+            return False
+        self.requests[client_ip].append(now)
+        return True
+
+def measure(name: str, hit, clients, rounds: int):
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for client in clients:
+            hit(client)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    total = rounds * len(clients)
+    print(
+        f"{name:<26} {elapsed / total * 1e6:7.2f} µs/petición   "
+        f"{total / elapsed:>10.0f} peticiones/s   memoria pico {peak / 1024 / 1024:6.1f} MiB"
+    )
+
+async def main(n_clients: int, rounds: int, limit: int):
+    clients = [f"10.{i // 65536}.{(i // 256) % 256}.{i % 256}" for i in range(n_clients)]
+    
+    old = ListRateLimiter(limit)
+    measure("lista de datetimes", old.hit, clients, rounds)
+    
+    gcra_limit = RateLimit(limit, 60)
+    backend = InMemoryRateLimitBackend(max_keys=n_clients)
+    measure("GCRA en memoria", lambda key: backend.hit_now(key, gcra_limit), clients, rounds)
+    
+    # Con la mitad de capacidad el LRU mantiene la memoria acotada
+    bounded = InMemoryRateLimitBackend(max_keys=n_clients // 2)
+    measure("GCRA LRU (50% capacidad)", lambda key: bounded.hit_now(key, gcra_limit), clients, rounds)
+    print(f"clientes retenidos con LRU: {len(bounded)} de {n_clients}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.clients, args.rounds, args.limit))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Microservicio falso (HTTP/1.1 keep-alive) para benchmarks locales del gateway"""
+import asyncio
+import json
+import random
+
+DEFAULT_BODY = json.dumps({"status": "healthy", "items": list(range(50))}).encode()
+
+class StubUpstream:
+    """Servidor HTTP mínimo que responde siempre el mismo JSON
+    
+    `latency` (segundos) y `failure_rate` (0..1, responde `failure_status`) permiten
+    inyectar lentitud y fallas; se pueden cambiar en caliente durante una prueba.
+    """
+    
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        body: bytes = DEFAULT_BODY,
+        latency: float = 0.0,
+        failure_rate: float = 0.0,
+        failure_status: int = 503
+    ):
+        self.host = host
+        self.port = port
+        self.body = body
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.requests_served = 0
+        self.connections_opened = 0
+        self.last_request_head = b""
+        self._server = None
+    
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+    
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+    
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections_opened += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                content_length = 0
+                for line in head.split(b"\r\n")[1:]:
+                    name, _, value = line.partition(b":")
+                    if name.strip().lower() == b"content-length":
+                        content_length = int(value.strip())
+                if content_length:
+                    await reader.readexactly(content_length)
+                
+                self.requests_served += 1
+                self.last_request_head = head
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                
+                status, body = b"200 OK", self.body
+                if self.failure_rate and random.random() < self.failure_rate:
+                    status, body = str(self.failure_status).encode() + b" Error", b'{"detail": "injected failure"}'
+                
+                writer.write(
+                    b"HTTP/1.1 " + status + b"\r\n"
+                    b"content-type: application/json\r\n"
+                    b"content-length: " + str(len(body)).encode() + b"\r\n"
+                    b"\r\n" + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+async def main():
+    stub = StubUpstream(port=9100)
+    await stub.start()
+    print(f"Stub upstream escuchando en {stub.url}")
+    await asyncio.Event().wait()
+
+if __name__ == "__main__":
+    asyncio.run(main())
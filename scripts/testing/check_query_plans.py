@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""Verifica que las consultas de los repositorios de business-rules-service usan índices
+
+Aplica las migraciones de índices en una base de prueba, carga unos pocos
+documentos, ejecuta los métodos de cada repositorio registrando con command
+monitoring los comandos que realmente envían a MongoDB y corre `explain` sobre
+cada uno. Falla si algún plan ganador tiene un COLLSCAN que no esté permitido.
+
+Uso (necesita un MongoDB accesible; la base de prueba se elimina al final):
+    MONGODB_URL=mongodb://localhost:27017 python scripts/testing/check_query_plans.py [--database vel_arte_query_plans] [--keep]
+"""
+import argparse
+import asyncio
+import copy
+import os
+import sys
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "business-rules-service"))
+
+from src.domain.entities.job import Job  # noqa: E402
+from src.domain.services.price_dependencies import ProductSelector  # noqa: E402
+from src.infrastructure.database.configuration_repository import ConfigurationRepository  # noqa: E402
+from src.infrastructure.database.migrations import apply_index_migrations  # noqa: E402
+from src.infrastructure.database.molde_repository import MoldeRepository  # noqa: E402
+from src.infrastructure.database.precio_calculado_repository import PrecioCalculadoRepository  # noqa: E402
+from src.infrastructure.database.params_snapshot_repository import ParamsSnapshotRepository  # noqa: E402
+from src.infrastructure.database.producto_repository import ProductoRepository  # noqa: E402
+from src.infrastructure.jobs.queue import MongoJobQueue  # noqa: E402
+from src.infrastructure.params_cache import CalculationParamsCache, ConfigurationWatcher  # noqa: E402
+
+EXPLAINABLE = {"find", "aggregate", "distinct", "count", "findAndModify", "update", "delete"}
+
+# Consultas (etiqueta, colección) que recorren la colección completa a propósito
+ALLOWED_COLLSCANS = {
+    ("ConfigurationRepository.get_all", "configurations"): "lista todas las configuraciones (colección chica)",
+    ("ConfigurationRepository.get_params_values_as_of", "configurations"):
+        "lee todas las configuraciones (colección chica); el histórico va por índice",
+    ("ConfigurationWatcher._fingerprint", "configurations"):
+        "agrega toda la colección de configuraciones (colección chica)",
+    ("PrecioCalculadoRepository.delete_stale", "precios_calculados"):
+        "$ne no es selectivo; corre una vez por recálculo completo",
+}
+
+class CommandRecorder(monitoring.CommandListener):
+    """Guarda los comandos que se envían mientras hay una etiqueta activa"""
+
+    def __init__(self):
+        self.label = None
+        self.commands = []
+
+    def started(self, event):
+        if self.label and event.command_name in EXPLAINABLE:
+            self.commands.append((self.label, event.database_name, copy.deepcopy(dict(event.command))))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+def explainable_command(command):
+    """Comando sin campos de sesión; update/delete con una sola sentencia (lo que acepta explain)"""
+    command = {k: v for k, v in command.items() if not k.startswith("$") and k not in ("lsid", "txnNumber")}
+    for field in ("updates", "deletes"):
+        if field in command:
+            command[field] = command[field][:1]
+    return command
+
+def plan_stages(node, stages=None):
+    """Etapas de todos los `winningPlan` del explain (find, aggregate, update...)"""
+    stages = [] if stages is None else stages
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "winningPlan":
+                collect_stages(value, stages)
+            else:
+                plan_stages(value, stages)
+    elif isinstance(node, list):
+        for item in node:
+            plan_stages(item, stages)
+    return stages
+
+def collect_stages(node, stages):
+    if isinstance(node, dict):
+        if "stage" in node:
+            stages.append((node["stage"], node.get("indexName")))
+        for value in node.values():
+            collect_stages(value, stages)
+    elif isinstance(node, list):
+        for item in node:
+            collect_stages(item, stages)
+
+async def seed(db):
+    now = datetime.utcnow()
+    config_id = ObjectId()
+    await db.configurations.insert_many([
+        {"_id": config_id, "key": "porc_ganancia", "name": "Ganancia", "description": "", "value": "250",
+         "type": "percentage", "category": "porcentajes", "is_active": True, "created_at": now},
+        {"key": "descuento_12", "name": "Descuento 12", "description": "", "value": "5",
+         "type": "percentage", "category": "descuentos_cantidad", "is_active": True, "created_at": now},
+    ])
+    await db.configuration_history.insert_one({
+        "configuration_id": str(config_id), "old_value": "240", "new_value": "250",
+        "changed_by": "admin", "changed_at": now
+    })
+    molde_id = ObjectId()
+    await db.moldes.insert_one({
+        "_id": molde_id, "nombre": "Molde", "codigo": "M1", "peso_figura": 120.5,
+        "longitud_pabilo": 0.2, "complejidad": "simple", "is_active": True
+    })
+    await db.molde_insumos.insert_one({
+        "molde_id": str(molde_id), "insumo_id": "x", "cantidad_base": 1.0, "unidad": "gramos"
+    })
+    producto_id = ObjectId()
+    await db.productos.insert_one({
+        "_id": producto_id, "molde_id": str(molde_id), "nombre": "Vela", "color_config": {"cantidad_gotas": 3},
+        "categoria": "velas", "margen_ganancia_custom": None, "porcentaje_detalle_custom": None,
+        "is_active": True
+    })
+    return str(config_id), str(molde_id), str(producto_id)
+
+async def exercise(db, recorder, config_id, molde_id, producto_id):
+    """Ejecuta cada consulta de los repositorios con su etiqueta"""
+    configs = ConfigurationRepository(db)
+    moldes = MoldeRepository(db)
+    productos = ProductoRepository(db)
+    precios = PrecioCalculadoRepository(db)
+    jobs = MongoJobQueue(db)
+    snapshots = ParamsSnapshotRepository(db)
+    watcher = ConfigurationWatcher(db.configurations, CalculationParamsCache())
+
+    async def drain(iterator):
+        return [lote async for lote in iterator]
+
+    selector = ProductSelector(
+        sin_margen_custom=True, sin_detalle_custom=True, con_colorante=True, molde_ids=frozenset({molde_id})
+    )
+    calls = [
+        ("ConfigurationRepository.get_by_id", lambda: configs.get_by_id(config_id)),
+        ("ConfigurationRepository.get_by_key", lambda: configs.get_by_key("porc_ganancia")),
+        ("ConfigurationRepository.get_all", lambda: configs.get_all()),
+        ("ConfigurationRepository.get_all(category)", lambda: configs.get_all("porcentajes")),
+        ("ConfigurationRepository.get_active_configs", lambda: configs.get_active_configs(fields=("key", "value"))),
+        ("ConfigurationRepository.get_history", lambda: configs.get_history(config_id)),
+        ("ConfigurationRepository.get_history(before, desde, hasta)", lambda: configs.get_history(
+            config_id, before=(datetime.utcnow(), str(ObjectId())),
+            desde=datetime(2020, 1, 1), hasta=datetime.utcnow()
+        )),
+        ("ConfigurationRepository.get_params_values_as_of",
+         lambda: configs.get_params_values_as_of(datetime.utcnow() - timedelta(days=1))),
+        ("ConfigurationRepository.get_quantity_discounts", lambda: configs.get_quantity_discounts()),
+        ("ConfigurationWatcher._fingerprint", lambda: watcher._fingerprint()),
+        ("MoldeRepository.get_by_id", lambda: moldes.get_by_id(molde_id)),
+        ("MoldeRepository.find_many_by_ids", lambda: moldes.find_many_by_ids([molde_id], raw=True)),
+        ("MoldeRepository.get_all_active", lambda: moldes.get_all_active(raw=True)),
+        ("MoldeRepository.get_insumos_for_molde", lambda: moldes.get_insumos_for_molde(molde_id)),
+        ("ProductoRepository.get_by_id", lambda: productos.get_by_id(producto_id)),
+        ("ProductoRepository.get_pricing_revision", lambda: productos.get_pricing_revision(producto_id)),
+        ("ProductoRepository.find_many_by_ids", lambda: productos.find_many_by_ids([producto_id], raw=True)),
+        ("ProductoRepository.get_active_products", lambda: productos.get_active_products(raw=True)),
+        ("ProductoRepository.get_by_category", lambda: productos.get_by_category("velas")),
+        ("ProductoRepository.iter_active_products", lambda: drain(productos.iter_active_products(raw=True))),
+        ("ProductoRepository.iter_active_products(after_id)",
+         lambda: drain(productos.iter_active_products(after_id=str(ObjectId("0" * 24)), raw=True))),
+        ("ProductoRepository.iter_active_products(selector)",
+         lambda: drain(productos.iter_active_products(selector=selector, raw=True))),
+        ("ProductoRepository.bulk_update_precios",
+         lambda: productos.bulk_update_precios({producto_id: Decimal("12500")})),
+        ("PrecioCalculadoRepository.bulk_upsert", lambda: precios.bulk_upsert([{
+            "producto_id": producto_id, "molde_id": molde_id, "nombre": "Vela", "categoria": "velas",
+            "precio": 12500, "costo_base": 2800.0, "ganancia_neta": 9700.0, "margen_porcentual": 77.6,
+            "desglose": {}, "descuentos": [], "params_version": 1, "recalculo_id": "r1",
+            "calculado_en": datetime.utcnow()
+        }])),
+        ("PrecioCalculadoRepository.get_by_producto_id", lambda: precios.get_by_producto_id(producto_id)),
+        ("PrecioCalculadoRepository.find_range(categoria, precio)",
+         lambda: precios.find_range(categoria="velas", precio_min=10000, precio_max=15000)),
+        ("PrecioCalculadoRepository.find_range(precio)", lambda: precios.find_range(precio_min=10000)),
+        ("PrecioCalculadoRepository.find_range(categoria, margen)",
+         lambda: precios.find_range(categoria="velas", margen_min=50, orden="margen_porcentual")),
+        ("PrecioCalculadoRepository.find_range(margen)",
+         lambda: precios.find_range(margen_min=50, orden="margen_porcentual")),
+        ("PrecioCalculadoRepository.delete_stale", lambda: precios.delete_stale("r2")),
+        ("ParamsSnapshotRepository.insert", lambda: snapshots.insert({
+            "version": 1, "valid_from": datetime.utcnow(), "full": True, "values": {"porc_ganancia": "250"},
+            "removed": [], "keys": ["porc_ganancia"], "changed_by": "admin", "created_at": datetime.utcnow()
+        })),
+        ("ParamsSnapshotRepository.find_since", lambda: snapshots.find_since(0)),
+        ("MongoJobQueue.enqueue", lambda: jobs.enqueue(Job(type="recalculate_all", lock_key="precios"))),
+        ("MongoJobQueue.claim", lambda: jobs.claim("worker", ["recalculate_all"])),
+        ("MongoJobQueue.list", lambda: jobs.list()),
+        ("MongoJobQueue.list(type)", lambda: jobs.list("recalculate_all")),
+    ]
+
+    for label, call in calls:
+        recorder.label = label
+        try:
+            await call()
+        finally:
+            recorder.label = None
+
+    job = await jobs.get((await jobs.list(limit=1))[0].id)
+    recorder.label = "MongoJobQueue.update_progress"
+    await jobs.update_progress(job.id, job.worker_id or "worker", {"lotes": 1})
+    recorder.label = "MongoJobQueue.get"
+    await jobs.get(job.id)
+    recorder.label = None
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database", default="vel_arte_query_plans")
+    parser.add_argument("--keep", action="store_true", help="No eliminar la base de prueba")
+    args = parser.parse_args()
+
+    recorder = CommandRecorder()
+    client = AsyncIOMotorClient(
+        os.getenv("MONGODB_URL", "mongodb://localhost:27017"), event_listeners=[recorder]
+    )
+    db = client[args.database]
+    await client.drop_database(args.database)
+
+    violations = 0
+    try:
+        resultado = await apply_index_migrations(db)
+        print(f"índices creados: {len(resultado['creados'])}, errores: {resultado['errores']}")
+        ids = await seed(db)
+        await exercise(db, recorder, *ids)
+
+        for label, database_name, command in recorder.commands:
+            explain = await client[database_name].command(
+                {"explain": explainable_command(command), "verbosity": "queryPlanner"}
+            )
+            stages = plan_stages(explain)
+            plan = ", ".join(f"{stage}({index})" if index else stage for stage, index in stages) or "-"
+            command_name = next(iter(command))
+            collscan = any(stage == "COLLSCAN" for stage, _ in stages)
+            if collscan and (label, command[command_name]) in ALLOWED_COLLSCANS:
+                status = "permitido"
+            elif collscan:
+                status = "COLLSCAN"
+                violations += 1
+            else:
+                status = "ok"
+            print(f"{status:10} {label:58} {command_name} {command[command_name]}: {plan}")
+    finally:
+        if not args.keep:
+            await client.drop_database(args.database)
+        client.close()
+
+    print(f"\n{len(recorder.commands)} comandos revisados, {violations} con COLLSCAN no permitido")
+    if violations:
+        for (label, collection), reason in ALLOWED_COLLSCANS.items():
+            print(f"  (permitido) {label} en {collection}: {reason}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""Verifica que los módulos copiados entre microservicios sigan siendo idénticos
+
+Cada servicio se construye con su propio directorio como contexto de Docker, así
+que el código compartido se mantiene como copias exactas en vez de un paquete común.
+
+Uso:
+    python scripts/testing/check_shared_copies.py
+"""
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+
+# Grupos de archivos que deben tener exactamente el mismo contenido
+SHARED_COPIES = (
+    ("api-gateway/src/services/token_verifier.py", "product-service/src/services/token_verifier.py"),
+)
+
+def main() -> int:
+    failed = False
+    for group in SHARED_COPIES:
+        contents = {}
+        for path in group:
+            with open(os.path.join(ROOT, path), "rb") as f:
+                contents[path] = f.read()
+        if len(set(contents.values())) > 1:
+            failed = True
+            print(f"❌ Copias divergentes: {', '.join(group)}")
+        else:
+            print(f"✅ {group[0]} ({len(group)} copias idénticas)")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())